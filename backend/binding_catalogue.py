@@ -0,0 +1,109 @@
+# backend/binding_catalogue.py
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from ascii_colors import trace_exception
+
+from backend.db import session as db_session_module
+from backend.db.models.config import (
+    LLMBinding as DBLLMBinding, TTIBinding as DBTTIBinding,
+    TTSBinding as DBTTSBinding, STTBinding as DBSTTBinding
+)
+from backend.settings import settings
+
+BINDING_MODELS = {
+    "llm": DBLLMBinding,
+    "tti": DBTTIBinding,
+    "tts": DBTTSBinding,
+    "stt": DBSTTBinding,
+}
+
+
+def _parse_aliases(model_aliases) -> Dict:
+    if isinstance(model_aliases, str):
+        try:
+            return json.loads(model_aliases) or {}
+        except Exception as e:
+            trace_exception(e)
+            return {}
+    return model_aliases or {}
+
+
+class BindingCatalogue:
+    """
+    In-memory copy of the LLM/TTI/TTS/STT binding rows used to build LollmsClients.
+
+    Loaded lazily in one pass and reloaded after any binding row is written in this
+    worker (ORM events), after global_model_cache_invalidate / bindings_updated from
+    other workers, or after `binding_catalogue_ttl_seconds` as a safety net. `version`
+    changes on every reload so derived caches can key on it. Entries are detached
+    SimpleNamespace copies with the column attributes (model_aliases already parsed).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_kind: Optional[Dict[str, List[SimpleNamespace]]] = None
+        self._loaded_at = 0.0
+        self.version = 0
+
+    def _load(self) -> Dict[str, List[SimpleNamespace]]:
+        db = db_session_module.SessionLocal()
+        try:
+            catalogue = {}
+            for kind, model in BINDING_MODELS.items():
+                catalogue[kind] = [
+                    SimpleNamespace(
+                        id=row.id, alias=row.alias, name=row.name, config=row.config or {},
+                        default_model_name=row.default_model_name, is_active=row.is_active,
+                        model_aliases=_parse_aliases(row.model_aliases)
+                    )
+                    for row in db.query(model).order_by(model.id).all()
+                ]
+            return catalogue
+        finally:
+            db.close()
+
+    def _entries(self, kind: str) -> List[SimpleNamespace]:
+        ttl = float(settings.get("binding_catalogue_ttl_seconds", 300))
+        with self._lock:
+            if self._by_kind is None or (ttl > 0 and time.monotonic() - self._loaded_at > ttl):
+                self._by_kind = self._load()
+                self._loaded_at = time.monotonic()
+                self.version += 1
+            return self._by_kind.get(kind, [])
+
+    def get_active(self, kind: str, alias: Optional[str]) -> Optional[SimpleNamespace]:
+        if not alias:
+            return None
+        return next((b for b in self._entries(kind) if b.alias == alias and b.is_active), None)
+
+    def default_active(self, kind: str) -> Optional[SimpleNamespace]:
+        """First active binding by id, the system default used as fallback."""
+        return next((b for b in self._entries(kind) if b.is_active), None)
+
+    def current_version(self) -> int:
+        self._entries("llm")
+        return self.version
+
+    def invalidate(self):
+        with self._lock:
+            self._by_kind = None
+
+
+binding_catalogue = BindingCatalogue()
+
+
+def _invalidate_on_write(mapper, connection, target):
+    binding_catalogue.invalidate()
+    # Invalidate again once the write is committed, in case a reload raced the flush
+    session = object_session(target)
+    if session is not None:
+        event.listen(session, "after_commit", lambda _session: binding_catalogue.invalidate(), once=True)
+
+for _model in BINDING_MODELS.values():
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _invalidate_on_write)
@@ -0,0 +1,181 @@
+# backend/broadcast_journal.py
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import psutil
+
+from backend.config import APP_DATA_DIR
+from backend.settings import settings
+
+JOURNAL_DIR = APP_DATA_DIR / "broadcast_journal"
+MAGIC = b"LBJ1"
+# magic, slot_size, slot_count, pid, next_seq
+HEADER = struct.Struct("!4sIIIQ")
+HEADER_SIZE = 64
+# seq, payload length
+SLOT_HEADER = struct.Struct("!QI")
+
+
+class BroadcastJournal:
+    """
+    Append-only, size-capped ring journal of the cluster broadcasts sent by this worker.
+
+    Replaces the per-broadcast BroadcastMessage rows: each worker memory-maps its own
+    file (`broadcast_journal/worker_<pid>.journal`) holding `broadcast_journal_slots`
+    fixed-size slots, and broadcast N is written to slot N % slots, overwriting the
+    oldest entry. Appends are a memcpy into the map, so the main database sees no
+    per-event writes. Payloads larger than a slot are recorded as a stub with their
+    type and size only, and are skipped on replay.
+
+    A worker that lost its Hub connection reads the other workers' journals from
+    the sequence numbers it had seen (`peer_heads`) to replay what it missed
+    (`read_peers_since`). Journals of dead processes are removed when a worker opens
+    its own.
+    """
+    def __init__(self, directory: Path = JOURNAL_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self.path: Optional[Path] = None
+        self.slot_size = 0
+        self.slot_count = 0
+        self.next_seq = 1
+        self.appended = 0
+        self.truncated = 0
+
+    def open(self):
+        with self._lock:
+            if self._map is not None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._remove_dead_journals()
+            self.slot_size = max(256, int(settings.get("broadcast_journal_slot_bytes", 8192)))
+            self.slot_count = max(16, int(settings.get("broadcast_journal_slots", 2048)))
+            self.path = self.directory / f"worker_{os.getpid()}.journal"
+            size = HEADER_SIZE + self.slot_size * self.slot_count
+            self._file = open(self.path, "w+b")
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+            self.next_seq = 1
+            self._write_header()
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _remove_dead_journals(self):
+        for path in self.directory.glob("worker_*.journal"):
+            try:
+                pid = int(path.stem.split("_", 1)[1])
+            except (IndexError, ValueError):
+                continue
+            if pid != os.getpid() and not psutil.pid_exists(pid):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _write_header(self):
+        self._map[:HEADER.size] = HEADER.pack(MAGIC, self.slot_size, self.slot_count, os.getpid(), self.next_seq)
+
+    def append(self, encoded: bytes, msg_type: Optional[str] = None) -> int:
+        """Records an encoded broadcast and returns its sequence number (0 if the journal is closed)."""
+        with self._lock:
+            if self._map is None:
+                return 0
+            seq = self.next_seq
+            capacity = self.slot_size - SLOT_HEADER.size
+            if len(encoded) > capacity:
+                encoded = json.dumps({"type": msg_type, "_pid": os.getpid(), "_journal_truncated": True, "size": len(encoded)}).encode("utf-8")
+                self.truncated += 1
+            offset = HEADER_SIZE + (seq % self.slot_count) * self.slot_size
+            # Payload first, sequence number last, so a concurrent reader never sees a new seq over old bytes
+            self._map[offset:offset + SLOT_HEADER.size] = SLOT_HEADER.pack(0, len(encoded))
+            self._map[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(encoded)] = encoded
+            self._map[offset:offset + 8] = struct.pack("!Q", seq)
+            self.next_seq = seq + 1
+            self._write_header()
+            self.appended += 1
+            return seq
+
+    def peer_heads(self) -> Dict[str, int]:
+        """Last sequence number written by each other worker's journal."""
+        heads = {}
+        for path, journal_map in self._peer_maps():
+            try:
+                heads[str(path)] = HEADER.unpack(journal_map[:HEADER.size])[4] - 1
+            finally:
+                journal_map.close()
+        return heads
+
+    def read_peers_since(self, cursors: Dict[str, int]) -> Iterator[dict]:
+        """Yields the other workers' broadcasts newer than `cursors`, oldest first per journal."""
+        for path, journal_map in self._peer_maps():
+            try:
+                yield from self._read_since(journal_map, cursors.get(str(path), 0))
+            finally:
+                journal_map.close()
+
+    def _peer_maps(self) -> List:
+        maps = []
+        if not self.directory.exists():
+            return maps
+        for path in self.directory.glob("worker_*.journal"):
+            if path == self.path:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    journal_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                continue
+            if journal_map[:4] != MAGIC:
+                journal_map.close()
+                continue
+            maps.append((path, journal_map))
+        return maps
+
+    @staticmethod
+    def _read_since(journal_map: mmap.mmap, since_seq: int) -> Iterator[dict]:
+        _, slot_size, slot_count, _, next_seq = HEADER.unpack(journal_map[:HEADER.size])
+        first = max(since_seq + 1, next_seq - slot_count, 1)
+        for seq in range(first, next_seq):
+            offset = HEADER_SIZE + (seq % slot_count) * slot_size
+            slot_seq, length = SLOT_HEADER.unpack(journal_map[offset:offset + SLOT_HEADER.size])
+            if slot_seq != seq or length > slot_size - SLOT_HEADER.size:
+                continue
+            data = journal_map[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length]
+            # Overwritten while we were reading
+            if struct.unpack("!Q", journal_map[offset:offset + 8])[0] != seq:
+                continue
+            try:
+                payload = json.loads(data.decode("utf-8"))
+            except ValueError:
+                continue
+            if isinstance(payload, dict) and not payload.get("_journal_truncated"):
+                yield payload
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "path": str(self.path) if self.path else None,
+                "open": self._map is not None,
+                "slot_size": self.slot_size,
+                "slot_count": self.slot_count,
+                "last_seq": self.next_seq - 1,
+                "appended": self.appended,
+                "truncated": self.truncated,
+            }
+
+
+broadcast_journal = BroadcastJournal()
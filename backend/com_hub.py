@@ -3,21 +3,149 @@ import asyncio
 import json
 import struct
 import socket
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Packets a worker may have waiting in its write queue before new ones are dropped
+CLIENT_QUEUE_SIZE = 10000
+
+
+def _loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data.decode('utf-8'))
+
+
+def _dumps(payload: dict) -> bytes:
+    return orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode('utf-8')
+
+
+class HubClient:
+    """A connected worker: its write queue, the users it hosts and its counters."""
+    def __init__(self, writer):
+        self.writer = writer
+        self.peer = str(writer.get_extra_info('peername'))
+        self.pid = None
+        # None until the worker announces its presence; such workers receive every packet
+        self.user_ids = None
+        self.admin_ids = set()
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.writer_task = None
+        self.packets_out = 0
+        self.bytes_out = 0
+        self.dropped = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    def wants(self, payload: dict) -> bool:
+        if self.user_ids is None or not isinstance(payload, dict):
+            return True
+        msg_type = payload.get("type")
+        if msg_type == "personal":
+            return payload.get("user_id") in self.user_ids
+        if msg_type == "admins":
+            return bool(self.admin_ids)
+        return True
+
+    def enqueue(self, packet: bytes) -> bool:
+        try:
+            self.queue.put_nowait((packet, time.monotonic()))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def run_writer(self):
+        try:
+            while True:
+                packet, enqueued_at = await self.queue.get()
+                self.writer.write(packet)
+                await self.writer.drain()
+                self.packets_out += 1
+                self.bytes_out += len(packet)
+                self.last_lag_ms = (time.monotonic() - enqueued_at) * 1000
+                self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # The reader side notices the broken connection and unregisters the client
+            self.writer.close()
+
+    def stats(self) -> dict:
+        return {
+            "peer": self.peer,
+            "pid": self.pid,
+            "hosted_users": len(self.user_ids) if self.user_ids is not None else None,
+            "hosted_admins": len(self.admin_ids),
+            "queue_depth": self.queue.qsize(),
+            "packets_out": self.packets_out,
+            "bytes_out": self.bytes_out,
+            "dropped": self.dropped,
+            "last_lag_ms": round(self.last_lag_ms, 2),
+            "max_lag_ms": round(self.max_lag_ms, 2),
+        }
+
 
 class ComHub:
     """
-    A lightweight communication hub that allows multiple LoLLMs workers 
+    A lightweight communication hub that allows multiple LoLLMs workers
     to synchronize events in real-time without database polling.
     Acts as a simple pub-sub server for the worker cluster.
+
+    Workers announce the user ids whose sockets they hold (`hub_presence`), so
+    `personal` messages go only to the worker(s) hosting that user and `admins`
+    messages only to workers with an admin connected; everything else is fanned
+    out to all other workers. Each worker has its own write queue and writer task,
+    so a slow worker no longer back-pressures the sender.
     """
     def __init__(self, host='127.0.0.1', port=8042):
         self.host = host
         self.port = port
         self.clients = set()
+        self.started_at = time.time()
+        self.packets_in = 0
+        self.bytes_in = 0
+        self.packets_delivered = 0
+        self.packets_unrouted = 0
+
+    def _handle_presence(self, client: HubClient, payload: dict):
+        op = payload.get("op")
+        if op == "set":
+            client.pid = payload.get("pid")
+            client.user_ids = set(payload.get("user_ids") or [])
+            client.admin_ids = set(payload.get("admin_ids") or [])
+            return
+        if client.user_ids is None:
+            client.user_ids = set()
+        user_id = payload.get("user_id")
+        if op == "add":
+            client.user_ids.add(user_id)
+        elif op == "remove":
+            client.user_ids.discard(user_id)
+            client.admin_ids.discard(user_id)
+        elif op == "admin_add":
+            client.admin_ids.add(user_id)
+        elif op == "admin_remove":
+            client.admin_ids.discard(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "packets_in": self.packets_in,
+            "bytes_in": self.bytes_in,
+            "packets_delivered": self.packets_delivered,
+            "packets_unrouted": self.packets_unrouted,
+            "packets_dropped": sum(c.dropped for c in self.clients),
+            "clients": [c.stats() for c in list(self.clients)],
+        }
 
     async def handle_client(self, reader, writer):
-        self.clients.add(writer)
-        addr = writer.get_extra_info('peername')
+        client = HubClient(writer)
+        client.writer_task = asyncio.create_task(client.run_writer())
+        self.clients.add(client)
+        addr = client.peer
         try:
             while True:
                 # Protocol: 4 bytes length (Big-Endian Unsigned Int) + JSON payload
@@ -25,7 +153,7 @@ class ComHub:
                 if not length_data:
                     break
                 length = struct.unpack('!I', length_data)[0]
-                
+
                 # Protect against oversized payloads (10MB limit)
                 if length > 10 * 1024 * 1024:
                     print(f"Hub Warning: Rejecting oversized payload ({length} bytes) from {addr}")
@@ -34,24 +162,42 @@ class ComHub:
                 data = await reader.readexactly(length)
                 if not data:
                     break
-                
-                # Broadcast the complete packet (length + data) to all OTHER connected workers
+                self.packets_in += 1
+                self.bytes_in += length + 4
+
+                try:
+                    payload = _loads(data)
+                except ValueError:
+                    print(f"Hub Warning: Dropping malformed packet from {addr}")
+                    continue
+
+                msg_type = payload.get("type") if isinstance(payload, dict) else None
+                if msg_type == "hub_presence":
+                    self._handle_presence(client, payload)
+                    continue
+                if msg_type == "hub_stats_request":
+                    reply = _dumps({"type": "hub_stats", "request_id": payload.get("request_id"), "stats": self.stats()})
+                    client.enqueue(struct.pack('!I', len(reply)) + reply)
+                    continue
+
+                # Route the complete packet (length + data) to the OTHER workers that need it
                 packet = length_data + data
-                
-                for client in list(self.clients):
-                    if client != writer:
-                        try:
-                            client.write(packet)
-                            await client.drain()
-                        except Exception:
-                            self.clients.discard(client)
-                            
+                delivered = 0
+                for other in list(self.clients):
+                    if other is not client and other.wants(payload):
+                        if other.enqueue(packet):
+                            delivered += 1
+                self.packets_delivered += delivered
+                if delivered == 0:
+                    self.packets_unrouted += 1
+
         except (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError):
             pass
         except Exception as e:
             print(f"Hub Error with client {addr}: {e}")
         finally:
-            self.clients.discard(writer)
+            self.clients.discard(client)
+            client.writer_task.cancel()
             writer.close()
             try:
                 await writer.wait_closed()
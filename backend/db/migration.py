@@ -323,9 +323,19 @@ def run_schema_migrations_and_bootstrap(connection, inspector):
         connection.execute(text("DELETE FROM broadcast_messages"))
     
     if inspector.has_table("tasks"):
+        # Scheduling columns are needed right away to tell restorable pending tasks apart
+        task_columns_db = [col['name'] for col in inspector.get_columns('tasks')]
+        for col_name, col_sql_def in {"priority": "VARCHAR NOT NULL DEFAULT 'background'", "job_spec": "JSON"}.items():
+            if col_name not in task_columns_db:
+                connection.execute(text(f"ALTER TABLE tasks ADD COLUMN {col_name} {col_sql_def}"))
+        interrupted_filter = "status = 'running' OR (status = 'pending' AND job_spec IS NULL)"
+
         # We don't just mark them failed; we strip the heavy data (results/logs)
         # to ensure any accidental broadcast is lightweight.
-        connection.execute(text("UPDATE tasks SET status='failed', error='Interrupted by server restart', result=NULL, logs='[]' WHERE status IN ('running', 'pending')"))
+        # Pending tasks with a job_spec are kept: the TaskManager re-queues them.
+        if inspector.has_table("task_logs"):
+            connection.execute(text(f"DELETE FROM task_logs WHERE task_id IN (SELECT id FROM tasks WHERE {interrupted_filter})"))
+        connection.execute(text(f"UPDATE tasks SET status='failed', error='Interrupted by server restart', result=NULL, logs='[]' WHERE {interrupted_filter}"))
         # Optional: connection.execute(text("DELETE FROM tasks")) # Uncomment to wipe all history every time
     
     connection.commit()
@@ -1016,11 +1026,13 @@ def run_schema_migrations_and_bootstrap(connection, inspector):
     _bootstrap_lollms_user(connection)
 
     # --- TASK PURGE ---
-    # Delete all background tasks from the DB on startup.
-    # This ensures the frontend doesn't download a massive history of logs/results.
+    # Delete all background tasks from the DB on startup, except the persistent
+    # pending queue. This ensures the frontend doesn't download a massive history of logs/results.
     if inspector.has_table("tasks"):
         try:
-            connection.execute(text("DELETE FROM tasks"))
+            connection.execute(text("DELETE FROM tasks WHERE NOT (status = 'pending' AND job_spec IS NOT NULL)"))
+            if inspector.has_table("task_logs"):
+                connection.execute(text("DELETE FROM task_logs WHERE task_id NOT IN (SELECT id FROM tasks)"))
             connection.commit()
             print("INFO: Task history purged for stability.")
         except Exception as e:
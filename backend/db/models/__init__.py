@@ -18,7 +18,8 @@ from .broadcast import BroadcastMessage
 from .api_key import OpenAIAPIKey
 from .connections import WebSocketConnection
 from .datastore import DataStore, SharedDataStoreLink
-from .db_task import DBTask
+from .db_task import DBTask, DBTaskLog
+from .generation_stats import GenerationDailyStat
 from .email_marketing import EmailProposal, EmailTopic
 
 from .prompt import SavedPrompt
@@ -17,7 +17,9 @@ class DBTask(Base):
     description = Column(Text)
     status = Column(String, nullable=False, default=TaskStatus.PENDING, index=True)
     progress = Column(Integer, default=0)
-    logs = Column(JSON, default=list)
+    # Legacy JSON log array. New entries are appended to the task_logs table instead
+    # of rewriting this column; it is kept so that older task history stays readable.
+    legacy_logs = Column("logs", JSON, default=list)
     result = Column(JSON)
     error = Column(Text)
     
@@ -28,10 +30,38 @@ class DBTask(Base):
     
     file_name = Column(String)
     total_files = Column(Integer)
+
+    # Scheduling: priority class and, for restorable tasks, the importable target and
+    # JSON arguments used to re-queue a PENDING task after a restart.
+    priority = Column(String, nullable=False, default="background", server_default="background")
+    job_spec = Column(JSON, nullable=True)
     
     owner_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
     owner = relationship("User")
 
+    log_entries = relationship(
+        "DBTaskLog", order_by="DBTaskLog.id", lazy="selectin",
+        cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    @property
+    def logs(self) -> list:
+        """All log entries as dicts ({timestamp, message, level}), oldest first."""
+        return list(self.legacy_logs or []) + [entry.to_dict() for entry in self.log_entries]
+
+class DBTaskLog(Base):
+    """Append-only task log line. Written in batches by the TaskManager flusher."""
+    __tablename__ = "task_logs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(String, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    timestamp = Column(String, nullable=False)
+    level = Column(String, nullable=False, default="INFO")
+    message = Column(Text, nullable=False, default="")
+
+    def to_dict(self) -> dict:
+        return {"timestamp": self.timestamp, "message": self.message, "level": self.level}
+
 class ScheduledTask(Base):
     __tablename__ = "scheduled_tasks"
     
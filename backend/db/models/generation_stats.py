@@ -0,0 +1,27 @@
+# backend/db/models/generation_stats.py
+from sqlalchemy import (
+    Column, Integer, String, Date,
+    ForeignKey, UniqueConstraint, Index
+)
+
+from backend.db.base import Base
+
+class GenerationDailyStat(Base):
+    """
+    Per-day rollup of assistant messages, maintained incrementally when a chat turn
+    is finalized. Lets the admin statistics be computed with a single indexed query
+    instead of opening every user's discussions.db.
+    """
+    __tablename__ = "generation_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    binding_name = Column(String, nullable=False, default="")
+    model_name = Column(String, nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('day', 'user_id', 'binding_name', 'model_name', name='uq_generation_daily_stat'),
+        Index('ix_generation_daily_stats_day', 'day'),
+    )
@@ -0,0 +1,105 @@
+# backend/discussion_branch_index.py
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from lollms_client import LollmsDataManager
+
+# Databases whose messages.parent_id index has been checked in this process
+_indexed_engines = set()
+_indexed_lock = threading.Lock()
+
+_BRANCH_CHAIN_SQL = text("""
+    WITH RECURSIVE chain(id, parent_id, depth) AS (
+        SELECT id, parent_id, 0 FROM messages WHERE id = :start_id AND discussion_id = :discussion_id
+        UNION ALL
+        SELECT m.id, m.parent_id, chain.depth + 1
+        FROM messages m JOIN chain ON m.id = chain.parent_id
+        WHERE chain.depth < :max_depth AND m.discussion_id = :discussion_id
+    )
+    SELECT id, parent_id FROM chain ORDER BY depth
+""")
+
+
+def ensure_branch_index(dm: LollmsDataManager):
+    """
+    Makes sure the user's discussions.db has the parent_id index branch pages rely on.
+
+    lollms_client declares it, but databases created before the column was indexed
+    never got it (create_all does not add indexes to existing tables). SQLite keeps
+    the index up to date on every message insert and delete.
+    """
+    key = str(dm.engine.url)
+    with _indexed_lock:
+        if key in _indexed_engines:
+            return
+        with dm.engine.begin() as connection:
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_messages_parent_id ON messages (parent_id)"))
+        _indexed_engines.add(key)
+
+
+def _message_view(row) -> SimpleNamespace:
+    """Detached copy of a message row with the attribute names of LollmsMessage."""
+    return SimpleNamespace(
+        id=row.id, sender=row.sender, sender_type=row.sender_type, content=row.content or "",
+        parent_id=row.parent_id, binding_name=row.binding_name, model_name=row.model_name,
+        tokens=row.tokens, metadata=row.message_metadata or {}, images=row.images,
+        active_images=row.active_images, created_at=row.created_at
+    )
+
+
+def load_branch_page(
+    dm: LollmsDataManager, discussion_id: str, tip_id: Optional[str],
+    before: Optional[str] = None, limit: int = 100
+) -> Tuple[Optional[str], List[SimpleNamespace], Dict[str, List[str]], bool]:
+    """
+    Reads one page of a branch straight from the user's discussions.db.
+
+    Walks at most `limit` ancestors up from `tip_id` (or from the parent of `before`,
+    the oldest message of the previous page), then fetches the children of the
+    page's parents through the parent_id index to find branch points. Nothing
+    outside the page is loaded. Returns (tip actually used, messages oldest first,
+    children by parent id, whether older messages exist).
+    """
+    ensure_branch_index(dm)
+    with dm.get_session() as session:
+        MessageModel = dm.MessageModel
+        if tip_id is None:
+            row = session.query(dm.DiscussionModel.active_branch_id).filter(dm.DiscussionModel.id == discussion_id).first()
+            tip_id = row[0] if row else None
+
+        if before:
+            row = session.query(MessageModel.parent_id).filter(MessageModel.id == before, MessageModel.discussion_id == discussion_id).first()
+            start_id = row[0] if row else None
+            if not start_id:
+                return tip_id, [], {}, False
+        else:
+            start_id = tip_id
+            exists = start_id and session.query(MessageModel.id).filter(MessageModel.id == start_id, MessageModel.discussion_id == discussion_id).first()
+            if not exists:
+                # Same fallback as LollmsDiscussion.get_branch: the most recent message
+                row = session.query(MessageModel.id).filter(MessageModel.discussion_id == discussion_id).order_by(MessageModel.created_at.desc()).first()
+                if not row:
+                    return tip_id, [], {}, False
+                start_id = tip_id = row[0]
+
+        chain = session.execute(_BRANCH_CHAIN_SQL, {"start_id": start_id, "discussion_id": discussion_id, "max_depth": limit}).fetchall()
+        # The walk goes one message past the page to tell whether older ones exist
+        has_more = len(chain) > limit
+        chain = chain[:limit]
+        ids = [row[0] for row in chain]
+
+        rows = {row.id: row for row in session.query(MessageModel).filter(MessageModel.id.in_(ids)).all()}
+        messages = [_message_view(rows[message_id]) for message_id in reversed(ids) if message_id in rows]
+
+        parent_ids = {m.parent_id for m in messages if m.parent_id}
+        children_map: Dict[str, List[str]] = {}
+        if parent_ids:
+            siblings = session.query(MessageModel.parent_id, MessageModel.id).filter(
+                MessageModel.parent_id.in_(parent_ids)
+            ).order_by(MessageModel.created_at).all()
+            for parent_id, child_id in siblings:
+                children_map.setdefault(parent_id, []).append(child_id)
+
+    return tip_id, messages, children_map, has_more
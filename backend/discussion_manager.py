@@ -1,15 +1,164 @@
 # backend/discussion_manager.py
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+
+from sqlalchemy import create_engine
+from ascii_colors import ASCIIColors
 from lollms_client import LollmsDataManager
 from backend.session import user_sessions, get_user_data_root
+from backend.settings import settings
+
+
+class DiscussionDbRegistry:
+    """
+    Process-wide registry of per-user LollmsDataManager instances.
+
+    Building a LollmsDataManager creates a SQLAlchemy engine and runs the
+    table creation / migration PRAGMAs against the user's discussions.db.
+    Doing that on every request dominates latency under load, so managers are
+    kept here, bounded in number (LRU) and closed after an idle period.
+    The manager itself is stateless apart from its engine and session factory,
+    so it is safe to share across requests and threads.
+    """
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _max_entries() -> int:
+        return max(1, int(settings.get("discussion_db_pool_max_entries", 128)))
+
+    @staticmethod
+    def _idle_timeout() -> float:
+        return float(settings.get("discussion_db_pool_idle_timeout", 600))
+
+    @staticmethod
+    def _build_manager(username: str) -> LollmsDataManager:
+        db_path = get_user_data_root(username) / "discussions.db"
+        db_url = f"sqlite:///{db_path.resolve()}"
+        manager = LollmsDataManager(db_path=db_url)
+
+        # Replace the default engine with one whose pool is sized for a shared
+        # per-user entry (several tabs / tasks hitting the same file).
+        pooled_engine = create_engine(
+            db_url,
+            connect_args={"check_same_thread": False, "timeout": 30.0},
+            pool_size=int(settings.get("discussion_db_pool_size", 5)),
+            max_overflow=int(settings.get("discussion_db_pool_max_overflow", 10)),
+            pool_recycle=3600,
+        )
+        old_engine = manager.engine
+        manager.engine = pooled_engine
+        manager.SessionLocal.configure(bind=pooled_engine)
+        old_engine.dispose()
+        return manager
+
+    @staticmethod
+    def _close(entry: Dict[str, Any]):
+        try:
+            # Connections still checked out by in-flight requests are discarded
+            # when they are returned; the manager keeps working if reused.
+            entry["manager"].engine.dispose()
+        except Exception as e:
+            ASCIIColors.warning(f"[DiscussionDB] Failed to dispose engine: {e}")
+
+    def _sweep_idle_locked(self, now: float):
+        timeout = self._idle_timeout()
+        if timeout <= 0:
+            return
+        expired = [u for u, e in self._entries.items() if now - e["last_used"] > timeout]
+        for username in expired:
+            self._close(self._entries.pop(username))
+            self.expirations += 1
+
+    def get(self, username: str) -> LollmsDataManager:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep > 60:
+                self._last_sweep = now
+                self._sweep_idle_locked(now)
+
+            entry = self._entries.get(username)
+            if entry is not None:
+                entry["last_used"] = now
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return entry["manager"]
+
+        # Build outside the lock: opening the DB and migrating may take a while.
+        manager = self._build_manager(username)
+
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None:
+                # Another thread won the race; keep its instance.
+                self._close({"manager": manager})
+                entry["last_used"] = now
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return entry["manager"]
+
+            self.misses += 1
+            self._entries[username] = {"manager": manager, "created_at": now, "last_used": now}
+            max_entries = self._max_entries()
+            while len(self._entries) > max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._close(evicted)
+                self.evictions += 1
+            return manager
+
+    def invalidate(self, username: str):
+        """Closes and forgets the manager of a user (e.g. account deleted or DB replaced)."""
+        with self._lock:
+            entry = self._entries.pop(username, None)
+        if entry:
+            self._close(entry)
+
+    def close_idle(self):
+        with self._lock:
+            self._sweep_idle_locked(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._close(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self._max_entries(),
+                "idle_timeout_seconds": self._idle_timeout(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": [
+                    {"username": u, "idle_seconds": round(now - e["last_used"], 1)}
+                    for u, e in reversed(self._entries.items())
+                ],
+            }
+
+
+discussion_db_registry = DiscussionDbRegistry()
+
 
 def get_user_discussion_manager(username: str) -> LollmsDataManager:
     """
-    Creates a new LollmsDataManager instance for a given user for each request.
-    This ensures that each request (e.g., from a different browser tab) has an
-    isolated discussion management context, preventing state mingling.
+    Returns the pooled LollmsDataManager for a given user.
+    Discussion objects built from it are still created per request, so
+    browser tabs keep isolated discussion contexts; only the engine is shared.
     """
-    user_data_path = get_user_data_root(username)
-    db_path = user_data_path / "discussions.db"
-    db_url = f"sqlite:///{db_path.resolve()}"
-    manager = LollmsDataManager(db_path=db_url)
-    return manager
\ No newline at end of file
+    return discussion_db_registry.get(username)
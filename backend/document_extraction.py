@@ -0,0 +1,439 @@
+# backend/document_extraction.py
+"""
+Text and image extraction from uploaded documents (PDF, DOCX, XLSX, PPTX, MSG, text).
+
+Parsing is CPU-bound and holds the GIL, so heavy formats can be run in a small
+process pool. Workers receive a file path rather than the file bytes and read the
+document themselves. This module deliberately avoids importing the web app so
+that spawned workers start quickly.
+"""
+import asyncio
+import base64
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from bs4 import BeautifulSoup
+from pptx import Presentation
+
+from backend.settings import settings
+
+# Try to import optional document parsing libraries
+try:
+    from docx2python import docx2python
+except ImportError:
+    docx2python = None
+try:
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+except ImportError:
+    MSO_SHAPE_TYPE = None
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+try:
+    import extract_msg
+except ImportError:
+    extract_msg = None
+try:
+    import fitz 
+except ImportError:
+    fitz = None
+
+# Formats worth the process hop; plain text and code are decoded in-process
+PROCESS_POOL_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".pptx", ".msg"}
+
+def _process_msg_attachment(att_bytes: bytes, att_name: str, images: List[str], extract_images: bool = True) -> Optional[str]:
+    """Helper to process a single attachment from an MSG file."""
+    att_ext = Path(att_name).suffix.lower()
+    
+    if att_ext in [".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tif", ".tiff"]:
+        if extract_images:
+            images.append(base64.b64encode(att_bytes).decode("utf-8"))
+        return None 
+    
+    try:
+        text_guess = att_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        try:
+            text_guess = att_bytes.decode("latin-1", errors="replace")
+        except Exception:
+            text_guess = ""
+    
+    CODE_EXTENSIONS = {
+        ".txt": "text", ".md": "markdown", ".py": "python", ".js": "javascript", ".ts": "typescript", ".html": "html", ".css": "css",
+        ".c": "c", ".cpp": "cpp", ".h": "cpp", ".hpp": "cpp", ".cs": "csharp", ".java": "java",
+        ".json": "json", ".xml": "xml", ".sh": "bash", ".vhd": "vhdl", ".v": "verilog",
+        ".rb": "ruby", ".php": "php", ".go": "go", ".rs": "rust", ".swift": "swift", ".kt": "kotlin",
+        ".yaml": "yaml", ".yml": "yaml", ".sql": "sql", ".log": "text", ".csv": "csv"
+    }
+    
+    if att_ext in CODE_EXTENSIONS:
+        lang = CODE_EXTENSIONS[att_ext]
+        return f"### Attachment: {att_name}\n\n````{lang}\n{text_guess}\n````"
+    
+    return f"- Attachment: {att_name} ({len(att_bytes)} bytes - content ignored)"
+
+
+def extract_text_from_file_bytes(file_bytes: bytes, filename: str, extract_images: bool = True) -> Tuple[str, List[str]]:
+    """
+    Extracts text and embedded/generated images (as base64) from file bytes.
+    Returns: (extracted_text, list_of_base64_images)
+    """
+    extension = Path(filename).suffix.lower()
+    
+    extracted_text = ""
+    images: List[str] = []
+    
+    # --- Document Type Handling ---
+    
+    if extension == ".pdf" and fitz:
+        try:
+            with fitz.open(stream=file_bytes, filetype="pdf") as pdf_doc:
+                text_parts = []
+                image_count = 0
+                for page in pdf_doc:
+                    text_parts.append(page.get_text())
+                    if extract_images:
+                        img_list = page.get_images(full=True)
+                        image_count += len(img_list)
+                        for img_info in img_list:
+                            xref = img_info[0]
+                            base_image = pdf_doc.extract_image(xref)
+                            images.append(base64.b64encode(base_image["image"]).decode('utf-8'))
+                extracted_text = "\n".join(text_parts).strip()
+                
+                if not extracted_text and image_count > 0:
+                    raise ValueError("This appears to be a scanned PDF with no text layer. LoLLMs cannot process it directly. Please use an OCR (Optical Character Recognition) tool to convert it to a text-based PDF or extract the text manually before uploading.")
+
+        except ValueError as e:
+             raise e
+        except Exception as e:
+            extracted_text = f"[Error processing PDF file: {e}. Is PyMuPDF (fitz) installed?]"
+            
+    elif extension == ".docx" and docx2python:
+        try:
+            with io.BytesIO(file_bytes) as docx_io:
+                result = docx2python(docx_io)
+                extracted_text = result.text
+                if result.images and extract_images:
+                    for image_bytes in result.images.values():
+                        images.append(base64.b64encode(image_bytes).decode("utf-8"))
+        except Exception as e:
+            extracted_text = f"[Error processing DOCX file: {e}. Is docx2python installed?]"
+            
+    elif (extension == ".xlsx" or "spreadsheetml" in filename.lower()) and pd:
+        try:
+            xls = pd.read_excel(io.BytesIO(file_bytes), sheet_name=None)
+            md_parts = []
+            for sheet_name, df in xls.items():
+                md_parts.append(f"### {sheet_name}\n\n{df.to_markdown(index=False)}")
+            extracted_text = "\n\n".join(md_parts)
+        except Exception as e:
+            extracted_text = f"[Error processing XLSX file: {e}. Is pandas installed?]"
+
+    elif extension == ".pptx" and MSO_SHAPE_TYPE:
+        try:
+            with io.BytesIO(file_bytes) as pptx_io:
+                prs = Presentation(pptx_io)
+                slide_texts: List[str] = []
+                for idx, slide in enumerate(prs.slides, start=1):
+                    slide_parts: List[str] = []
+                    for shape in slide.shapes:
+                        if hasattr(shape, "text"):
+                            txt = (shape.text or "").strip()
+                            if txt: slide_parts.append(txt)
+                        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE and extract_images:
+                            images.append(base64.b64encode(shape.image.blob).decode("utf-8"))
+                    if slide_parts: slide_texts.append(f"--- Slide {idx} ---\n" + "\n".join(slide_parts))
+                extracted_text = "\n\n".join(slide_texts)
+        except Exception as e:
+            extracted_text = f"[Error processing PPTX file: {e}]"
+            
+    elif extension == ".msg" and extract_msg:
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".msg") as tf:
+                tf.write(file_bytes)
+                temp_path = tf.name
+            try:
+                msg = extract_msg.Message(temp_path)
+                header_lines = []
+                if getattr(msg, "subject", ""): header_lines.append(f"# {getattr(msg, 'subject', '')}")
+                meta = []
+                if getattr(msg, "sender", None) or getattr(msg, "from_", None): meta.append(f"From: {getattr(msg, 'sender', None) or getattr(msg, 'from_', None)}")
+                if getattr(msg, "to", ""): meta.append(f"To: {getattr(msg, 'to', '')}")
+                if getattr(msg, "date", ""): meta.append(f"Date: {getattr(msg, 'date', '')}")
+                if meta: header_lines.append("\n".join(meta))
+                header = "\n\n".join(header_lines)
+
+                msg_body = (getattr(msg, "body", "") or "").strip()
+                if not msg_body and getattr(msg, "htmlBody", None):
+                    msg_body = BeautifulSoup(getattr(msg, "htmlBody"), "html.parser").get_text()
+
+                attachment_text_parts: List[str] = [header, msg_body]
+                for att in msg.attachments:
+                    text_part = _process_msg_attachment(att.data or b"", att.longFilename or att.shortFilename or "attachment", images, extract_images=extract_images)
+                    if text_part: attachment_text_parts.append(text_part)
+
+                extracted_text = "\n\n".join([p for p in attachment_text_parts if p.strip()])
+
+            finally:
+                os.unlink(temp_path)
+        except Exception as e:
+            extracted_text = f"[Error processing MSG file: {e}. Is extract_msg installed?]"
+
+    # 6. Plain Text / Code
+    else:
+        try:
+            extracted_text = file_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            extracted_text = file_bytes.decode('latin-1', errors='replace')
+
+    # Add markdown code fence for recognized code files
+    CODE_EXTENSIONS = {
+        ".py", ".js", ".ts", ".html", ".css", ".c", ".cpp", ".h", ".hpp", ".cs", ".java",
+        ".json", ".xml", ".sh", ".vhd", ".v", ".rb", ".php", ".go", ".rs", ".swift", ".kt",
+        ".yaml", ".yml", ".sql", ".log", ".csv", ".txt", ".md"
+    }
+    if extension in CODE_EXTENSIONS:
+        lang = extension.strip('.').replace('c++', 'cpp').replace('c#', 'csharp')
+        if not extracted_text.startswith('```'):
+            extracted_text = f"````{lang}\n{extracted_text}\n````"
+            
+    return extracted_text, images
+
+# --- Process pool ---
+
+class _JobTimeout(Exception):
+    """A job ran longer than its timeout in a worker (distinct from a TimeoutError raised by the job)."""
+
+
+class _ExtractionWorker:
+    """One spawned extraction process, driven over a pipe, running a single job at a time."""
+    def __init__(self, ready_timeout: float = 120):
+        # spawn: forking a multi-threaded server process is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        # Wait for the imports to finish so start-up never counts against a job's timeout
+        if not self.conn.poll(ready_timeout):
+            self.kill()
+            raise RuntimeError("The extraction worker did not start.")
+        self.conn.recv()
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def run(self, func: Callable, args: tuple, timeout: float) -> Any:
+        self.conn.send((func, args))
+        if not self.conn.poll(timeout):
+            raise _JobTimeout()
+        ok, value = self.conn.recv()
+        if ok:
+            return value
+        raise value
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+def _worker_main(conn):
+    """Loop of an extraction process: run jobs until told to stop."""
+    conn.send("ready")
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        func, args = job
+        try:
+            result = (True, func(*args))
+        except Exception as e:
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # The exception (or result) could not be pickled
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _ExtractionPool:
+    """
+    A fixed number of extraction processes handed out one job at a time.
+
+    A job's timeout starts when a worker picks it up, not when it is queued, and
+    a job that overruns only kills its own worker; the others keep running and a
+    replacement is spawned on demand.
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self._idle: List[_ExtractionWorker] = []
+        self._workers = set()
+        self._closed = False
+
+    def _acquire(self) -> _ExtractionWorker:
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("The extraction pool is shut down.")
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive():
+                        return worker
+                    self._workers.discard(worker)
+            worker = _ExtractionWorker()
+            with self._lock:
+                self._workers.add(worker)
+            return worker
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, worker: _ExtractionWorker, healthy: bool):
+        with self._lock:
+            if healthy and not self._closed:
+                self._idle.append(worker)
+                worker = None
+            else:
+                self._workers.discard(worker)
+        if worker is not None:
+            worker.kill()
+        self._slots.release()
+
+    def run(self, func: Callable, args: tuple, timeout: float) -> Any:
+        worker = self._acquire()
+        healthy = False
+        try:
+            result = worker.run(func, args, timeout)
+            healthy = True
+            return result
+        except _JobTimeout:
+            # The worker is still busy with the job: it is killed on release
+            raise
+        except (EOFError, OSError) as e:
+            raise BrokenProcessPool(str(e))
+        except Exception:
+            # Raised by the job itself and sent back, the worker is still usable
+            healthy = worker.alive()
+            raise
+        finally:
+            self._release(worker, healthy)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            workers, self._workers, self._idle = list(self._workers), set(), []
+        for worker in workers:
+            worker.stop()
+
+
+_pool: Optional[_ExtractionPool] = None
+_pool_lock = threading.Lock()
+
+def _pool_size() -> int:
+    """Number of extraction processes, 0 disables the pool (in-process extraction)."""
+    return max(0, int(settings.get("document_extraction_workers", min(2, os.cpu_count() or 1))))
+
+def _timeout_for(size_bytes: int) -> float:
+    base = float(settings.get("document_extraction_timeout_base_seconds", 30))
+    per_mb = float(settings.get("document_extraction_timeout_per_mb_seconds", 5))
+    return base + per_mb * (size_bytes / (1024 * 1024))
+
+def _get_pool() -> Optional[_ExtractionPool]:
+    global _pool
+    size = _pool_size()
+    if size <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = _ExtractionPool(size)
+        return _pool
+
+def shutdown_extraction_pool():
+    """Stops the extraction processes. Called on application shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+def _extract_file_worker(path: str, filename: str, extract_images: bool) -> Tuple[str, List[str]]:
+    """Runs in a pool process: reads the file from disk and extracts it."""
+    return extract_text_from_file_bytes(Path(path).read_bytes(), filename, extract_images)
+
+def run_in_extraction_pool(func: Callable, path: Union[str, Path], *args) -> Any:
+    """
+    Runs func(path, *args) in the extraction pool (or inline when the pool is disabled)
+    with a timeout derived from the file size, counted from the moment a worker starts
+    the job. `func` must be a picklable module-level function. Raises TimeoutError if
+    the call exceeds its timeout; only the worker running it is killed.
+    """
+    path = Path(path)
+    pool = _get_pool()
+    if pool is None:
+        return func(str(path), *args)
+
+    timeout = _timeout_for(path.stat().st_size)
+    try:
+        return pool.run(func, (str(path),) + args, timeout)
+    except _JobTimeout:
+        raise TimeoutError(f"Extraction of '{path.name}' exceeded {timeout:.0f}s and was aborted.")
+    except BrokenProcessPool:
+        raise RuntimeError(f"The extraction worker crashed while processing '{path.name}'.")
+
+def extract_text_from_file(path: Union[str, Path], filename: Optional[str] = None, extract_images: bool = True) -> Tuple[str, List[str]]:
+    """
+    Extracts text and images from a file on disk, using the process pool for heavy formats.
+    Blocks the calling thread (not the interpreter) until the result is ready.
+    """
+    path = Path(path)
+    filename = filename or path.name
+    extension = Path(filename).suffix.lower()
+    if extension not in PROCESS_POOL_EXTENSIONS and "spreadsheetml" not in filename.lower():
+        return extract_text_from_file_bytes(path.read_bytes(), filename, extract_images)
+    return run_in_extraction_pool(_extract_file_worker, path, filename, extract_images)
+
+def _parse_for_indexing_worker(path: str) -> str:
+    from safe_store.indexing import parser
+    return parser.parse_document(path)
+
+def parse_document_for_indexing(path: Union[str, Path]) -> str:
+    """
+    Parses a document with SafeStore's own parser, as SafeStore.add_document would,
+    but in the extraction pool. Lets RAG ingestion parse several files in parallel.
+    """
+    return run_in_extraction_pool(_parse_for_indexing_worker, path)
+
+async def extract_text_from_file_async(path: Union[str, Path], filename: Optional[str] = None, extract_images: bool = True) -> Tuple[str, List[str]]:
+    """Async wrapper of extract_text_from_file that keeps the event loop free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, extract_text_from_file, path, filename, extract_images)
@@ -3,7 +3,12 @@ import sys
 import importlib
 import json
 import os
-from typing import Dict, Any, List, Optional
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from types import CodeType, SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from ascii_colors import ASCIIColors
 
@@ -13,6 +18,58 @@ from backend.db.models.user import User as DBUser
 from backend.session import build_lollms_client_from_params
 from backend.settings import settings
 
+COMPILED_NODES_MAX_ENTRIES = 256
+
+# (definition id, sha256 of class name + code) -> (is_safe, error message, compiled code or None)
+_compiled_nodes: "OrderedDict[Tuple[str, str], Tuple[bool, str, Optional[CodeType]]]" = OrderedDict()
+_compiled_nodes_lock = threading.Lock()
+# Requirements already found installed (or installed) by this process
+_satisfied_requirements = set()
+_requirements_lock = threading.Lock()
+
+
+def _definition_digest(node_def) -> str:
+    return hashlib.sha256(f"{node_def.class_name}\0{node_def.code}".encode("utf-8")).hexdigest()
+
+
+def _compile_node_definition(node_def) -> Tuple[bool, str, Optional[CodeType]]:
+    """
+    Security verdict and compiled code of a node definition, cached per process.
+
+    The key includes a hash of the code, so editing a definition invalidates its
+    entry without any explicit eviction. Compilation errors are not cached and are
+    raised again on the next run with their traceback.
+    """
+    key = (node_def.id, _definition_digest(node_def))
+    with _compiled_nodes_lock:
+        cached = _compiled_nodes.get(key)
+        if cached is not None:
+            _compiled_nodes.move_to_end(key)
+            return cached
+
+    # --- RUNTIME SECURITY CHECK (High-Speed AST-Only Analysis) ---
+    from backend.security import verify_custom_node_code
+    is_safe, error_msg = verify_custom_node_code(node_def.code, lollms_client=None)
+    # Compile code with a filename for better tracebacks
+    compiled_code = compile(node_def.code, f"node_logic:{node_def.name}", "exec") if is_safe else None
+
+    entry = (is_safe, error_msg, compiled_code)
+    with _compiled_nodes_lock:
+        _compiled_nodes[key] = entry
+        _compiled_nodes.move_to_end(key)
+        while len(_compiled_nodes) > COMPILED_NODES_MAX_ENTRIES:
+            _compiled_nodes.popitem(last=False)
+    return entry
+
+
+def _definition_snapshot(node_def: FlowNodeDefinition) -> SimpleNamespace:
+    """Detached copy of the fields the engine needs, usable after the session is closed and from any thread."""
+    return SimpleNamespace(
+        id=node_def.id, name=node_def.name, label=node_def.label, code=node_def.code,
+        class_name=node_def.class_name, requirements=list(node_def.requirements or [])
+    )
+
+
 class FlowEngine:
     """
     Executes a graph-based workflow defined by the Flow Studio.
@@ -24,6 +81,8 @@ class FlowEngine:
         self.results = {}
         self.db_session_factory = db_session_module.SessionLocal
         self._lollms_client = None
+        self._client_lock = threading.Lock()
+        self._definitions: Dict[str, SimpleNamespace] = {}
         self._is_admin = False
         
         # Determine if user is admin once
@@ -38,135 +97,192 @@ class FlowEngine:
     @property
     def lollms_client(self):
         """Lazy load the client with all user-configured capabilities enabled."""
-        if not self._lollms_client:
-            # Explicitly load all capabilities so nodes have access to TTI, TTS, etc.
-            self._lollms_client = build_lollms_client_from_params(
-                self.username, 
-                load_llm=True, 
-                load_tti=True, 
-                load_tts=True, 
-                load_stt=True
-            )
+        # Nodes of parallel branches may ask for it at the same time
+        with self._client_lock:
+            if not self._lollms_client:
+                # Explicitly load all capabilities so nodes have access to TTI, TTS, etc.
+                self._lollms_client = build_lollms_client_from_params(
+                    self.username, 
+                    load_llm=True, 
+                    load_tti=True, 
+                    load_tts=True, 
+                    load_stt=True
+                )
         return self._lollms_client
 
     def _ensure_requirements(self, node_def: FlowNodeDefinition):
-        """Uses pipmaster to dynamically install requirements if missing."""
+        """Uses pipmaster to dynamically install requirements if missing, once per requirement and process."""
         if not node_def.requirements:
             return
 
+        missing = [req for req in node_def.requirements if req not in _satisfied_requirements]
+        if not missing:
+            return
+
         import pipmaster
-        for req in node_def.requirements:
-            if not pipmaster.is_installed(req):
-                ASCIIColors.info(f"FlowEngine: Installing requirement '{req}' for node '{node_def.label}'...")
-                pipmaster.install(req)
+        # Serialized so two branches never pip-install the same package concurrently
+        with _requirements_lock:
+            for req in missing:
+                if req in _satisfied_requirements:
+                    continue
+                if not pipmaster.is_installed(req):
+                    ASCIIColors.info(f"FlowEngine: Installing requirement '{req}' for node '{node_def.label}'...")
+                    pipmaster.install(req)
+                _satisfied_requirements.add(req)
 
-    def execute_node_isolated(self, node_id: str, graph_data: Dict[str, Any], inputs: Dict[str, Any]):
-        """Executes a single node, resolving its logic from the database."""
+    def _load_definitions(self, node_types):
+        """Fetches the definitions of all the given node types in one query."""
+        wanted = {t for t in node_types if t and t not in self._definitions}
+        if not wanted:
+            return
         db = self.db_session_factory()
         try:
-            # 1. Find Node in graph
-            node_in_graph = next((n for n in graph_data['nodes'] if n['id'] == node_id), None)
-            if not node_in_graph:
-                raise ValueError(f"Node {node_id} not found in graph data.")
-
-            # 2. Load definition from DB
-            node_def = db.query(FlowNodeDefinition).filter(FlowNodeDefinition.name == node_in_graph['type']).first()
-            if not node_def:
-                raise ValueError(f"Definition for node type '{node_in_graph['type']}' not found.")
-
-            # --- RUNTIME SECURITY CHECK (High-Speed AST-Only Analysis) ---
-            from backend.security import verify_custom_node_code
-            is_safe, error_msg = verify_custom_node_code(node_def.code, lollms_client=None)
-            if not is_safe:
-                raise RuntimeError(f"Security Rejection: {error_msg}")
-
-            # 3. Handle Dependencies
-            self._ensure_requirements(node_def)
-
-            # 4. Instantiate & Execute
-            local_scope = {}
-            try:
-                # Compile code with a filename for better tracebacks
-                compiled_code = compile(node_def.code, f"node_logic:{node_def.name}", "exec")
-                exec(compiled_code, {"__builtins__": {}}, local_scope)
-            except Exception as e:
-                error_msg = f"Syntax/Compilation Error in node '{node_def.label}': {str(e)}"
-                if self._is_admin:
-                    error_msg += f"\n\nTraceback:\n{traceback.format_exc()}"
-                raise RuntimeError(error_msg)
-            
-            NodeClass = local_scope.get(node_def.class_name)
-            if not NodeClass:
-                raise ValueError(f"Class '{node_def.class_name}' not found in node code.")
-
-            # Context provided to the node
-            class NodeContext:
-                def __init__(self, engine, owner):
-                    self.engine = engine
-                    self.lollms_client = engine.lollms_client
-                    self.owner_username = owner
-
-                def get_client(self, model_name=None):
-                    if not model_name:
-                        return self.lollms_client
-                    return build_lollms_client_from_params(self.owner_username, model_name=model_name, load_tti=True, load_tts=True)
-
-            context = NodeContext(self, self.username)
-            instance = NodeClass()
-            
-            combined_inputs = {**(node_in_graph.get('data', {})), **inputs}
-            
-            try:
-                return instance.execute(combined_inputs, context)
-            except Exception as e:
-                # Enhance debugging for admins
-                error_prefix = f"Runtime Error in node '{node_def.label}': "
-                if self._is_admin:
-                    tb = traceback.format_exc()
-                    raise RuntimeError(f"{error_prefix}{str(e)}\n\nDetailed Traceback:\n{tb}")
-                else:
-                    raise RuntimeError(f"{error_prefix}{str(e)}")
-
+            for node_def in db.query(FlowNodeDefinition).filter(FlowNodeDefinition.name.in_(wanted)).all():
+                self._definitions[node_def.name] = _definition_snapshot(node_def)
         finally:
             db.close()
 
+    def _get_definition(self, node_type: str) -> SimpleNamespace:
+        if node_type not in self._definitions:
+            self._load_definitions([node_type])
+        node_def = self._definitions.get(node_type)
+        if not node_def:
+            raise ValueError(f"Definition for node type '{node_type}' not found.")
+        return node_def
+
+    def execute_node_isolated(self, node_id: str, graph_data: Dict[str, Any], inputs: Dict[str, Any]):
+        """Executes a single node, resolving its logic from the database."""
+        # 1. Find Node in graph
+        node_in_graph = next((n for n in graph_data['nodes'] if n['id'] == node_id), None)
+        if not node_in_graph:
+            raise ValueError(f"Node {node_id} not found in graph data.")
+        return self._execute_node(node_in_graph, inputs)
+
+    def _execute_node(self, node_in_graph: Dict[str, Any], inputs: Dict[str, Any]):
+        # 2. Load definition (cached for the lifetime of the engine)
+        node_def = self._get_definition(node_in_graph['type'])
+
+        # 3. Security verdict and compiled code (cached per definition version)
+        try:
+            is_safe, error_msg, compiled_code = _compile_node_definition(node_def)
+        except Exception as e:
+            error_msg = f"Syntax/Compilation Error in node '{node_def.label}': {str(e)}"
+            if self._is_admin:
+                error_msg += f"\n\nTraceback:\n{traceback.format_exc()}"
+            raise RuntimeError(error_msg)
+        if not is_safe:
+            raise RuntimeError(f"Security Rejection: {error_msg}")
+
+        # 4. Handle Dependencies
+        self._ensure_requirements(node_def)
+
+        # 5. Instantiate & Execute
+        local_scope = {}
+        try:
+            exec(compiled_code, {"__builtins__": {}}, local_scope)
+        except Exception as e:
+            error_msg = f"Syntax/Compilation Error in node '{node_def.label}': {str(e)}"
+            if self._is_admin:
+                error_msg += f"\n\nTraceback:\n{traceback.format_exc()}"
+            raise RuntimeError(error_msg)
+
+        NodeClass = local_scope.get(node_def.class_name)
+        if not NodeClass:
+            raise ValueError(f"Class '{node_def.class_name}' not found in node code.")
+
+        # Context provided to the node
+        class NodeContext:
+            def __init__(self, engine, owner):
+                self.engine = engine
+                self.lollms_client = engine.lollms_client
+                self.owner_username = owner
+
+            def get_client(self, model_name=None):
+                if not model_name:
+                    return self.lollms_client
+                return build_lollms_client_from_params(self.owner_username, model_name=model_name, load_tti=True, load_tts=True)
+
+        context = NodeContext(self, self.username)
+        instance = NodeClass()
+
+        combined_inputs = {**(node_in_graph.get('data', {})), **inputs}
+
+        try:
+            return instance.execute(combined_inputs, context)
+        except Exception as e:
+            # Enhance debugging for admins
+            error_prefix = f"Runtime Error in node '{node_def.label}': "
+            if self._is_admin:
+                tb = traceback.format_exc()
+                raise RuntimeError(f"{error_prefix}{str(e)}\n\nDetailed Traceback:\n{tb}")
+            else:
+                raise RuntimeError(f"{error_prefix}{str(e)}")
+
     def execute_graph(self, graph_data: Dict[str, Any]):
-        """Runs the whole graph by resolving dependencies."""
+        """
+        Runs the whole graph in dependency order.
+
+        Kahn's algorithm: each node keeps a count of incoming edges whose source has
+        not finished yet, and is submitted as soon as it drops to zero. Independent
+        branches therefore run concurrently, at most `flow_max_parallel_nodes` nodes
+        at a time. The first node failure cancels the nodes not started yet and is
+        raised once the running ones have finished.
+        """
         self.results = {}
         nodes = graph_data.get('nodes', [])
         edges = graph_data.get('edges', [])
+        if not nodes:
+            return self.results
 
-        executed_nodes = set()
-        
-        while len(executed_nodes) < len(nodes):
-            progress_made = False
-            for node in nodes:
-                if node['id'] in executed_nodes:
-                    continue
+        node_map = {node['id']: node for node in nodes}
+        incoming = defaultdict(list)
+        outgoing = defaultdict(list)
+        in_degree = {node_id: 0 for node_id in node_map}
+        for edge in edges:
+            if edge['target'] not in node_map:
+                continue
+            incoming[edge['target']].append(edge)
+            outgoing[edge['source']].append(edge['target'])
+            in_degree[edge['target']] += 1
+
+        self._load_definitions(node['type'] for node in nodes)
+
+        def gather_inputs(node_id):
+            node_inputs = {}
+            for edge in incoming[node_id]:
+                source_res = self.results[edge['source']]
+                if isinstance(source_res, dict) and edge['sourceHandle'] in source_res:
+                    node_inputs[edge['targetHandle']] = source_res[edge['sourceHandle']]
+            return node_inputs
+
+        ready = deque(node['id'] for node in nodes if in_degree[node['id']] == 0)
+        max_parallel = max(1, int(settings.get("flow_max_parallel_nodes", 4)))
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="flow-node") as pool:
+            while ready or running:
+                while ready and len(running) < max_parallel:
+                    node_id = ready.popleft()
+                    node = node_map[node_id]
+                    ASCIIColors.info(f"FlowEngine: Executing node {node_id} ({node['type']})...")
+                    # _execute_node handles its own internal error wrapping
+                    running[pool.submit(self._execute_node, node, gather_inputs(node_id))] = node_id
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        for pending in running:
+                            pending.cancel()
+                        raise error
+                    self.results[node_id] = future.result()
+                    for target_id in outgoing[node_id]:
+                        in_degree[target_id] -= 1
+                        if in_degree[target_id] == 0:
+                            ready.append(target_id)
 
-                incoming_edges = [e for e in edges if e['target'] == node['id']]
-                can_execute = True
-                node_inputs = {}
-
-                for edge in incoming_edges:
-                    source_id = edge['source']
-                    if source_id not in self.results:
-                        can_execute = False
-                        break
-                    
-                    source_res = self.results[source_id]
-                    if isinstance(source_res, dict) and edge['sourceHandle'] in source_res:
-                        node_inputs[edge['targetHandle']] = source_res[edge['sourceHandle']]
-                
-                if can_execute:
-                    ASCIIColors.info(f"FlowEngine: Executing node {node['id']} ({node['type']})...")
-                    # execute_node_isolated handles its own internal error wrapping
-                    self.results[node['id']] = self.execute_node_isolated(node['id'], graph_data, node_inputs)
-                    executed_nodes.add(node['id'])
-                    progress_made = True
-
-            if not progress_made and len(executed_nodes) < len(nodes):
-                unexecuted = [n['id'] for n in nodes if n['id'] not in executed_nodes]
-                raise RuntimeError(f"Workflow stalled. Unmet dependencies or circular loop for nodes: {unexecuted}")
+        if len(self.results) < len(nodes):
+            unexecuted = [n['id'] for n in nodes if n['id'] not in self.results]
+            raise RuntimeError(f"Workflow stalled. Unmet dependencies or circular loop for nodes: {unexecuted}")
 
         return self.results
@@ -70,6 +70,11 @@ from backend.session import (get_current_active_user,
                              build_lollms_client_from_params)
 from backend.task_manager import task_manager, Task
 from backend.ws_manager import manager
+from backend.utils import record_generation_stat
+from backend.rag_executor import rag_executor
+from backend.rag_query_cache import rag_query_cache
+from backend.image_blob_store import image_blob_store
+from backend.generation.stream_encoder import NDJSONStreamEncoder
 from backend.routers.discussion.helpers import get_discussion_and_owner_for_request
 from backend.tasks.image_generation_tasks import _generate_slides_task
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -92,7 +97,8 @@ import pipmaster as pm
 def build_rag_tool(
     safe_store_instance,       # The safe store instance
     owner_db_user,             # User with RAG settings
-    current_user               # Fallback user for default settings
+    current_user,              # Fallback user for default settings
+    datastore_id=None          # Key for the shared query-result cache
 ):
     """
     Builds a RAG tool for the chat() function.
@@ -101,6 +107,7 @@ def build_rag_tool(
         safe_store_instance: The initialized semantic search/RAG instance
         owner_db_user: User object containing rag_top_k and rag_min_sim_percent
         current_user: Fallback user for default RAG settings
+        datastore_id: Datastore id used to share cached query results (no caching if None)
     
     Returns:
         Dict tool definition compatible with the chat() tools parameter
@@ -118,7 +125,11 @@ def build_rag_tool(
                 rag_min_similarity_percent = owner_db_user.rag_min_sim_percent if owner_db_user.rag_min_sim_percent is not None else \
                                             (current_user.rag_min_sim_percent if current_user.rag_min_sim_percent is not None else 50)
             
-            retrieved_chunks = ss.query(query, top_k=rag_top_k, min_similarity_percent=rag_min_similarity_percent)
+            retrieved_chunks = rag_query_cache.query(
+                datastore_id, query, rag_top_k, rag_min_similarity_percent,
+                run_query=lambda: rag_executor.call("chat_tool", ss.query, query, top_k=rag_top_k, min_similarity_percent=rag_min_similarity_percent),
+                embed=lambda text: rag_executor.call("chat_tool_embed", ss.vectorize_text, text)
+            )
             revamped_chunks = []
             
             for entry in retrieved_chunks:
@@ -561,7 +572,8 @@ def process_slide_generation_tags(text: str, user: DBUser, db: Session, discussi
                     target=_generate_slides_task,
                     args=(user.username, discussion_obj.id, message_id, final_slides_arg, width, height),
                     description=task_description,
-                    owner_username=user.username
+                    owner_username=user.username,
+                    priority="interactive"
                 )
                 triggered_task_id = new_task.id
                 
@@ -920,6 +932,9 @@ def process_herd_logic(
     2. Answer Crafting (Leader Draft)
     3. Post-code Brainstorming (Critique)
     4. Final Answer (Leader Final)
+
+    Agents of a round see the same context and run concurrently, at most
+    `herd_max_parallel_agents` at a time; their outputs are appended in crew order.
     """
     precode_crew = []
     postcode_crew = []
@@ -1035,8 +1050,18 @@ Return ONLY a valid JSON object. No markdown formatting.
 
     full_context_history = f"Discussion History:\n{history_text}\n\n[Current Task]: {prompt}\n\n"
     
-    # Helper to run an agent
-    def run_agent(agent_def, context, phase_name, round_num):
+    def emit(payload, log=False):
+        if log and all_events is not None:
+            all_events.append(payload)
+        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder(payload)) + "\n")
+
+    # Agents are resolved once per turn (DB lookups happen here, on this thread) and reused across rounds
+    personality_prompts: Dict[str, Optional[str]] = {}
+    agent_clients: Dict[Tuple[Optional[str], Optional[str]], Any] = {}
+    default_binding = None
+
+    def resolve_agent(agent_def, phase_name):
+        nonlocal default_binding
         model_full = agent_def.get('model')
         
         # Dynamic agents have explicit system prompts
@@ -1052,7 +1077,8 @@ Return ONLY a valid JSON object. No markdown formatting.
             binding_alias, model_name = model_full.split('/', 1)
         elif not model_full:
              # Fallback default
-             default_binding = db_session.query(DBLLMBinding).filter(DBLLMBinding.is_active == True).first()
+             if default_binding is None:
+                 default_binding = db_session.query(DBLLMBinding).filter(DBLLMBinding.is_active == True).first() or False
              if default_binding:
                  binding_alias = default_binding.alias
                  model_name = default_binding.default_model_name
@@ -1066,115 +1092,166 @@ Return ONLY a valid JSON object. No markdown formatting.
             # Static Logic: Load from DB
             sys_prompt = f"You are participating in a {phase_name} session."
             if persona_name:
-                pers = db_session.query(DBPersonality).filter(
-                    (DBPersonality.name == persona_name) | (DBPersonality.id == persona_name)
-                ).first()
-                if pers:
-                    sys_prompt = pers.prompt_text
+                if persona_name not in personality_prompts:
+                    pers = db_session.query(DBPersonality).filter(
+                        (DBPersonality.name == persona_name) | (DBPersonality.id == persona_name)
+                    ).first()
+                    personality_prompts[persona_name] = pers.prompt_text if pers else None
+                if personality_prompts[persona_name] is not None:
+                    sys_prompt = personality_prompts[persona_name]
             
             if phase_name == "Pre-code Brainstorming":
                 sys_prompt += "\n\nTask: Brainstorm ideas, architecture, and high-level solutions for the user's request. Do not write full code yet. Critique previous ideas if any."
             elif phase_name == "Post-code Critique":
                 sys_prompt += "\n\nTask: Review the proposed solution/code. Look for bugs, security issues, logic errors, or missing requirements. Be critical but constructive."
 
-        # Emit step start using the standard ID-based schema required by the UI for tracking progress
-        step_id = str(uuid.uuid4())
-        step_start_payload = {
-            "type": "step_start", 
-            "content": f"**{display_name}** ({phase_name} Round {round_num})",
-            "id": step_id
-        }
-        if all_events is not None:
-            all_events.append(step_start_payload)
-        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder(step_start_payload)) + "\n")
+        client_key = (binding_alias, model_name)
+        if client_key not in agent_clients:
+            try:
+                agent_clients[client_key] = build_lollms_client_from_params(
+                    username=user.username,
+                    binding_alias=binding_alias,
+                    model_name=model_name,
+                    load_llm=True,
+                    load_tti=False,
+                    load_tts=False,
+                    load_stt=False,
+                    load_mcp=False
+                )
+            except Exception as e:
+                agent_clients[client_key] = e
+        return {"display_name": display_name, "sys_prompt": sys_prompt, "client_key": client_key}
+
+    def call_agent(agent, context):
+        client = agent_clients[agent["client_key"]]
+        if isinstance(client, Exception):
+            raise client
+        return client.generate_text(
+            context, 
+            system_prompt=agent["sys_prompt"],
+            max_new_tokens=1024,
+            temperature=0.7
+        )
 
-        try:
-            temp_client = build_lollms_client_from_params(
-                username=user.username,
-                binding_alias=binding_alias,
-                model_name=model_name,
-                load_llm=True,
-                load_tti=False,
-                load_tts=False,
-                load_stt=False,
-                load_mcp=False
-            )
-            
-            response = temp_client.generate_text(
-                context, 
-                system_prompt=sys_prompt,
-                max_new_tokens=1024,
-                temperature=0.7
-            )
-            
-            # Emit step end with result content, matching the ID to close the UI step correctly
-            step_end_payload = {"type": "step_end", "content": f"Response from {display_name} received.", "id": step_id}
-            if all_events is not None:
-                all_events.append(step_end_payload)
-            main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder(step_end_payload)) + "\n")
-            return f"\n\n[{phase_name} - {display_name}]:\n{response}"
-        except Exception as e:
-            err = f"Agent {display_name} failed: {e}"
-            print(err)
-            main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder({"type": "step_end", "content": err, "status": "error"})) + "\n")
-            return f"\n\n[{phase_name} - {display_name}]: [FAILED]"
-
-    # --- PHASE 1: Pre-code Brainstorming ---
-    if precode_crew:
-        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder({"type": "info", "content": "Phase 1: Pre-code Brainstorming"})) + "\n")
-        
+    def run_round(crew, context, phase_name, round_num, executor):
+        """
+        Runs the agents of one round concurrently on the same context (they are independent
+        within a round) and returns their contributions in crew order. Step events are
+        emitted in crew order too, whatever the completion order.
+        """
+        steps = []
+        for agent in crew:
+            # Emit step start using the standard ID-based schema required by the UI for tracking progress
+            step_id = str(uuid.uuid4())
+            emit({"type": "step_start", "content": f"**{agent['display_name']}** ({phase_name} Round {round_num})", "id": step_id}, log=True)
+            steps.append((agent, step_id, executor.submit(call_agent, agent, context)))
+
+        outputs = []
+        for agent, step_id, future in steps:
+            display_name = agent["display_name"]
+            try:
+                response = future.result()
+                # Emit step end with result content, matching the ID to close the UI step correctly
+                emit({"type": "step_end", "content": f"Response from {display_name} received.", "id": step_id}, log=True)
+                outputs.append(f"\n\n[{phase_name} - {display_name}]:\n{response}")
+            except Exception as e:
+                err = f"Agent {display_name} failed: {e}"
+                print(err)
+                emit({"type": "step_end", "content": err, "status": "error", "id": step_id})
+                outputs.append(f"\n\n[{phase_name} - {display_name}]: [FAILED]")
+        return outputs
+
+    def run_phase(crew_defs, phase_name, ready_message, executor):
+        nonlocal full_context_history
+        crew = [resolve_agent(agent_def, phase_name) for agent_def in crew_defs]
         for r in range(rounds):
-            all_ready = True
-            for agent in precode_crew:
-                out = run_agent(agent, full_context_history, "Pre-code Brainstorming", r+1)
-                full_context_history += out
-                
-                if "<ready/>" not in out.lower():
-                    all_ready = False
+            outputs = run_round(crew, full_context_history, phase_name, r+1, executor)
+            full_context_history += "".join(outputs)
+            all_ready = all("<ready/>" in out.lower() for out in outputs)
             
             if all_ready and r > 0:
-                main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder({"type": "info", "content": "All agents ready. Proceeding."})) + "\n")
+                emit({"type": "info", "content": ready_message})
                 break
-        
-    # --- PHASE 2: Answer Crafting (Leader Draft) ---
-    draft_start = {"type": "step_start", "content": "Phase 2: Leader drafting solution..."}
-    if all_events is not None: all_events.append(draft_start)
-    main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder(draft_start)) + "\n")
-    
-    leader_client = get_user_lollms_client(user.username)
-    leader_prompt = f"{full_context_history}\n\n[INSTRUCTION]: Act as the Team Leader. Based on the brainstorming above, create a complete draft solution/implementation."
-    
-    try:
-        draft_response = leader_client.generate_text(leader_prompt, max_new_tokens=2048)
-        full_context_history += f"\n\n[Leader Draft]:\n{draft_response}"
-        draft_end = {"type": "step_end", "content": draft_response}
-        if all_events is not None: all_events.append(draft_end)
-        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder(draft_end)) + "\n")
-    except Exception as e:
-        full_context_history += f"\n\n[Leader Draft]: [FAILED] {e}"
-        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder({"type": "step_end", "content": f"Draft generation failed: {e}", "status": "error"})) + "\n")
 
-    # --- PHASE 3: Post-code Brainstorming ---
-    if postcode_crew:
-        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder({"type": "info", "content": "Phase 3: Post-code Critique"})) + "\n")
-        
-        for r in range(rounds):
-            all_ready = True
-            for agent in postcode_crew:
-                out = run_agent(agent, full_context_history, "Post-code Critique", r+1)
-                full_context_history += out
-                
-                if "<ready/>" not in out.lower():
-                    all_ready = False
+    from backend.settings import settings
+    max_parallel = max(1, int(settings.get("herd_max_parallel_agents", 4)))
+    with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="herd-agent") as herd_executor:
+        # --- PHASE 1: Pre-code Brainstorming ---
+        if precode_crew:
+            emit({"type": "info", "content": "Phase 1: Pre-code Brainstorming"})
+            run_phase(precode_crew, "Pre-code Brainstorming", "All agents ready. Proceeding.", herd_executor)
             
-            if all_ready and r > 0:
-                main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder({"type": "info", "content": "All agents satisfied."})) + "\n")
-                break
+        # --- PHASE 2: Answer Crafting (Leader Draft) ---
+        emit({"type": "step_start", "content": "Phase 2: Leader drafting solution..."}, log=True)
+        
+        leader_client = get_user_lollms_client(user.username)
+        leader_prompt = f"{full_context_history}\n\n[INSTRUCTION]: Act as the Team Leader. Based on the brainstorming above, create a complete draft solution/implementation."
+        
+        try:
+            draft_response = leader_client.generate_text(leader_prompt, max_new_tokens=2048)
+            full_context_history += f"\n\n[Leader Draft]:\n{draft_response}"
+            emit({"type": "step_end", "content": draft_response}, log=True)
+        except Exception as e:
+            full_context_history += f"\n\n[Leader Draft]: [FAILED] {e}"
+            emit({"type": "step_end", "content": f"Draft generation failed: {e}", "status": "error"})
+
+        # --- PHASE 3: Post-code Brainstorming ---
+        if postcode_crew:
+            emit({"type": "info", "content": "Phase 3: Post-code Critique"})
+            run_phase(postcode_crew, "Post-code Critique", "All agents satisfied.", herd_executor)
 
     # --- PHASE 4: Final Answer (Handled by caller) ---
     return full_context_history
 
 
+# Static parts of the /chat stream protocol, built once instead of per token
+_COALESCIBLE_STREAM_TYPES = {
+    MSG_TYPE.MSG_TYPE_CHUNK.value: "chunk",
+    MSG_TYPE.MSG_TYPE_CONTENT.value: "chunk",
+    MSG_TYPE.MSG_TYPE_THOUGHT_CHUNK.value: "thought",
+}
+_TEXT_STREAM_TYPES = {
+    **_COALESCIBLE_STREAM_TYPES,
+    MSG_TYPE.MSG_TYPE_NEW_MESSAGE.value: "new_message_id",
+}
+# Secondary content streams: content is the text fragment, params is metadata
+_SECONDARY_STREAM_TYPES = {
+    38: "artefact_chunk", 39: "artefact_done",
+    40: "note_chunk", 41: "note_done",
+    42: "skill_chunk", 43: "skill_done",
+    44: "widget_chunk", 45: "widget_done",
+}
+_PARAMS_STREAM_TYPES = {46: "form_ready", 47: "form_submitted"}
+_STREAM_HISTORY_EXCLUDED = frozenset({
+    "chunk", "thought", "new_message_id",
+    "artefact_chunk", "note_chunk", "skill_chunk", "widget_chunk"
+})
+
+def _build_stream_payload(mtype_val: int, chunk: Any, params: Any, content_len) -> Optional[Dict[str, Any]]:
+    """Maps a lollms_client streaming callback to a /chat NDJSON event; `content_len` is only called for positioned events."""
+    if mtype_val in _TEXT_STREAM_TYPES:
+        return {"type": _TEXT_STREAM_TYPES[mtype_val], "content": chunk}
+    if mtype_val in _SECONDARY_STREAM_TYPES:
+        return {"type": _SECONDARY_STREAM_TYPES[mtype_val], "content": chunk, "meta": params}
+    if mtype_val in _PARAMS_STREAM_TYPES:
+        return {"type": _PARAMS_STREAM_TYPES[mtype_val], "content": params}
+    event_id = params.get("id") if isinstance(params, dict) else None
+    if mtype_val == MSG_TYPE.MSG_TYPE_STEP_START.value:
+        return {"type": "step_start", "content": chunk, "id": event_id, "offset": content_len()}
+    if mtype_val == MSG_TYPE.MSG_TYPE_STEP_END.value:
+        return {"type": "step_end", "content": chunk, "id": event_id, "status": "done", "offset": content_len()}
+    if mtype_val == MSG_TYPE.MSG_TYPE_TOOL_CALL.value:
+        return {"type": "tool_call", "content": params if params else {"name": chunk}, "id": event_id, "offset": content_len()}
+    if mtype_val == MSG_TYPE.MSG_TYPE_TOOL_OUTPUT.value:
+        return {"type": "tool_output", "content": params if params else {"output": chunk}, "id": event_id, "offset": content_len()}
+    if mtype_val == MSG_TYPE.MSG_TYPE_SOURCES_LIST.value:
+        return {"type": "sources", "content": params if params else chunk}
+    # Multi-Level Cognitive Memory Events
+    if mtype_val == MSG_TYPE.MSG_TYPE_INFO.value:
+        info_type = params.get("type") if isinstance(params, dict) else None
+        return {"type": info_type if info_type in ("memory_update", "memory_dream") else "info", "content": chunk, "meta": params}
+    return None
+
 def build_llm_generation_router(router: APIRouter):
     @router.post("/{discussion_id}/chat")
     async def chat_in_existing_discussion(
@@ -1223,7 +1300,8 @@ def build_llm_generation_router(router: APIRouter):
             agentic_tools[ss.name] = build_rag_tool(
                 safe_store_instance=ss,
                 owner_db_user=owner_db_user,
-                current_user=current_user
+                current_user=current_user,
+                datastore_id=ds_id
             )
             
         search_sources_list =[]
@@ -1343,7 +1421,8 @@ def build_llm_generation_router(router: APIRouter):
                         target=_generate_slides_task,
                         args=(owner_username, discussion_obj.id, None, topic, width, height),
                         description=task_description,
-                        owner_username=owner_username
+                        owner_username=owner_username,
+                        priority="interactive"
                     )
                     main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder({"type": "info", "content": "Started slide generation task."})) + "\n")
                     return {"success": True, "task_id": new_task.id}
@@ -1442,7 +1521,11 @@ def build_llm_generation_router(router: APIRouter):
                             else:
                                 rag_min_sim_percent = current_user.rag_min_sim_percent
                                 
-                            retrieved_chunks = pers_ss.query(query, top_k=rag_top_k, min_similarity_percent=rag_min_sim_percent)
+                            retrieved_chunks = rag_query_cache.query(
+                                db_pers.data_source, query, rag_top_k, rag_min_sim_percent,
+                                run_query=lambda: rag_executor.call("chat_tool", pers_ss.query, query, top_k=rag_top_k, min_similarity_percent=rag_min_sim_percent),
+                                embed=lambda text: rag_executor.call("chat_tool_embed", pers_ss.vectorize_text, text)
+                            )
                             
                             if not retrieved_chunks:
                                 return ""
@@ -1563,6 +1646,7 @@ def build_llm_generation_router(router: APIRouter):
             
         main_loop = asyncio.get_running_loop()
         stream_queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        stream_encoder = NDJSONStreamEncoder(main_loop, stream_queue)
         stop_event = threading.Event()
         user_sessions.setdefault(current_user.username, {}).setdefault("active_generation_control", {})[discussion_id] = stop_event
 
@@ -1600,6 +1684,11 @@ def build_llm_generation_router(router: APIRouter):
                 start_time = time.time()
                 first_chunk_time = None
 
+                def current_content_len() -> int:
+                    # Only positioned events (steps, tool calls) need the tip length
+                    tip = discussion_obj.get_message(discussion_obj.active_branch_id)
+                    return len(tip.content) if tip else 0
+
                 def llm_callback(chunk: Any, msg_type: Any, params: Optional[Dict] = None, **kwargs) -> bool:
                     nonlocal first_chunk_time
                     if stop_event.is_set(): return False
@@ -1613,54 +1702,25 @@ def build_llm_generation_router(router: APIRouter):
                         else:
                             collected_sources.append(params)
 
-                    tip = discussion_obj.get_message(discussion_obj.active_branch_id)
-                    current_content_len = len(tip.content) if tip else 0
-
                     if mtype_val == MSG_TYPE.MSG_TYPE_CHUNK.value and first_chunk_time is None:
                         first_chunk_time = time.time()
                         ttft = (first_chunk_time - start_time) * 1000
-                        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps({"type": "ttft", "content": round(ttft, 2)}) + "\n")
+                        stream_encoder.emit({"type": "ttft", "content": round(ttft, 2)})
+
+                    structured = bool(params) and isinstance(params, dict) and ("type" in params or "processing_type" in params)
 
                     # Relay structural events if present in chunk metadata
                     if mtype_val == MSG_TYPE.MSG_TYPE_CHUNK.value and params and "type" in params:
-                        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder(params)) + "\n")
-
-                    payload_map = {
-                        MSG_TYPE.MSG_TYPE_NEW_MESSAGE.value: {"type": "new_message_id", "content": chunk},
-                        MSG_TYPE.MSG_TYPE_CHUNK.value: {"type": "chunk", "content": chunk},
-                        MSG_TYPE.MSG_TYPE_CONTENT.value: {"type": "chunk", "content": chunk}, 
-                        MSG_TYPE.MSG_TYPE_THOUGHT_CHUNK.value: {"type": "thought", "content": chunk},
-                        MSG_TYPE.MSG_TYPE_STEP_START.value: {"type": "step_start", "content": chunk, "id": (params or {}).get("id"), "offset": current_content_len},
-                        MSG_TYPE.MSG_TYPE_STEP_END.value: {"type": "step_end", "content": chunk, "id": (params or {}).get("id"), "status": "done", "offset": current_content_len},
-                        MSG_TYPE.MSG_TYPE_TOOL_CALL.value: {"type": "tool_call", "content": params if params else {"name": chunk}, "id": (params or {}).get("id"), "offset": current_content_len},
-                        MSG_TYPE.MSG_TYPE_TOOL_OUTPUT.value: {"type": "tool_output", "content": params if params else {"output": chunk}, "id": (params or {}).get("id"), "offset": current_content_len},
-                        MSG_TYPE.MSG_TYPE_SOURCES_LIST.value: {"type": "sources", "content": params if params else chunk},
-                        # Secondary Content Streams: Content is the text fragment, params is metadata
-                        MSG_TYPE.MSG_TYPE_FORM_READY.value: {"type": "form_ready", "content": params, "discussion_id": discussion_id},
-                        38: {"type": "artefact_chunk", "content": chunk, "meta": params},
-                        39: {"type": "artefact_done", "content": chunk, "meta": params},
-                        40: {"type": "note_chunk", "content": chunk, "meta": params},
-                        41: {"type": "note_done", "content": chunk, "meta": params},
-                        42: {"type": "skill_chunk", "content": chunk, "meta": params},
-                        43: {"type": "skill_done", "content": chunk, "meta": params},
-                        44: {"type": "widget_chunk", "content": chunk, "meta": params},
-                        45: {"type": "widget_done", "content": chunk, "meta": params},
-                        46: {"type": "form_ready", "content": params},
-                        47: {"type": "form_submitted", "content": params},
-                        # Multi-Level Cognitive Memory Events
-                        MSG_TYPE.MSG_TYPE_INFO.value: {
-                            "type": "memory_update" if params and params.get("type") == "memory_update" else ("memory_dream" if params and params.get("type") == "memory_dream" else "info"),
-                            "content": chunk,
-                            "meta": params
-                        }
-                    }
+                        stream_encoder.emit(params)
 
-                    payload = payload_map.get(mtype_val)
-                    if payload:
-                        # Ensure content is set for chunks, even if we have params
-                        if mtype_val == MSG_TYPE.MSG_TYPE_CHUNK.value or mtype_val == MSG_TYPE.MSG_TYPE_CONTENT.value:
-                            payload["content"] = chunk
+                    # Hot path: plain text fragments are coalesced and never logged
+                    text_kind = _COALESCIBLE_STREAM_TYPES.get(mtype_val)
+                    if text_kind and not structured and isinstance(chunk, str):
+                        stream_encoder.emit_text(text_kind, chunk)
+                        return True
 
+                    payload = _build_stream_payload(mtype_val, chunk, params, current_content_len)
+                    if payload:
                         # Unified Processing Protocol Integration
                         if mtype_val == MSG_TYPE.MSG_TYPE_CHUNK.value and params and "type" in params:
                             payload["type"] = params["type"]
@@ -1674,14 +1734,10 @@ def build_llm_generation_router(router: APIRouter):
 
                         # Only append meaningful user-facing events to the persistent log
                         # Exclude high-frequency content fragments
-                        excluded_from_history = [
-                            "chunk", "thought", "new_message_id", 
-                            "artefact_chunk", "note_chunk", "skill_chunk", "widget_chunk"
-                        ]
-                        if payload['type'] not in excluded_from_history:
+                        if payload['type'] not in _STREAM_HISTORY_EXCLUDED:
                             all_events.append(payload)
 
-                        main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps(jsonable_encoder(payload)) + "\n")
+                        stream_encoder.emit(payload)
                     return True
 
                 try:
@@ -1812,6 +1868,8 @@ def build_llm_generation_router(router: APIRouter):
                     finally:
                         # Ensure discussion state is committed even on client disconnect/stop signal
                         discussion_obj.commit()
+                        # Buffered text must precede anything the post-processing below streams
+                        stream_encoder.flush()
 
                     ai_msg = result.get('ai_message')
                     if ai_msg:
@@ -1843,6 +1901,13 @@ def build_llm_generation_router(router: APIRouter):
                                 seen_sources.add(key)
                         ai_msg.set_metadata_item('sources', unique_sources, discussion_obj)
 
+                        # Incremental rollup for the admin generation statistics
+                        db_stats = next(get_db())
+                        try:
+                            record_generation_stat(db_stats, owner_db_user.id, ai_msg.binding_name, ai_msg.model_name)
+                        finally:
+                            db_stats.close()
+
                     # Finalization payload construction with synchronized artefacts
                     def msg_to_out(m): 
                         if not m: return None
@@ -1853,7 +1918,7 @@ def build_llm_generation_router(router: APIRouter):
                             "content": m.content, 
                             "metadata": m.metadata, 
                             "sender_type": m.sender_type, 
-                            "image_references": [f"data:image/png;base64,{i}" for i in (m.images or [])]
+                            "image_references": image_blob_store.image_refs(owner_username, m.images, m.id)
                         }
 
                     effective_user_msg = result.get('user_message') or user_msg
@@ -1889,9 +1954,10 @@ def build_llm_generation_router(router: APIRouter):
 
                 except Exception as e:
                     trace_exception(e)
-                    main_loop.call_soon_threadsafe(stream_queue.put_nowait, json.dumps({"type": "error", "content": str(e)}) + "\n")
+                    stream_encoder.emit({"type": "error", "content": str(e)})
                 finally:
                     user_sessions.get(current_user.username, {}).get("active_generation_control", {}).pop(discussion_id, None)
+                    stream_encoder.flush()
                     main_loop.call_soon_threadsafe(stream_queue.put_nowait, None)
             
             try:
@@ -0,0 +1,97 @@
+# backend/generation/stream_encoder.py
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from backend.settings import settings
+
+# Plain text fragments that may be merged into one NDJSON line; every other event is sent as-is
+COALESCIBLE_TYPES = ("chunk", "thought")
+
+
+class NDJSONStreamEncoder:
+    """
+    Writes /chat stream events as NDJSON lines onto the response queue.
+
+    Consecutive `chunk` (or `thought`) fragments are buffered and sent as a single
+    line once `chat_stream_flush_ms` has elapsed since the first buffered fragment
+    or `chat_stream_flush_bytes` of text is waiting, so fast models produce one
+    queue hop and one HTTP write per window instead of one per token. A timer on
+    the event loop flushes the tail when the model pauses. Any other event flushes
+    the buffer first and is then sent unchanged, so event order is preserved.
+    Setting `chat_stream_flush_ms` to 0 sends every fragment on its own.
+
+    `emit_*` is called from the generation thread; the timer runs on the loop.
+    """
+    def __init__(self, main_loop: asyncio.AbstractEventLoop, stream_queue: asyncio.Queue):
+        self.main_loop = main_loop
+        self.stream_queue = stream_queue
+        self.flush_seconds = max(0.0, float(settings.get("chat_stream_flush_ms", 30))) / 1000.0
+        self.flush_bytes = max(1, int(settings.get("chat_stream_flush_bytes", 2048)))
+        self._lock = threading.Lock()
+        self._kind: Optional[str] = None
+        self._parts: List[str] = []
+        self._size = 0
+        self._started_at = 0.0
+        self._timer_armed = False
+        self.lines_sent = 0
+        self.fragments_in = 0
+
+    def _put(self, line: str):
+        # Callers hold the lock, so lines reach the loop's callback queue in order
+        self.lines_sent += 1
+        self.main_loop.call_soon_threadsafe(self.stream_queue.put_nowait, line)
+
+    def _take_locked(self) -> Optional[str]:
+        if not self._parts:
+            return None
+        line = json.dumps({"type": self._kind, "content": "".join(self._parts)}) + "\n"
+        self._kind, self._parts, self._size = None, [], 0
+        return line
+
+    def emit_text(self, kind: str, content: str):
+        """Buffers a text fragment of a coalescible event type."""
+        self.fragments_in += 1
+        if self.flush_seconds <= 0:
+            with self._lock:
+                self._put(json.dumps({"type": kind, "content": content}) + "\n")
+            return
+        with self._lock:
+            if self._kind not in (None, kind):
+                self._put(self._take_locked())
+            if not self._parts:
+                self._started_at = time.monotonic()
+            self._kind = kind
+            self._parts.append(content)
+            self._size += len(content)
+            if self._size >= self.flush_bytes or time.monotonic() - self._started_at >= self.flush_seconds:
+                self._put(self._take_locked())
+            elif not self._timer_armed:
+                self._timer_armed = True
+                self.main_loop.call_soon_threadsafe(self.main_loop.call_later, self.flush_seconds, self._on_timer)
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer_armed = False
+            line = self._take_locked()
+            if line:
+                self._put(line)
+
+    def emit(self, payload: Dict[str, Any]):
+        """Sends a control event exactly as given, after any buffered text."""
+        line = json.dumps(jsonable_encoder(payload)) + "\n"
+        with self._lock:
+            pending = self._take_locked()
+            if pending:
+                self._put(pending)
+            self._put(line)
+
+    def flush(self):
+        with self._lock:
+            line = self._take_locked()
+            if line:
+                self._put(line)
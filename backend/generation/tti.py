@@ -105,7 +105,8 @@ def build_tti_generation_router(router: APIRouter):
                 target=_generate_image_task,
                 args=(current_user.username, discussion_id, prompt, negative_prompt, width, height, generation_params, parent_message_id),
                 description=f"Generating image with prompt: '{prompt[:50]}...'",
-                owner_username=current_user.username
+                owner_username=current_user.username,
+                priority="interactive"
             )
             return db_task
 
@@ -143,7 +144,8 @@ def build_tti_generation_router(router: APIRouter):
                     target=_generate_slides_task,
                     args=(current_user.username, discussion_id, message_id, final_prompt, request.width, request.height, request.num_images),
                     description=f"Regenerating slides for: {final_prompt[:30]}...",
-                    owner_username=current_user.username
+                    owner_username=current_user.username,
+                    priority="interactive"
                 )
             elif request.tag_type == 'generate':
                 task = task_manager.submit_task(
@@ -152,7 +154,8 @@ def build_tti_generation_router(router: APIRouter):
                     # Passing the existing message_id as parent to preserve history
                     args=(current_user.username, discussion_id, final_prompt, "", request.width, request.height, {}, msg.id),
                     description=f"Regenerating image for: {final_prompt[:30]}...",
-                    owner_username=current_user.username
+                    owner_username=current_user.username,
+                    priority="interactive"
                 )
             elif request.tag_type == 'edit':
                 if request.source_image_index is None:
@@ -163,7 +166,8 @@ def build_tti_generation_router(router: APIRouter):
                     target=_image_studio_edit_task,
                     args=(current_user.username, discussion_id, message_id, request.source_image_index, final_prompt, request.width, request.height),
                     description=f"Editing image with prompt: {final_prompt[:30]}...",
-                    owner_username=current_user.username
+                    owner_username=current_user.username,
+                    priority="interactive"
                 )
             else:
                 raise HTTPException(status_code=400, detail=f"Unsupported tag type: {request.tag_type}")
@@ -0,0 +1,241 @@
+# backend/image_blob_store.py
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+from PIL import Image
+from werkzeug.utils import secure_filename
+
+from backend.session import get_user_data_root
+from backend.settings import settings
+
+BLOBS_DIR_NAME = "image_blobs"
+BLOB_URL_PREFIX = "/api/files/image-blobs/"
+_BLOB_URL_RE = re.compile(r"^/api/files/image-blobs/([^/]+)/([0-9a-f]{64})(?:\?.*)?$")
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+# Size variants are rounded up to these edges so a handful of files serve every request
+VARIANT_SIZES = (64, 128, 256, 384, 512, 768, 1024, 2048)
+KNOWN_BLOBS_MAX_ENTRIES = 20000
+MESSAGE_DIGESTS_MAX_ENTRIES = 50000
+# Characters sampled from a base64 image to tell it from another image at the same message slot
+_FINGERPRINT_SAMPLES = 16
+_FINGERPRINT_SAMPLE_LENGTH = 16
+
+
+def _sniff_media_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def _strip_data_uri(value: str) -> str:
+    if value.startswith("data:") and "," in value:
+        return value.split(",", 1)[1]
+    return value
+
+
+def _fingerprint(value: str) -> Tuple[Any, ...]:
+    """Length plus evenly spaced samples of a base64 string: cheap, and enough to notice an edited image."""
+    length = len(value)
+    step = max(1, length // _FINGERPRINT_SAMPLES)
+    return (length,) + tuple(value[i:i + _FINGERPRINT_SAMPLE_LENGTH] for i in range(0, length, step))
+
+
+class ImageBlobStore:
+    """
+    Per-user, content-addressed store for message images.
+
+    An image is kept once under `<user data>/image_blobs/<aa>/<sha256>` whatever
+    the number of messages or branches that reference it, and is served by URL
+    (`BLOB_URL_PREFIX/<owner>/<sha256>`) with an immutable ETag instead of being
+    inlined in JSON as base64. Resized variants are produced on demand next to
+    the original. lollms_client still keeps base64 in the message rows because
+    it needs it to build model context; `image_refs` maps them to blob URLs when
+    messages are sent to clients. The digest of each message image is remembered
+    per (owner, message id, index), so serializing a message again does not decode
+    and hash its images; the async variant does the first pass in a thread.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (owner, digest) pairs already known to be on disk, to skip the stat on hot paths
+        self._known: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        # (owner, message id, index, fingerprint) -> digest of a stored message image
+        self._message_digests: "OrderedDict[Tuple[Any, ...], str]" = OrderedDict()
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.get("image_blob_refs_enabled", True))
+
+    @staticmethod
+    def root(owner: str) -> Path:
+        return get_user_data_root(owner) / BLOBS_DIR_NAME
+
+    def blob_path(self, owner: str, digest: str) -> Optional[Path]:
+        if not _DIGEST_RE.match(digest or ""):
+            return None
+        return self.root(owner) / digest[:2] / digest
+
+    def _remember(self, owner: str, digest: str):
+        with self._lock:
+            self._known[(owner, digest)] = None
+            self._known.move_to_end((owner, digest))
+            while len(self._known) > KNOWN_BLOBS_MAX_ENTRIES:
+                self._known.popitem(last=False)
+
+    def put_bytes(self, owner: str, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if (owner, digest) in self._known:
+                return digest
+        path = self.blob_path(owner, digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        self._remember(owner, digest)
+        return digest
+
+    def put_b64(self, owner: str, value: str) -> Optional[str]:
+        """Stores a base64 image (bare or data URI) and returns its digest, or None if it is not valid base64."""
+        try:
+            data = base64.b64decode(_strip_data_uri(value), validate=False)
+        except (binascii.Error, ValueError):
+            return None
+        if not data:
+            return None
+        return self.put_bytes(owner, data)
+
+    def url_for(self, owner: str, digest: str) -> str:
+        return f"{BLOB_URL_PREFIX}{secure_filename(owner)}/{digest}"
+
+    def store_message_image(self, owner: str, message_id: Optional[str], index: int, value: str) -> Optional[str]:
+        """
+        Digest of the `index`-th image of a message, storing it on first sight. Without
+        a message id the image is always decoded and hashed.
+        """
+        key = (owner, message_id, index, _fingerprint(value)) if message_id else None
+        if key is not None:
+            with self._lock:
+                digest = self._message_digests.get(key)
+                if digest is not None:
+                    self._message_digests.move_to_end(key)
+                    return digest
+        digest = self.put_b64(owner, value)
+        if digest and key is not None:
+            with self._lock:
+                self._message_digests[key] = digest
+                while len(self._message_digests) > MESSAGE_DIGESTS_MAX_ENTRIES:
+                    self._message_digests.popitem(last=False)
+        return digest
+
+    @staticmethod
+    def _image_values(images: Iterable) -> List[Tuple[int, str]]:
+        values = []
+        for index, image in enumerate(images or []):
+            b64 = image.get("image") if isinstance(image, dict) else image
+            if isinstance(b64, str):
+                values.append((index, b64))
+        return values
+
+    def image_refs(self, owner: str, images: Iterable, message_id: Optional[str] = None) -> List[str]:
+        """Client-facing references for a message's images: blob URLs, or data URIs if the store is disabled or fails."""
+        refs = []
+        for index, b64 in self._image_values(images):
+            digest = None
+            if self.enabled():
+                try:
+                    digest = self.store_message_image(owner, message_id, index, b64)
+                except OSError as e:
+                    print(f"WARNING: Could not store image blob for {owner}: {e}")
+            refs.append(self.url_for(owner, digest) if digest else f"data:image/png;base64,{_strip_data_uri(b64)}")
+        return refs
+
+    def _refs_cached(self, owner: str, images: Iterable, message_id: Optional[str]) -> bool:
+        if not self.enabled():
+            return True
+        if not message_id:
+            return False
+        with self._lock:
+            return all(
+                (owner, message_id, index, _fingerprint(b64)) in self._message_digests
+                for index, b64 in self._image_values(images)
+            )
+
+    async def image_refs_async(self, owner: str, images: Iterable, message_id: Optional[str] = None) -> List[str]:
+        """`image_refs` for request handlers: images not seen yet are decoded, hashed and written in a thread."""
+        if not images or self._refs_cached(owner, images, message_id):
+            return self.image_refs(owner, images, message_id)
+        return await asyncio.to_thread(self.image_refs, owner, images, message_id)
+
+    @staticmethod
+    def parse_url(value: str) -> Optional[Tuple[str, str]]:
+        """(owner, digest) of a blob URL produced by `url_for`, else None."""
+        match = _BLOB_URL_RE.match(value or "")
+        return (match.group(1), match.group(2)) if match else None
+
+    def read_b64(self, owner: str, digest: str) -> Optional[str]:
+        path = self.blob_path(owner, digest)
+        if path is None or not path.is_file():
+            return None
+        return base64.b64encode(path.read_bytes()).decode("utf-8")
+
+    def resolve_to_b64(self, value: str, owner: str) -> Optional[str]:
+        """
+        Turns a value sent back by a client into bare base64. Blob URLs are only
+        resolved from `owner`'s store; a URL of another owner or of a missing blob
+        gives None. Other values only lose their data URI prefix.
+        """
+        parsed = self.parse_url(value)
+        if parsed:
+            url_owner, digest = parsed
+            if url_owner != secure_filename(owner):
+                return None
+            return self.read_b64(url_owner, digest)
+        return _strip_data_uri(value)
+
+    @staticmethod
+    def variant_size(size: int) -> int:
+        return next((edge for edge in VARIANT_SIZES if edge >= size), VARIANT_SIZES[-1])
+
+    def open_blob(self, owner: str, digest: str, size: Optional[int] = None) -> Optional[Tuple[Path, str]]:
+        """Path and media type of a blob, or of its `size` variant (WebP, generated on first use)."""
+        path = self.blob_path(owner, digest)
+        if path is None or not path.is_file():
+            return None
+        if not size:
+            with open(path, "rb") as f:
+                head = f.read(16)
+            return path, _sniff_media_type(head)
+
+        edge = self.variant_size(size)
+        variant_path = path.with_name(f"{digest}_{edge}.webp")
+        if not variant_path.is_file():
+            with Image.open(path) as img:
+                if img.mode not in ("RGB", "RGBA"):
+                    img = img.convert("RGBA" if "A" in img.mode else "RGB")
+                img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                img.save(buffer, "WEBP", quality=80, method=4)
+            tmp_path = variant_path.with_name(f".{variant_path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(buffer.getvalue())
+            os.replace(tmp_path, variant_path)
+        return variant_path, "image/webp"
+
+
+image_blob_store = ImageBlobStore()
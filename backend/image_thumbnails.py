@@ -0,0 +1,120 @@
+# backend/image_thumbnails.py
+import asyncio
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image
+from ascii_colors import trace_exception
+
+from backend.settings import settings
+
+THUMBNAILS_DIR_NAME = ".thumbnails"
+# Requested sizes are rounded up to these edges, so each image has at most this many thumbnails
+THUMBNAIL_SIZES = (128, 256, 384, 768)
+# The sizes the gallery, album and viewer strips ask for
+PREGENERATED_SIZES = (128, 256, 384)
+
+
+class ThumbnailService:
+    """
+    WebP thumbnails of Image Studio images, in a few fixed size buckets.
+
+    Thumbnails live next to their image in `.thumbnails/<stem>_thumb_<edge>.webp`
+    and are regenerated when the image is newer. Decoding and encoding run in a
+    small thread pool (`image_thumbnail_workers`) so request handlers never block
+    the event loop, and concurrent requests for the same thumbnail share one
+    encode. New images get their thumbnails rendered in the background
+    (`pregenerate`), so gallery loads only hit files that already exist.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Tuple[Path, int], Future] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                workers = max(1, int(settings.get("image_thumbnail_workers", 2)))
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+            return self._executor
+
+    @staticmethod
+    def bucket(size: int) -> int:
+        return next((edge for edge in THUMBNAIL_SIZES if edge >= size), THUMBNAIL_SIZES[-1])
+
+    @staticmethod
+    def thumb_path(source: Path, edge: int) -> Path:
+        return source.parent / THUMBNAILS_DIR_NAME / f"{source.stem}_thumb_{edge}.webp"
+
+    def is_fresh(self, source: Path, edge: int) -> bool:
+        thumb_path = self.thumb_path(source, edge)
+        try:
+            return thumb_path.stat().st_mtime >= source.stat().st_mtime
+        except OSError:
+            return False
+
+    def _render(self, source: Path, edge: int) -> Path:
+        thumb_path = self.thumb_path(source, edge)
+        if self.is_fresh(source, edge):
+            return thumb_path
+        thumb_path.parent.mkdir(parents=True, exist_ok=True)
+        with Image.open(source) as img:
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.mode else "RGB")
+            img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            tmp_path = thumb_path.with_name(f".{thumb_path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                img.save(tmp_path, "WEBP", quality=80, method=4)
+                os.replace(tmp_path, thumb_path)
+            except Exception:
+                tmp_path.unlink(missing_ok=True)
+                raise
+        return thumb_path
+
+    def _submit(self, source: Path, edge: int) -> Future:
+        key = (source, edge)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+        future = self._get_executor().submit(self._render, source, edge)
+        with self._lock:
+            # Another thread may have submitted the same render meanwhile; both produce the same file
+            future = self._pending.setdefault(key, future)
+        future.add_done_callback(lambda _f: self._forget(key, _f))
+        return future
+
+    def _forget(self, key: Tuple[Path, int], future: Future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    async def get(self, source: Path, size: int) -> Path:
+        """Path of the thumbnail of `source` for `size`, rendered in the pool if missing or stale."""
+        edge = self.bucket(size)
+        if self.is_fresh(source, edge):
+            return self.thumb_path(source, edge)
+        return await asyncio.wrap_future(self._submit(source, edge))
+
+    def pregenerate(self, source: Path, sizes: Iterable[int] = PREGENERATED_SIZES):
+        """Queues the thumbnails of a new image; failures are logged, never raised."""
+        for edge in sorted({self.bucket(size) for size in sizes}):
+            future = self._submit(Path(source), edge)
+            future.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future: Future):
+        error = future.exception()
+        if error is not None:
+            trace_exception(error)
+
+    def remove(self, source: Path):
+        for edge in THUMBNAIL_SIZES:
+            self.thumb_path(source, edge).unlink(missing_ok=True)
+
+
+thumbnail_service = ThumbnailService()
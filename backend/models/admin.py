@@ -211,6 +211,98 @@ class GlobalGenerationStats(BaseModel):
     mean_per_weekday: Dict[str, float]
     variance_per_weekday: Dict[str, float]
 
+class DiscussionDbPoolEntry(BaseModel):
+    username: str
+    idle_seconds: float
+
+class DiscussionDbPoolStats(BaseModel):
+    size: int
+    max_entries: int
+    idle_timeout_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    hit_rate: float
+    entries: List[DiscussionDbPoolEntry] = []
+
+class SafeStoreCacheEntry(BaseModel):
+    datastore_id: str
+    name: Optional[str] = None
+    active_users: int
+    memory_mb: float
+    idle_seconds: float
+
+class SafeStoreCacheStats(BaseModel):
+    size: int
+    max_entries: int
+    idle_timeout_seconds: float
+    memory_budget_mb: float
+    memory_used_mb: float
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    hit_rate: float
+    entries: List[SafeStoreCacheEntry] = []
+
+class RagLatencyHistogram(BaseModel):
+    count: int
+    avg_ms: float
+    max_ms: float
+    buckets: Dict[str, int]
+
+class RagOperationStats(BaseModel):
+    queue_wait: RagLatencyHistogram
+    latency: RagLatencyHistogram
+    errors: int
+
+class RagExecutorStats(BaseModel):
+    max_workers: int
+    queued: int
+    running: int
+    bucket_bounds_ms: List[int]
+    operations: Dict[str, RagOperationStats] = {}
+
+class ComHubClientStats(BaseModel):
+    peer: str
+    pid: Optional[int] = None
+    hosted_users: Optional[int] = None
+    hosted_admins: int
+    queue_depth: int
+    packets_out: int
+    bytes_out: int
+    dropped: int
+    last_lag_ms: float
+    max_lag_ms: float
+
+class ComHubStats(BaseModel):
+    uptime_seconds: float
+    packets_in: int
+    bytes_in: int
+    packets_delivered: int
+    packets_unrouted: int
+    packets_dropped: int
+    clients: List[ComHubClientStats] = []
+
+class RagQueryCacheStats(BaseModel):
+    datastores: int
+    entries: int
+    hits: int
+    semantic_hits: int
+    misses: int
+    invalidations: int
+    hit_rate: float
+
+class BroadcastJournalStats(BaseModel):
+    path: Optional[str] = None
+    open: bool
+    slot_size: int
+    slot_count: int
+    last_seq: int
+    appended: int
+    truncated: int
+
 class UserForAdminPanel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: int
@@ -1,5 +1,5 @@
 import datetime
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Dict
 from pydantic import BaseModel, ConfigDict
 from backend.db.base import TaskStatus
 
@@ -25,3 +25,21 @@ class TaskInfo(BaseModel):
     file_name: Optional[str] = None
     total_files: Optional[int] = None
     owner_username: Optional[str] = None
+    priority: Optional[str] = None
+
+class TaskPriorityClassStats(BaseModel):
+    queued: int
+    running: int
+    oldest_wait_seconds: float
+    avg_wait_seconds: float
+    p95_wait_seconds: float
+    max_wait_seconds: float
+
+class TaskQueueStats(BaseModel):
+    workers: int
+    busy_workers: int
+    queue_depth: int
+    max_concurrent_per_user: int
+    classes: Dict[str, TaskPriorityClassStats]
+    running_per_user: Optional[Dict[str, int]] = None
+    queued_per_user: Optional[Dict[str, int]] = None
@@ -0,0 +1,139 @@
+# backend/rag_executor.py
+"""
+Dedicated thread pool for SafeStore / GraphStore work (vectorizer loading, embedding,
+vector search, graph queries). Async endpoints await `run_rag(...)` so RAG calls no
+longer block the event loop, and the pool size bounds how many run at once per worker.
+Queue-wait and run-time latencies are recorded per operation as histograms.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.settings import settings
+
+# Upper bounds (milliseconds) of the histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        index = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if value_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 2) if self.total else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+class RagExecutor:
+    """Sized thread pool for RAG calls with per-operation latency histograms."""
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_workers = 0
+        self._lock = threading.Lock()
+        self._queue_wait: Dict[str, _Histogram] = {}
+        self._run_time: Dict[str, _Histogram] = {}
+        self._errors: Dict[str, int] = {}
+        self._queued = 0
+        self._running = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._max_workers = max(1, int(settings.get("rag_executor_workers", min(16, (os.cpu_count() or 2) * 2))))
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="rag")
+            return self._executor
+
+    def _record(self, op: str, queue_wait_ms: float, run_ms: Optional[float], failed: bool):
+        with self._lock:
+            self._queue_wait.setdefault(op, _Histogram()).observe(queue_wait_ms)
+            if run_ms is not None:
+                self._run_time.setdefault(op, _Histogram()).observe(run_ms)
+            if failed:
+                self._errors[op] = self._errors.get(op, 0) + 1
+
+    def submit(self, op: str, fn: Callable, *args, **kwargs) -> Future:
+        enqueued = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def _timed():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                self._record(op, (started - enqueued) * 1000, (finished - started) * 1000, failed)
+
+        return self._get_executor().submit(_timed)
+
+    def call(self, op: str, fn: Callable, *args, **kwargs) -> Any:
+        """Blocking variant for synchronous callers (e.g. the chat RAG tool)."""
+        return self.submit(op, fn, *args, **kwargs).result()
+
+    async def run(self, op: str, fn: Callable, *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self.submit(op, fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ops: List[str] = sorted(set(self._queue_wait) | set(self._run_time))
+            return {
+                "max_workers": self._max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "bucket_bounds_ms": list(LATENCY_BUCKETS_MS),
+                "operations": {
+                    op: {
+                        "queue_wait": (self._queue_wait.get(op) or _Histogram()).to_dict(),
+                        "latency": (self._run_time.get(op) or _Histogram()).to_dict(),
+                        "errors": self._errors.get(op, 0),
+                    }
+                    for op in ops
+                },
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._queue_wait.clear()
+            self._run_time.clear()
+            self._errors.clear()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+rag_executor = RagExecutor()
+
+async def run_rag(op: str, fn: Callable, *args, **kwargs) -> Any:
+    """Runs a blocking SafeStore/GraphStore call on the RAG executor and awaits it."""
+    return await rag_executor.run(op, fn, *args, **kwargs)
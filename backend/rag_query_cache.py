@@ -0,0 +1,168 @@
+# backend/rag_query_cache.py
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from backend.settings import settings
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+class RagQueryCache:
+    """
+    Per-datastore cache of RAG query results used by the chat RAG tool.
+
+    Entries are keyed by normalized query text, top_k and similarity threshold.
+    When `rag_query_cache_semantic_threshold` is > 0, a miss on the exact key can
+    still be served by a cached query whose embedding has a cosine similarity above
+    the threshold (this costs one query embedding but skips the vector search).
+    Entries expire after a TTL; each datastore keeps a bounded LRU, and the number
+    of datastores is bounded too. Writes to a datastore invalidate its entries.
+    """
+    def __init__(self):
+        self._stores: "OrderedDict[str, OrderedDict]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.get("rag_query_cache_enabled", True))
+
+    @staticmethod
+    def _ttl() -> float:
+        return float(settings.get("rag_query_cache_ttl_seconds", 300))
+
+    @staticmethod
+    def _max_entries() -> int:
+        return max(1, int(settings.get("rag_query_cache_max_entries_per_datastore", 256)))
+
+    @staticmethod
+    def _max_datastores() -> int:
+        return max(1, int(settings.get("rag_query_cache_max_datastores", 64)))
+
+    @staticmethod
+    def _semantic_threshold() -> float:
+        return float(settings.get("rag_query_cache_semantic_threshold", 0.0))
+
+    def _entries_for_locked(self, datastore_id: str, create: bool) -> Optional[OrderedDict]:
+        entries = self._stores.get(datastore_id)
+        if entries is None and create:
+            entries = OrderedDict()
+            self._stores[datastore_id] = entries
+            while len(self._stores) > self._max_datastores():
+                self._stores.popitem(last=False)
+        if entries is not None:
+            self._stores.move_to_end(datastore_id)
+        return entries
+
+    def _lookup_exact(self, datastore_id: str, key: Tuple, now: float) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entries = self._entries_for_locked(datastore_id, create=False)
+            entry = entries.get(key) if entries is not None else None
+            if entry is None:
+                return None
+            if now - entry["created_at"] > self._ttl():
+                del entries[key]
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+            return entry["results"]
+
+    def _lookup_semantic(self, datastore_id: str, key: Tuple, embedding: np.ndarray, threshold: float, now: float) -> Optional[List[Dict[str, Any]]]:
+        _, top_k, min_sim = key
+        ttl = self._ttl()
+        best_key, best_score = None, threshold
+        with self._lock:
+            entries = self._entries_for_locked(datastore_id, create=False)
+            if not entries:
+                return None
+            for cached_key, entry in entries.items():
+                if cached_key[1:] != (top_k, min_sim) or entry["embedding"] is None or now - entry["created_at"] > ttl:
+                    continue
+                score = float(np.dot(embedding, entry["embedding"]))
+                if score >= best_score:
+                    best_key, best_score = cached_key, score
+            if best_key is None:
+                return None
+            entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            return entries[best_key]["results"]
+
+    def query(self, datastore_id: str, query: str, top_k: int, min_similarity_percent: float,
+              run_query: Callable[[], List[Dict[str, Any]]],
+              embed: Optional[Callable[[str], Any]] = None) -> List[Dict[str, Any]]:
+        """Returns cached results for the query, or runs `run_query` and caches its results."""
+        if not self.enabled() or not datastore_id:
+            return run_query()
+
+        now = time.monotonic()
+        key = (normalize_query(query), int(top_k), float(min_similarity_percent))
+        cached = self._lookup_exact(datastore_id, key, now)
+        if cached is not None:
+            return cached
+
+        embedding = None
+        threshold = self._semantic_threshold()
+        if embed is not None and threshold > 0:
+            try:
+                vector = np.asarray(embed(query), dtype=np.float32).ravel()
+                norm = float(np.linalg.norm(vector))
+                embedding = vector / norm if norm > 0 else None
+            except Exception as e:
+                print(f"WARNING: RAG query cache could not embed query: {e}")
+            if embedding is not None:
+                cached = self._lookup_semantic(datastore_id, key, embedding, threshold, now)
+                if cached is not None:
+                    return cached
+
+        with self._lock:
+            self.misses += 1
+            version = self._versions.get(datastore_id, 0)
+
+        results = run_query()
+
+        with self._lock:
+            # Skip caching if the datastore was written to while the query ran
+            if self._versions.get(datastore_id, 0) != version:
+                return results
+            entries = self._entries_for_locked(datastore_id, create=True)
+            entries[key] = {"results": results, "embedding": embedding, "created_at": time.monotonic()}
+            entries.move_to_end(key)
+            while len(entries) > self._max_entries():
+                entries.popitem(last=False)
+        return results
+
+    def invalidate(self, datastore_id: str):
+        with self._lock:
+            self._versions[datastore_id] = self._versions.get(datastore_id, 0) + 1
+            if self._stores.pop(datastore_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._stores.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "datastores": len(self._stores),
+                "entries": sum(len(e) for e in self._stores.values()),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": ((self.hits + self.semantic_hits) / lookups) if lookups else 0.0,
+            }
+
+
+rag_query_cache = RagQueryCache()
@@ -0,0 +1,148 @@
+# backend/rate_limiter.py
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from backend.settings import settings
+
+SHARD_COUNT = 16
+
+
+class _Shard:
+    __slots__ = ("lock", "keys", "last_sweep")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [window_index, local_curr, local_prev, remote_curr, remote_prev]
+        self.keys: Dict[str, list] = {}
+        self.last_sweep = 0.0
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window-counter rate limiter for the service endpoints.
+
+    Each key keeps the request counts of the current and previous fixed windows
+    (aligned on the epoch, so every worker agrees on window boundaries); the
+    sliding count is `prev * (1 - elapsed_fraction) + curr`, which makes a check
+    O(1) regardless of the limit. Keys live in hash-selected shards with their own
+    locks, and keys idle for two windows are swept out of a shard at most once per
+    window.
+
+    In multi-worker deployments, each worker batches the requests it accepted and
+    publishes them through the Communication Hub every `rate_limit_sync_interval_seconds`;
+    other workers add them to the key's remote counts, so the configured limit
+    applies to the cluster instead of to each worker. Identifiers (API keys, IPs)
+    are hashed before they are stored or published.
+    """
+    def __init__(self, shard_count: int = SHARD_COUNT):
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self._pending: Dict[Tuple[str, int], int] = {}
+        self._pending_lock = threading.Lock()
+        self._last_flush = 0.0
+
+    @staticmethod
+    def make_key(identifier: str, service: str) -> str:
+        digest = hashlib.sha256(str(identifier).encode("utf-8")).hexdigest()[:32]
+        return f"{service}:{digest}"
+
+    def _shard_for(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    @staticmethod
+    def _roll(state: list, window_index: int):
+        """Advances a key's counters to `window_index`."""
+        gap = window_index - state[0]
+        if gap <= 0:
+            return
+        if gap == 1:
+            state[2], state[4] = state[1], state[3]
+        else:
+            state[2] = state[4] = 0
+        state[1] = state[3] = 0
+        state[0] = window_index
+
+    def _sweep_locked(self, shard: _Shard, window_index: int):
+        stale = [key for key, state in shard.keys.items() if state[0] < window_index - 1]
+        for key in stale:
+            del shard.keys[key]
+
+    def allow(self, key: str, max_requests: int, window_seconds: float) -> bool:
+        now = time.time()
+        window_index = int(now // window_seconds)
+        elapsed_fraction = (now - window_index * window_seconds) / window_seconds
+        shard = self._shard_for(key)
+
+        with shard.lock:
+            if now - shard.last_sweep > window_seconds:
+                shard.last_sweep = now
+                self._sweep_locked(shard, window_index)
+
+            state = shard.keys.get(key)
+            if state is None:
+                state = [window_index, 0, 0, 0, 0]
+                shard.keys[key] = state
+            else:
+                self._roll(state, window_index)
+
+            previous = state[2] + state[4]
+            current = state[1] + state[3]
+            if previous * (1.0 - elapsed_fraction) + current >= max_requests:
+                return False
+            state[1] += 1
+
+        with self._pending_lock:
+            pending_key = (key, window_index)
+            self._pending[pending_key] = self._pending.get(pending_key, 0) + 1
+        self._maybe_flush(now)
+        return True
+
+    def _maybe_flush(self, now: float):
+        interval = float(settings.get("rate_limit_sync_interval_seconds", 1.0))
+        with self._pending_lock:
+            if not self._pending or now - self._last_flush < interval:
+                return
+            pending, self._pending = self._pending, {}
+            self._last_flush = now
+
+        from backend.ws_manager import manager
+        if not manager.hub_writer:
+            return
+        windows: Dict[str, Dict[str, int]] = {}
+        for (key, window_index), count in pending.items():
+            windows.setdefault(str(window_index), {})[key] = count
+        manager.send_internal_event_to_hub_sync("rate_limit_sync", {"windows": windows})
+
+    def apply_remote(self, data: Dict[str, Any]):
+        """Adds request counts accepted by another worker (a `rate_limit_sync` event)."""
+        for window_str, counts in (data.get("windows") or {}).items():
+            try:
+                window_index = int(window_str)
+            except (TypeError, ValueError):
+                continue
+            for key, count in counts.items():
+                shard = self._shard_for(key)
+                with shard.lock:
+                    state = shard.keys.get(key)
+                    if state is None:
+                        state = [window_index, 0, 0, 0, 0]
+                        shard.keys[key] = state
+                    self._roll(state, window_index)
+                    if state[0] == window_index:
+                        state[3] += int(count)
+                    elif state[0] == window_index + 1:
+                        state[4] += int(count)
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.keys.clear()
+        with self._pending_lock:
+            self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tracked_keys": sum(len(shard.keys) for shard in self._shards), "shards": len(self._shards)}
+
+
+rate_limiter = SlidingWindowRateLimiter()
@@ -256,7 +256,8 @@ async def trigger_batch_moderation(
         name="Batch Content Moderation",
         target=_batch_moderate_content_task,
         description="Moderating pending posts and comments.",
-        owner_username=current_user.username
+        owner_username=current_user.username,
+        priority="maintenance"
     )
     return {"message": "Batch moderation task started."}
 
@@ -271,6 +272,7 @@ async def trigger_full_remoderation(
         name="Full Content Remoderation",
         target=_full_remoderation_task,
         description="Re-moderating ALL posts and comments.",
-        owner_username=current_user.username
+        owner_username=current_user.username,
+        priority="maintenance"
     )
     return {"message": "Full remoderation task started."}
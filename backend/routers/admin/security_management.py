@@ -22,6 +22,7 @@ async def trigger_content_sanitization(
         name="Database Content Sanitization",
         target=_sanitize_database_task,
         description="Scanning and cleaning existing content for XSS vulnerabilities.",
-        owner_username=current_user.username
+        owner_username=current_user.username,
+        priority="maintenance"
     )
     return task
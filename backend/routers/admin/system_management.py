@@ -13,7 +13,6 @@ import psutil
 from fastapi import APIRouter, Depends, Request, HTTPException
 from pydantic import BaseModel
 from sqlalchemy import func, desc, update
-from lollms_client import LollmsDataManager
 from packaging.requirements import Requirement
 from importlib.metadata import version as get_installed_version, PackageNotFoundError
 from packaging.version import parse as parse_version
@@ -25,14 +24,20 @@ from backend.db.models.user import User as DBUser
 from backend.db.models.service import App as DBApp
 from backend.db.models.connections import WebSocketConnection
 from backend.db.models.db_task import DBTask
+from backend.db.models.generation_stats import GenerationDailyStat
 from backend.models import UserAuthDetails, SystemUsageStats, GPUInfo, DiskInfo, TaskInfo
-from backend.models.admin import GlobalGenerationStats, UserActivityStat, ForceGlobalConfigPayload, RequirementInfo, InstallReqPayload
+from backend.models.admin import GlobalGenerationStats, UserActivityStat, ForceGlobalConfigPayload, RequirementInfo, InstallReqPayload, DiscussionDbPoolStats, RagExecutorStats, SafeStoreCacheStats, RagQueryCacheStats, ComHubStats, BroadcastJournalStats
 from backend.config import PROJECT_ROOT, APP_DATA_DIR, SERVER_CONFIG, APP_VERSION, USERS_DIR_NAME, TEMP_UPLOADS_DIR_NAME
-from backend.session import get_current_admin_user, get_user_data_root, user_sessions
+from backend.session import get_current_admin_user, user_sessions
 from backend.ws_manager import manager
+from backend.discussion_manager import discussion_db_registry
+from backend.rag_executor import rag_executor
+from backend.safe_store_registry import safe_store_registry
+from backend.rag_query_cache import rag_query_cache
+from backend.broadcast_journal import broadcast_journal
 from backend.task_manager import task_manager, Task
 from backend.utils import get_local_ip_addresses
-from backend.tasks.system_tasks import _create_backup_task, _analyze_logs_task, _prune_old_tasks_task
+from backend.tasks.system_tasks import _create_backup_task, _analyze_logs_task, _prune_old_tasks_task, _backfill_generation_stats_task, _migrate_message_images_to_blobs_task
 from backend.settings import settings
 from ascii_colors import trace_exception, ASCIIColors
 
@@ -44,10 +49,21 @@ class AdminBroadcastRequest(BaseModel):
 class BackupRequest(BaseModel):
     password: str 
 
+class WsConnectionQueue(BaseModel):
+    session_id: Optional[str] = None
+    queue_depth: int
+    queue_capacity: int
+    lag_seconds: float
+    sent: int
+    coalesced: int
+    dropped: int
+
 class ConnectedUser(BaseModel):
     id: int
     username: str
     icon: Optional[str] = None
+    # Outbound queues of this user's sockets held by the worker serving the request
+    connections: List[WsConnectionQueue] = []
     class Config:
         from_attributes = True
 
@@ -350,7 +366,21 @@ async def broadcast_message_to_all_users(payload: AdminBroadcastRequest, current
 @system_management_router.get("/ws-connections", response_model=List[ConnectedUser])
 async def get_websocket_connections(db: Session = Depends(get_db)):
     user_ids = [uid for uid, in db.query(WebSocketConnection.user_id).distinct().all()]
-    return db.query(DBUser).filter(DBUser.id.in_(user_ids)).all() if user_ids else []
+    if not user_ids:
+        return []
+    queue_stats = manager.connection_stats()
+    return [
+        ConnectedUser(id=user.id, username=user.username, icon=user.icon, connections=queue_stats.get(user.id, []))
+        for user in db.query(DBUser).filter(DBUser.id.in_(user_ids)).all()
+    ]
+
+@system_management_router.get("/com-hub", response_model=ComHubStats)
+async def get_com_hub_stats():
+    """Routing, throughput and per-worker queue counters of the Communication Hub."""
+    stats = await manager.request_hub_stats()
+    if stats is None:
+        raise HTTPException(status_code=503, detail="Communication Hub not connected (single-worker mode or hub unavailable).")
+    return stats
 
 @system_management_router.get("/ws-status", response_model=Dict[str, bool])
 async def get_my_websocket_status(current_user: UserAuthDetails = Depends(get_current_admin_user)):
@@ -359,46 +389,79 @@ async def get_my_websocket_status(current_user: UserAuthDetails = Depends(get_cu
         "is_registered_as_admin": current_user.id in manager.admin_user_ids
     }
 
+@system_management_router.get("/discussion-db-pool", response_model=DiscussionDbPoolStats)
+async def get_discussion_db_pool_stats():
+    """Hit/miss/eviction counters of this worker's per-user discussion DB registry."""
+    return discussion_db_registry.stats()
+
+@system_management_router.post("/discussion-db-pool/close-idle", response_model=DiscussionDbPoolStats)
+async def close_idle_discussion_dbs():
+    discussion_db_registry.close_idle()
+    return discussion_db_registry.stats()
+
+@system_management_router.get("/safe-store-cache", response_model=SafeStoreCacheStats)
+async def get_safe_store_cache_stats():
+    """Open SafeStore instances shared by all users of this worker."""
+    return safe_store_registry.stats()
+
+@system_management_router.post("/safe-store-cache/close-idle", response_model=SafeStoreCacheStats)
+async def close_idle_safe_stores():
+    safe_store_registry.close_idle()
+    return safe_store_registry.stats()
+
+@system_management_router.get("/rag-executor", response_model=RagExecutorStats)
+async def get_rag_executor_stats():
+    """Queue-wait and latency histograms of this worker's RAG executor, per operation."""
+    return rag_executor.stats()
+
+@system_management_router.post("/rag-executor/reset-stats", response_model=RagExecutorStats)
+async def reset_rag_executor_stats():
+    rag_executor.reset_stats()
+    return rag_executor.stats()
+
+@system_management_router.get("/rag-query-cache", response_model=RagQueryCacheStats)
+async def get_rag_query_cache_stats():
+    """Hit/miss counters of this worker's RAG tool query-result cache."""
+    return rag_query_cache.stats()
+
+@system_management_router.post("/rag-query-cache/clear", response_model=RagQueryCacheStats)
+async def clear_rag_query_cache():
+    rag_query_cache.clear()
+    return rag_query_cache.stats()
+
+@system_management_router.get("/broadcast-journal", response_model=BroadcastJournalStats)
+async def get_broadcast_journal_stats():
+    """State of this worker's on-disk broadcast ring journal (only written with several workers)."""
+    return broadcast_journal.stats()
+
 @system_management_router.post("/purge-unused-uploads", response_model=TaskInfo, status_code=202)
 async def purge_temp_files(current_admin: UserAuthDetails = Depends(get_current_admin_user)):
     db_task = task_manager.submit_task(
         name="Purge unused temporary files",
         target=_purge_unused_temp_files_task,
         description="Scans user temp folders and deletes files older than 24 hours.",
-        owner_username=current_admin.username
+        owner_username=current_admin.username,
+        priority="maintenance"
     )
     return db_task
 
 @system_management_router.get("/global-generation-stats", response_model=GlobalGenerationStats)
 def get_global_generation_stats(db: Session = Depends(get_db)):
-    all_users = db.query(DBUser).all()
-    thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-    
-    daily_totals = defaultdict(int)
+    thirty_days_ago = (datetime.now(timezone.utc) - timedelta(days=30)).date()
 
-    for user in all_users:
-        discussions_db_path = get_user_data_root(user.username) / "discussions.db"
-        if discussions_db_path.exists():
-            try:
-                dm = LollmsDataManager(db_path=f"sqlite:///{discussions_db_path.resolve()}")
-                with dm.get_session() as session:
-                    results = session.query(
-                        func.date(dm.MessageModel.created_at),
-                        func.count(dm.MessageModel.id)
-                    ).filter(
-                        dm.MessageModel.sender_type == 'assistant',
-                        dm.MessageModel.created_at >= thirty_days_ago
-                    ).group_by(func.date(dm.MessageModel.created_at)).all()
-
-                    for date_str, count in results:
-                        daily_totals[date_str] += count
-            except Exception as e:
-                trace_exception(e)
-                print(f"Warning: Could not process discussions DB for user {user.username}: {e}")
+    # Served from the incrementally maintained rollup (see record_generation_stat).
+    results = db.query(
+        GenerationDailyStat.day,
+        func.sum(GenerationDailyStat.count)
+    ).filter(
+        GenerationDailyStat.day >= thirty_days_ago
+    ).group_by(GenerationDailyStat.day).all()
+
+    daily_totals = {day: int(count or 0) for day, count in results}
 
     generations_per_day_list = [
-        UserActivityStat(date=datetime.strptime(date_str, '%Y-%m-%d').date(), count=count)
-        for date_str, count in daily_totals.items()
+        UserActivityStat(date=day, count=count)
+        for day, count in daily_totals.items()
     ]
     generations_per_day_list.sort(key=lambda x: x.date)
 
@@ -425,6 +488,28 @@ def get_global_generation_stats(db: Session = Depends(get_db)):
         variance_per_weekday=variance_per_weekday
     )
 
+@system_management_router.post("/global-generation-stats/backfill", response_model=TaskInfo, status_code=202)
+async def backfill_global_generation_stats(current_admin: UserAuthDetails = Depends(get_current_admin_user)):
+    db_task = task_manager.submit_task(
+        name="Backfill generation statistics",
+        target=_backfill_generation_stats_task,
+        description="Rebuilds the daily generation rollup from every user's discussion database.",
+        owner_username=current_admin.username,
+        priority="maintenance"
+    )
+    return db_task
+
+@system_management_router.post("/image-blobs/migrate", response_model=TaskInfo, status_code=202)
+async def migrate_message_images_to_blobs(current_admin: UserAuthDetails = Depends(get_current_admin_user)):
+    db_task = task_manager.submit_task(
+        name="Migrate message images to blob store",
+        target=_migrate_message_images_to_blobs_task,
+        description="Stores the base64 images of every user's messages in the content-addressed image store.",
+        owner_username=current_admin.username,
+        priority="maintenance"
+    )
+    return db_task
+
 @system_management_router.post("/backup/create", response_model=TaskInfo, status_code=202)
 async def create_backup(
     request: BackupRequest,
@@ -446,7 +531,8 @@ async def trigger_manual_task_pruning(current_admin: UserAuthDetails = Depends(g
         name="Manual Task Pruning",
         target=_prune_old_tasks_task,
         description="Cleaning up old finished background tasks.",
-        owner_username=current_admin.username
+        owner_username=current_admin.username,
+        priority="maintenance"
     )
     return db_task
 
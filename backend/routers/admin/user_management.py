@@ -6,7 +6,6 @@ from typing import List, Dict, Optional, Any
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.orm import Session, joinedload, aliased, Query as SQLAlchemyQuery
 from sqlalchemy import func, case, literal_column, exists, select
-from lollms_client import LollmsDataManager
 from pydantic import EmailStr
 
 from backend.db import get_db
@@ -22,10 +21,11 @@ from backend.models.user import (
 )
 from backend.models.admin import UserForAdminPanel, UserStats, UserActivityStat, AdminDashboardStats
 from backend.session import get_current_admin_user, get_user_data_root, user_sessions, get_user_lollms_client
-from backend.security import get_password_hash as hash_password, create_reset_token, send_generic_email
+from backend.security import get_password_hash as hash_password, create_reset_token, send_generic_email, revoke_cached_api_keys
 from backend.settings import settings
 from backend.config import INITIAL_ADMIN_USER_CONFIG
 from backend.task_manager import task_manager, Task, TaskInfo
+from backend.discussion_manager import get_user_discussion_manager, discussion_db_registry
 from ascii_colors import trace_exception
 
 user_management_router = APIRouter()
@@ -265,7 +265,7 @@ async def get_user_stats(user_id: int, db: Session = Depends(get_db)):
     try:
         user_discussions_db_path = get_user_data_root(user.username) / "discussions.db"
         if user_discussions_db_path.exists():
-            dm = LollmsDataManager(db_path=f"sqlite:///{user_discussions_db_path.resolve()}")
+            dm = get_user_discussion_manager(user.username)
             session = dm.get_session()
             try:
                 message_stats_raw = session.query(
@@ -333,6 +333,8 @@ async def admin_update_user(user_id: int, update_data: AdminUserUpdate, db: Sess
     db.refresh(user)
     if user.username in user_sessions:
         user_sessions[user.username]["lollms_clients_cache"] = {}
+    if not user.is_active:
+        revoke_cached_api_keys(user_id=user.id)
     return _project_user_public(user)
 
 @user_management_router.post("/users/batch-update-settings", response_model=Dict[str, str])
@@ -405,6 +407,7 @@ async def admin_deactivate_user(user_id: int, db: Session = Depends(get_db), cur
     user.status = "inactivated_by_admin"
     db.commit()
     db.refresh(user)
+    revoke_cached_api_keys(user_id=user.id)
     if user.username in user_sessions:
         del user_sessions[user.username]
     return _project_user_public(user)
@@ -444,8 +447,10 @@ async def admin_remove_user(user_id: int, db: Session = Depends(get_db), current
     user_data_dir = get_user_data_root(user.username)
     if user.username in user_sessions:
         del user_sessions[user.username]
+    discussion_db_registry.invalidate(user.username)
     db.delete(user)
     db.commit()
+    revoke_cached_api_keys(user_id=user_id)
     
     if user_data_dir.exists():
         task_manager.submit_task(
@@ -8,7 +8,7 @@ from backend.db import get_db
 from backend.db.models.api_key import OpenAIAPIKey as DBAPIKey
 from backend.db.models.user import User as DBUser
 from backend.models import UserAuthDetails, APIKeyCreate, APIKeyPublic, NewAPIKeyResponse
-from backend.security import generate_api_key, hash_api_key
+from backend.security import generate_api_key, hash_api_key, revoke_cached_api_keys
 from backend.session import get_current_active_user
 from backend.settings import settings
 
@@ -93,6 +93,7 @@ def delete_multiple_api_keys(
         )
         num_deleted = query.delete(synchronize_session=False)
         db.commit()
+        revoke_cached_api_keys(key_ids=key_ids)
 
         if num_deleted != len(key_ids):
             print(f"Warning: User {current_user.username} requested deletion of {len(key_ids)} keys, but only {num_deleted} were found and deleted.")
@@ -118,5 +119,6 @@ def delete_single_api_key(
 
     db.delete(key_to_delete)
     db.commit()
+    revoke_cached_api_keys(key_ids=[key_id])
     
     return Response(status_code=204)
\ No newline at end of file
@@ -246,7 +246,6 @@ async def login_for_access_token(
         session_llm_params = {k: v for k, v in session_llm_params.items() if v is not None}
 
         user_sessions[user.username] = {
-            "safe_store_instances": {},
             "discussions": {}, "discussion_titles": {},
             "active_vectorizer": initial_vectorizer, 
             "lollms_model_name": initial_model_name,
@@ -452,14 +451,7 @@ async def logout(
 ) -> Dict[str, str]:
     username = current_user_details.username
     if username in user_sessions:
-        if "safe_store_instances" in user_sessions[username]:
-            for ds_id, ss_instance in user_sessions[username]["safe_store_instances"].items():
-                if hasattr(ss_instance, 'close') and callable(ss_instance.close):
-                    try:
-                        background_tasks.add_task(ss_instance.close)
-                    except Exception as e:
-                        print(f"Error scheduling SafeStore {ds_id} closure for {username}: {e}")
-        
+        # SafeStore instances are shared across users (safe_store_registry) and outlive sessions
         del user_sessions[username]
         print(f"INFO: User '{username}' session cleared from server memory.")
     
@@ -13,7 +13,7 @@ import threading
 # Third-Party Imports
 import fitz  # PyMuPDF
 from fastapi import (
-    APIRouter, BackgroundTasks, Depends, HTTPException, Query)
+    APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response)
 from sqlalchemy.orm import Session
 from ascii_colors import trace_exception
 
@@ -44,7 +44,9 @@ from backend.generation.stt import build_stt_router
 from backend.routers.discussion.sharing import build_discussion_sharing_router
 from backend.routers.discussion.utils import build_utils_router
 from backend.db.models.discussion import SharedDiscussionLink
-from .helpers import get_discussion_and_owner_for_request
+from .helpers import get_discussion_and_owner_for_request, get_discussion_owner_for_request
+from backend.discussion_branch_index import load_branch_page
+from backend.image_blob_store import image_blob_store
 
 def build_discussions_router():
     # safe_store is needed for RAG callbacks
@@ -170,35 +172,37 @@ def build_discussions_router():
         return db.query(DBUser).filter(DBUser.id.in_(list(participant_ids))).all()
 
     @router.get("/{discussion_id}", response_model=List[MessageOutput])
-    async def get_messages_for_discussion(discussion_id: str, branch_id: Optional[str] = Query(None), current_user: UserAuthDetails = Depends(get_current_active_user), db: Session = Depends(get_db)) -> List[MessageOutput]:
+    async def get_messages_for_discussion(
+        discussion_id: str,
+        response: Response,
+        branch_id: Optional[str] = Query(None),
+        before: Optional[str] = Query(None, description="Return the messages preceding this one (the oldest message of the previous page)."),
+        limit: int = Query(100, ge=1, le=500),
+        current_user: UserAuthDetails = Depends(get_current_active_user),
+        db: Session = Depends(get_db)
+    ) -> List[MessageOutput]:
         """
-        Retrieves messages for a specific branch of a discussion.
-        Calculates sibling branches across the entire discussion history for navigation.
+        Retrieves one page of messages for a specific branch of a discussion, newest last.
+        Only the page and the siblings of its messages are read from the owner's
+        discussions.db. X-Has-More tells whether older messages exist; pass the
+        first returned message id as `before` to load them.
         """
-        discussion_obj, _, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db)
-
-        # 1. Determine which leaf node defines the branch we are viewing
-        branch_tip_to_load = branch_id or discussion_obj.active_branch_id
-        
-        # 2. Get the linear sequence of messages for this branch
-        messages_in_branch = discussion_obj.get_branch(branch_tip_to_load)
-        
-        # Protective limit for browser stability
-        if len(messages_in_branch) > 100:
-            messages_in_branch = messages_in_branch[-100:]
+        owner_username, _ = get_discussion_owner_for_request(discussion_id, current_user, db)
 
-        # 3. Map children for the entire discussion to detect siblings correctly
-        all_messages_in_discussion = discussion_obj.get_all_messages_flat()
-        children_map = {}
-        for msg_obj in all_messages_in_discussion:
-            if msg_obj.parent_id:
-                if msg_obj.parent_id not in children_map:
-                    children_map[msg_obj.parent_id] = []
-                children_map[msg_obj.parent_id].append(msg_obj.id)
+        # 1-3. Walk `limit` messages up the branch and collect the children of their parents (branch points)
+        branch_tip_to_load, messages_in_branch, children_map, has_more = load_branch_page(
+            get_user_discussion_manager(owner_username), discussion_id, branch_id, before=before, limit=limit
+        )
+        response.headers["X-Has-More"] = "true" if has_more else "false"
 
-        # 4. Load user-specific interaction data
-        db_user = db.query(DBUser).filter(DBUser.username == current_user.username).one()
-        user_grades = {g.message_id: g.grade for g in db.query(UserMessageGrade).filter_by(user_id=db_user.id, discussion_id=discussion_id).all()}
+        # 4. Load user-specific interaction data for the page
+        user_grades = {}
+        if messages_in_branch:
+            user_grades = {g.message_id: g.grade for g in db.query(UserMessageGrade).filter(
+                UserMessageGrade.user_id == current_user.id,
+                UserMessageGrade.discussion_id == discussion_id,
+                UserMessageGrade.message_id.in_([m.id for m in messages_in_branch])
+            ).all()}
 
         messages_output = []
         for msg in messages_in_branch:
@@ -210,14 +214,12 @@ def build_discussions_router():
             elif isinstance(images_list_raw, list):
                 images_list = images_list_raw
             
-            full_image_refs = []
+            full_image_refs = await image_blob_store.image_refs_async(owner_username, images_list, msg.id)
             active_images_bools = []
             for img_data in images_list:
                 if isinstance(img_data, dict) and 'image' in img_data:
-                    full_image_refs.append(f"data:image/png;base64,{img_data['image']}")
                     active_images_bools.append(img_data.get('active', True))
                 elif isinstance(img_data, str):
-                    full_image_refs.append(f"data:image/png;base64,{img_data}")
                     active_images_bools.append(True)
 
             msg_metadata_raw = msg.metadata
@@ -453,7 +455,7 @@ def build_discussions_router():
 
     @router.get("/{discussion_id}/full_tree", response_model=List[MessageOutput])
     async def get_full_discussion_tree(discussion_id: str, current_user: UserAuthDetails = Depends(get_current_active_user), db: Session = Depends(get_db)) -> List[MessageOutput]:
-        discussion_obj, _, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db)
+        discussion_obj, owner_username, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db)
         all_messages_in_discussion = discussion_obj.get_all_messages_flat()
         
         children_map: Dict[Optional[str], List[str]] = {}
@@ -485,14 +487,12 @@ def build_discussions_router():
             elif isinstance(images_list_raw, list):
                 images_list = images_list_raw
             
-            full_image_refs = []
+            full_image_refs = await image_blob_store.image_refs_async(owner_username, images_list, msg_obj.id)
             active_images_bools = []
             for img_data in images_list:
                 if isinstance(img_data, dict) and 'image' in img_data:
-                    full_image_refs.append(f"data:image/png;base64,{img_data['image']}")
                     active_images_bools.append(img_data.get('active', True))
                 elif isinstance(img_data, str):
-                    full_image_refs.append(f"data:image/png;base64,{img_data}")
                     active_images_bools.append(True)
                     
             msg_metadata_raw = msg_obj.metadata
@@ -60,3 +60,38 @@ async def get_discussion_and_owner_for_request(
             return discussion_obj, current_user.username, 'owner', owner_db
 
     raise HTTPException(status_code=404, detail="Discussion not found or access denied.")
+
+def get_discussion_owner_for_request(
+    discussion_id: str,
+    current_user: UserAuthDetails,
+    db: Session,
+    required_permission: str = 'view'
+) -> Tuple[str, str]:
+    """
+    Resolves the owner username and the caller's permission level for a discussion
+    without loading it (no LollmsDiscussion, no message rows), for read paths that
+    query the owner's discussions.db directly.
+    """
+    from backend.discussion_manager import get_user_discussion_manager
+    dm_local = get_user_discussion_manager(current_user.username)
+
+    # Column query: the Discussion model eagerly joins all its messages
+    with dm_local.get_session() as session:
+        if session.query(dm_local.DiscussionModel.id).filter(dm_local.DiscussionModel.id == discussion_id).first():
+            return current_user.username, 'owner'
+
+    shared_link = db.query(DBSharedDiscussionLink).options(
+        joinedload(DBSharedDiscussionLink.owner)
+    ).filter(
+        DBSharedDiscussionLink.discussion_id == discussion_id,
+        DBSharedDiscussionLink.shared_with_user_id == current_user.id
+    ).first()
+
+    if shared_link:
+        permission_hierarchy = {"view": ["view", "interact"], "interact": ["interact"]}
+        user_permission = shared_link.permission_level
+        if required_permission != 'owner' and user_permission not in permission_hierarchy.get(required_permission, []):
+            raise HTTPException(status_code=403, detail=f"You need '{required_permission}' permission for this discussion.")
+        return shared_link.owner.username, user_permission
+
+    raise HTTPException(status_code=404, detail="Discussion not found or access denied.")
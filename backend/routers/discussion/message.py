@@ -46,6 +46,7 @@ from backend.db.models.user import (User as DBUser, UserMessageGrade,
                                      UserStarredDiscussion)
 from backend.discussion import get_user_discussion, get_user_discussion_manager
 from backend.routers.discussion.helpers import get_discussion_and_owner_for_request
+from backend.image_blob_store import image_blob_store
 from backend.models import (UserAuthDetails, ArtefactInfo, ContextStatusResponse,
                             DataZones, DiscussionBranchSwitchRequest,
                             DiscussionDataZoneUpdate, DiscussionExportRequest,
@@ -122,7 +123,7 @@ def build_message_router(router: APIRouter):
     async def grade_discussion_message(discussion_id: str, message_id: str, grade_update: MessageGradeUpdate, current_user: UserAuthDetails = Depends(get_current_active_user), db: Session = Depends(get_db)):
         username = current_user.username
         db_user = db.query(DBUser).filter(DBUser.username == username).one()
-        discussion_obj, _, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db, 'interact')
+        discussion_obj, owner_username, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db, 'interact')
         if not discussion_obj: raise HTTPException(status_code=404, detail="Discussion not found.")
         with message_grade_lock:
             grade = db.query(UserMessageGrade).filter_by(user_id=db_user.id, discussion_id=discussion_id, message_id=message_id).first()
@@ -136,7 +137,7 @@ def build_message_router(router: APIRouter):
         branch = discussion_obj.get_branch(discussion_obj.active_branch_id)
         target_message = next((msg for msg in branch if msg.id == message_id), None)
         if not target_message: raise HTTPException(status_code=404, detail="Message not found in active branch.")
-        full_image_refs = [ f"data:image/png;base64,{img}" for img in target_message.images or []]
+        full_image_refs = await image_blob_store.image_refs_async(owner_username, target_message.images, target_message.id)
 
         msg_metadata = target_message.metadata or {}
         return MessageOutput(
@@ -156,7 +157,7 @@ def build_message_router(router: APIRouter):
         db: Session = Depends(get_db)
     ):
         username = current_user.username
-        discussion_obj, _, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db, 'interact')
+        discussion_obj, owner_username, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db, 'interact')
         if not discussion_obj:
             raise HTTPException(status_code=404, detail="Discussion not found.")
         
@@ -173,13 +174,11 @@ def build_message_router(router: APIRouter):
         all_image_uris = (payload.kept_images_b64 or []) + (payload.new_images_b64 or [])
         
         for uri in payload.kept_images_b64 or []:
-            try:
-                if isinstance(uri, str) and ',' in uri:
-                    _, encoded = uri.split(',', 1)
-                    final_images_b64.append(encoded)
-                else:
-                    final_images_b64.append(uri)
-            except ValueError:
+            # Kept images come back as the blob URLs or data URIs they were sent as;
+            # URLs pointing outside the discussion owner's store are dropped
+            if isinstance(uri, str):
+                uri = image_blob_store.resolve_to_b64(uri, owner_username)
+            if uri is not None:
                 final_images_b64.append(uri)
 
         for uri in payload.new_images_b64 or []:
@@ -220,7 +219,7 @@ def build_message_router(router: APIRouter):
         db_user = db.query(DBUser).filter(DBUser.username == username).one()
         grade = db.query(UserMessageGrade.grade).filter_by(user_id=db_user.id, discussion_id=discussion_id, message_id=message_id).scalar() or 0
         
-        full_image_refs = [f"data:image/png;base64,{img}" for img in target_message.images or []]
+        full_image_refs = await image_blob_store.image_refs_async(owner_username, target_message.images, target_message.id)
 
         msg_metadata = target_message.metadata or {}
         return MessageOutput(
@@ -242,7 +241,7 @@ def build_message_router(router: APIRouter):
         current_user: UserAuthDetails = Depends(get_current_active_user),
         db: Session = Depends(get_db)
     ):
-        discussion_obj, _, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db, 'interact')
+        discussion_obj, owner_username, _, _ = await get_discussion_and_owner_for_request(discussion_id, current_user, db, 'interact')
         
         msg = discussion_obj.get_message(message_id)
         if not msg:
@@ -276,7 +275,7 @@ def build_message_router(router: APIRouter):
         db_user = db.query(DBUser).filter(DBUser.username == current_user.username).one()
         grade = db.query(UserMessageGrade.grade).filter_by(user_id=db_user.id, discussion_id=discussion_id, message_id=message_id).scalar() or 0
         
-        full_image_refs = [f"data:image/png;base64,{img}" for img in msg.images or []]
+        full_image_refs = await image_blob_store.image_refs_async(owner_username, msg.images, msg.id)
         msg_metadata = msg.metadata or {}
 
         return MessageOutput(
@@ -367,7 +366,7 @@ def build_message_router(router: APIRouter):
                 task.log("Image added to gallery and activated.")
                 
                 # Return full message to sync frontend
-                full_image_refs = [f"data:image/png;base64,{img}" for img in msg_obj.images or []]
+                full_image_refs = image_blob_store.image_refs(username, msg_obj.images, msg_obj.id)
                 return {
                     "status": "image_generated_in_message",
                     "discussion_id": discussion_id,
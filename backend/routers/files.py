@@ -1,4 +1,5 @@
 # backend/routers/files.py
+import asyncio
 import base64
 import io
 import re
@@ -11,10 +12,11 @@ import socket
 import ipaddress
 from urllib.parse import urlparse
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form, Request, Query
 from fastapi.responses import FileResponse, Response
+from sqlalchemy.orm import Session
 from werkzeug.utils import secure_filename
 import markdown2 
 from bs4 import BeautifulSoup 
@@ -31,26 +33,6 @@ from latex2mathml.converter import convert as latex2mathml
 from PIL import Image
 
 # Try to import optional document parsing libraries
-try:
-    from docx2python import docx2python
-except ImportError:
-    docx2python = None
-try:
-    from pptx.enum.shapes import MSO_SHAPE_TYPE
-except ImportError:
-    MSO_SHAPE_TYPE = None
-try:
-    import pandas as pd
-except ImportError:
-    pd = None
-try:
-    import extract_msg
-except ImportError:
-    extract_msg = None
-try:
-    import fitz 
-except ImportError:
-    fitz = None
 try:
     from mdtopptx import parse_markdown as md_to_pptx_parse, create_ppt
 except ImportError:
@@ -58,6 +40,9 @@ except ImportError:
     create_ppt = None
 
 
+from backend.db import get_db
+from backend.db.models.user import User as DBUser
+from backend.db.models.discussion import SharedDiscussionLink as DBSharedDiscussionLink
 from backend.session import (
     get_current_active_user, get_user_temp_uploads_path
 )
@@ -67,6 +52,8 @@ from backend.discussion import get_user_discussion
 from ascii_colors import trace_exception
 from backend.config import TEMP_UPLOADS_DIR_NAME
 from backend.settings import settings
+from backend.document_extraction import extract_text_from_file_async
+from backend.image_blob_store import image_blob_store
 
 files_router = APIRouter(prefix="/api/files", tags=["Files"])
 upload_router = APIRouter(prefix="/api/upload", tags=["Files"])
@@ -133,164 +120,49 @@ async def get_public_fun_fact_image(filename: str):
         
     return FileResponse(file_path)
 
-def _process_msg_attachment(att_bytes: bytes, att_name: str, images: List[str], extract_images: bool = True) -> Optional[str]:
-    """Helper to process a single attachment from an MSG file."""
-    att_ext = Path(att_name).suffix.lower()
-    
-    if att_ext in [".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tif", ".tiff"]:
-        if extract_images:
-            images.append(base64.b64encode(att_bytes).decode("utf-8"))
-        return None 
-    
-    try:
-        text_guess = att_bytes.decode("utf-8")
-    except UnicodeDecodeError:
-        try:
-            text_guess = att_bytes.decode("latin-1", errors="replace")
-        except Exception:
-            text_guess = ""
-    
-    CODE_EXTENSIONS = {
-        ".txt": "text", ".md": "markdown", ".py": "python", ".js": "javascript", ".ts": "typescript", ".html": "html", ".css": "css",
-        ".c": "c", ".cpp": "cpp", ".h": "cpp", ".hpp": "cpp", ".cs": "csharp", ".java": "java",
-        ".json": "json", ".xml": "xml", ".sh": "bash", ".vhd": "vhdl", ".v": "verilog",
-        ".rb": "ruby", ".php": "php", ".go": "go", ".rs": "rust", ".swift": "swift", ".kt": "kotlin",
-        ".yaml": "yaml", ".yml": "yaml", ".sql": "sql", ".log": "text", ".csv": "csv"
-    }
-    
-    if att_ext in CODE_EXTENSIONS:
-        lang = CODE_EXTENSIONS[att_ext]
-        return f"### Attachment: {att_name}\n\n````{lang}\n{text_guess}\n````"
-    
-    return f"- Attachment: {att_name} ({len(att_bytes)} bytes - content ignored)"
-
-
-def extract_text_from_file_bytes(file_bytes: bytes, filename: str, extract_images: bool = True) -> Tuple[str, List[str]]:
+def _can_read_image_blobs(owner: str, current_user: UserAuthDetails, db: Session) -> bool:
+    """A user may read their own blobs and those of users who shared a discussion with them."""
+    if owner == secure_filename(current_user.username):
+        return True
+    owner_db = db.query(DBUser.id).filter(DBUser.username == owner).first()
+    if owner_db is None:
+        return False
+    return db.query(DBSharedDiscussionLink.id).filter(
+        DBSharedDiscussionLink.owner_user_id == owner_db.id,
+        DBSharedDiscussionLink.shared_with_user_id == current_user.id
+    ).first() is not None
+
+@files_router.get("/image-blobs/{owner}/{digest}")
+async def get_image_blob(
+    owner: str,
+    digest: str,
+    request: Request,
+    size: Optional[int] = Query(None, ge=16, le=4096),
+    current_user: UserAuthDetails = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
     """
-    Extracts text and embedded/generated images (as base64) from file bytes.
-    Returns: (extracted_text, list_of_base64_images)
+    Serves a message image from the content-addressed blob store, optionally as a
+    resized WebP variant. Only the owner and users with a discussion shared by the
+    owner may fetch it; others get a 404 so blob existence is not disclosed.
+    Blobs never change, so the digest is a strong ETag and the response is
+    cacheable forever.
     """
-    extension = Path(filename).suffix.lower()
-    
-    extracted_text = ""
-    images: List[str] = []
-    
-    # --- Document Type Handling ---
-    
-    if extension == ".pdf" and fitz:
-        try:
-            with fitz.open(stream=file_bytes, filetype="pdf") as pdf_doc:
-                text_parts = []
-                image_count = 0
-                for page in pdf_doc:
-                    text_parts.append(page.get_text())
-                    if extract_images:
-                        img_list = page.get_images(full=True)
-                        image_count += len(img_list)
-                        for img_info in img_list:
-                            xref = img_info[0]
-                            base_image = pdf_doc.extract_image(xref)
-                            images.append(base64.b64encode(base_image["image"]).decode('utf-8'))
-                extracted_text = "\n".join(text_parts).strip()
-                
-                if not extracted_text and image_count > 0:
-                    raise ValueError("This appears to be a scanned PDF with no text layer. LoLLMs cannot process it directly. Please use an OCR (Optical Character Recognition) tool to convert it to a text-based PDF or extract the text manually before uploading.")
-
-        except ValueError as e:
-             raise e
-        except Exception as e:
-            extracted_text = f"[Error processing PDF file: {e}. Is PyMuPDF (fitz) installed?]"
-            
-    elif extension == ".docx" and docx2python:
-        try:
-            with io.BytesIO(file_bytes) as docx_io:
-                result = docx2python(docx_io)
-                extracted_text = result.text
-                if result.images and extract_images:
-                    for image_bytes in result.images.values():
-                        images.append(base64.b64encode(image_bytes).decode("utf-8"))
-        except Exception as e:
-            extracted_text = f"[Error processing DOCX file: {e}. Is docx2python installed?]"
-            
-    elif (extension == ".xlsx" or "spreadsheetml" in filename.lower()) and pd:
-        try:
-            xls = pd.read_excel(io.BytesIO(file_bytes), sheet_name=None)
-            md_parts = []
-            for sheet_name, df in xls.items():
-                md_parts.append(f"### {sheet_name}\n\n{df.to_markdown(index=False)}")
-            extracted_text = "\n\n".join(md_parts)
-        except Exception as e:
-            extracted_text = f"[Error processing XLSX file: {e}. Is pandas installed?]"
-
-    elif extension == ".pptx" and MSO_SHAPE_TYPE:
-        try:
-            with io.BytesIO(file_bytes) as pptx_io:
-                prs = Presentation(pptx_io)
-                slide_texts: List[str] = []
-                for idx, slide in enumerate(prs.slides, start=1):
-                    slide_parts: List[str] = []
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text"):
-                            txt = (shape.text or "").strip()
-                            if txt: slide_parts.append(txt)
-                        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE and extract_images:
-                            images.append(base64.b64encode(shape.image.blob).decode("utf-8"))
-                    if slide_parts: slide_texts.append(f"--- Slide {idx} ---\n" + "\n".join(slide_parts))
-                extracted_text = "\n\n".join(slide_texts)
-        except Exception as e:
-            extracted_text = f"[Error processing PPTX file: {e}]"
-            
-    elif extension == ".msg" and extract_msg:
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".msg") as tf:
-                tf.write(file_bytes)
-                temp_path = tf.name
-            try:
-                msg = extract_msg.Message(temp_path)
-                header_lines = []
-                if getattr(msg, "subject", ""): header_lines.append(f"# {getattr(msg, 'subject', '')}")
-                meta = []
-                if getattr(msg, "sender", None) or getattr(msg, "from_", None): meta.append(f"From: {getattr(msg, 'sender', None) or getattr(msg, 'from_', None)}")
-                if getattr(msg, "to", ""): meta.append(f"To: {getattr(msg, 'to', '')}")
-                if getattr(msg, "date", ""): meta.append(f"Date: {getattr(msg, 'date', '')}")
-                if meta: header_lines.append("\n".join(meta))
-                header = "\n\n".join(header_lines)
-
-                msg_body = (getattr(msg, "body", "") or "").strip()
-                if not msg_body and getattr(msg, "htmlBody", None):
-                    msg_body = BeautifulSoup(getattr(msg, "htmlBody"), "html.parser").get_text()
-
-                attachment_text_parts: List[str] = [header, msg_body]
-                for att in msg.attachments:
-                    text_part = _process_msg_attachment(att.data or b"", att.longFilename or att.shortFilename or "attachment", images, extract_images=extract_images)
-                    if text_part: attachment_text_parts.append(text_part)
-
-                extracted_text = "\n\n".join([p for p in attachment_text_parts if p.strip()])
-
-            finally:
-                os.unlink(temp_path)
-        except Exception as e:
-            extracted_text = f"[Error processing MSG file: {e}. Is extract_msg installed?]"
-
-    # 6. Plain Text / Code
-    else:
-        try:
-            extracted_text = file_bytes.decode('utf-8')
-        except UnicodeDecodeError:
-            extracted_text = file_bytes.decode('latin-1', errors='replace')
-
-    # Add markdown code fence for recognized code files
-    CODE_EXTENSIONS = {
-        ".py", ".js", ".ts", ".html", ".css", ".c", ".cpp", ".h", ".hpp", ".cs", ".java",
-        ".json", ".xml", ".sh", ".vhd", ".v", ".rb", ".php", ".go", ".rs", ".swift", ".kt",
-        ".yaml", ".yml", ".sql", ".log", ".csv", ".txt", ".md"
-    }
-    if extension in CODE_EXTENSIONS:
-        lang = extension.strip('.').replace('c++', 'cpp').replace('c#', 'csharp')
-        if not extracted_text.startswith('```'):
-            extracted_text = f"````{lang}\n{extracted_text}\n````"
-            
-    return extracted_text, images
+    if not _can_read_image_blobs(owner, current_user, db):
+        raise HTTPException(status_code=404, detail="Image not found.")
+    etag = f'"{digest}-{image_blob_store.variant_size(size)}"' if size else f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    try:
+        blob = await asyncio.to_thread(image_blob_store.open_blob, secure_filename(owner), digest, size)
+    except Exception as e:
+        trace_exception(e)
+        raise HTTPException(status_code=500, detail="Could not read image.")
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    path, media_type = blob
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 @files_router.post("/extract-text")
 async def extract_text_from_file(
@@ -301,13 +173,25 @@ async def extract_text_from_file(
     Extracts text content from a single uploaded file.
     Supports various formats like PDF, DOCX, TXT, etc.
     """
+    tmp_path = None
     try:
-        content_bytes = await file.read()
-        text_content, _ = extract_text_from_file_bytes(content_bytes, file.filename, extract_images=False)
+        # Spool to disk so the extraction worker receives a path instead of the bytes
+        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp:
+            shutil.copyfileobj(file.file, tmp)
+            tmp_path = Path(tmp.name)
+        text_content, _ = await extract_text_from_file_async(tmp_path, file.filename, extract_images=False)
         return {"text_content": text_content}
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         trace_exception(e)
         raise HTTPException(status_code=500, detail=f"Failed to extract text from file: {str(e)}")
+    finally:
+        if tmp_path and tmp_path.exists():
+            try:
+                tmp_path.unlink()
+            except Exception:
+                pass
 
 @files_router.post("/export-markdown")
 async def export_as_markdown(
@@ -998,12 +882,16 @@ async def extract_and_embed_files(
             tmp_path = Path(tmp.name)
 
         try:
-            # Delegate to library's integrated import_file
-            result = discussion.import_file(
-                path=tmp_path,
-                mode=import_mode,
-                title=file.filename,
-                activate=True
+            # Delegate to library's integrated import_file. It parses the document and
+            # mutates the discussion, so it runs in a thread rather than the extraction pool.
+            result = await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: discussion.import_file(
+                    path=tmp_path,
+                    mode=import_mode,
+                    title=file.filename,
+                    activate=True
+                )
             )
 
             text_art = result.get("text_artefact")
@@ -23,8 +23,9 @@ from backend.db.models.personality import Personality as DBPersonality
 from backend.db.models.config import LLMBinding as DBLLMBinding, TTIBinding as DBTTIBinding, TTSBinding as DBTTSBinding, STTBinding as DBSTTBinding, RAGBinding as DBRAGBinding
 from backend.db.models.datastore import DataStore as DBDataStore
 from backend.db.models.voice import UserVoice as DBUserVoice
-from backend.security import verify_api_key
+from backend.security import api_key_cache
 from backend.session import user_sessions, build_lollms_client_from_params, get_safe_store_instance, get_user_data_root
+from backend.rag_executor import run_rag
 from backend.settings import settings
 from backend.utils import track_service_usage, check_rate_limit
 from backend.routers.services.openai_v1 import (
@@ -61,7 +62,7 @@ async def get_user_for_lollms_service(
             if len(parts) < 2: raise HTTPException(status_code=401)
             key_prefix = parts[0] + "_" + parts[1]
             db_key = db.query(DBAPIKey).filter(DBAPIKey.key_prefix == key_prefix).first()
-            if not db_key or not verify_api_key(api_key, db_key.key_hash): raise HTTPException(status_code=401)
+            if not db_key or not api_key_cache.verify(api_key, db_key.id, db_key.user_id, db_key.key_hash): raise HTTPException(status_code=401)
             user = db.query(DBUser).filter(DBUser.id == db_key.user_id).first()
 
         if not user or not user.is_active: raise HTTPException(status_code=401)
@@ -305,8 +306,6 @@ async def list_rag_databases(
 
 @lollms_v1_router.post("/rag/query")
 async def query_user_datastore(request: RagQueryRequest, user: DBUser = Depends(get_user_for_lollms_service), db: Session = Depends(get_db)):
-    loop = asyncio.get_running_loop()
-    
     def _query():
         try:
             ss = get_safe_store_instance(user.username, request.datastore_id, db, permission_level="read_query")
@@ -317,7 +316,7 @@ async def query_user_datastore(request: RagQueryRequest, user: DBUser = Depends(
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"RAG query failed: {str(e)}")
 
-    return await loop.run_in_executor(executor, _query)
+    return await run_rag("query", _query)
 
 @lollms_v1_router.post("/images/edit", response_model=ImageGenerationResponse)
 async def edit_image_lollms(request: ImageEditRequest, user: DBUser = Depends(get_user_for_lollms_service), db: Session = Depends(get_db)):
@@ -17,7 +17,7 @@ from backend.db import get_db
 from backend.db.models.user import User as DBUser
 from backend.db.models.api_key import OpenAIAPIKey as DBAPIKey
 from backend.db.models.config import LLMBinding as DBLLMBinding
-from backend.security import verify_api_key
+from backend.security import api_key_cache
 from backend.session import user_sessions, build_lollms_client_from_params
 from backend.settings import settings
 from backend.utils import track_service_usage, check_rate_limit
@@ -51,7 +51,7 @@ async def get_user_from_api_key(authorization: Optional[HTTPAuthorizationCredent
         if len(key_parts) < 2: raise HTTPException(status_code=401)
         key_prefix = key_parts[0] + "_" + key_parts[1]
         db_key = db.query(DBAPIKey).filter(DBAPIKey.key_prefix == key_prefix).first()
-        if not db_key or not verify_api_key(api_key, db_key.key_hash): raise HTTPException(status_code=401)
+        if not db_key or not api_key_cache.verify(api_key, db_key.id, db_key.user_id, db_key.key_hash): raise HTTPException(status_code=401)
         user = db.query(DBUser).filter(DBUser.id == db_key.user_id).first()
 
     if not user or not user.is_active: raise HTTPException(status_code=401)
@@ -10,6 +10,7 @@ import re
 import io
 import random
 import string
+import tempfile
 from pathlib import Path
 from typing import List, Optional, Dict, Tuple, Union, Any
 from concurrent.futures import ThreadPoolExecutor
@@ -27,12 +28,12 @@ from backend.db.models.api_key import OpenAIAPIKey as DBAPIKey
 from backend.db.models.config import LLMBinding as DBLLMBinding, TTIBinding as DBTTIBinding
 from backend.db.models.config import GlobalConfig
 from backend.db.models.personality import Personality as DBPersonality
-from backend.security import verify_api_key
+from backend.security import api_key_cache
 from backend.session import user_sessions, build_lollms_client_from_params, get_user_data_root, find_model_by_alias, resolve_model_name, invalidate_model_cache
 from backend.settings import settings
 from lollms_client import LollmsPersonality, MSG_TYPE
 from ascii_colors import ASCIIColors, trace_exception
-from backend.routers.files import extract_text_from_file_bytes 
+from backend.document_extraction import extract_text_from_file as extract_document_text
 from backend.utils import track_service_usage, check_rate_limit, get_system_cache, set_system_cache
 
 # --- Router Definition ---
@@ -299,7 +300,7 @@ async def get_user_from_api_key(
                 "repeat_penalty": admin_user.llm_repeat_penalty, "repeat_last_n": admin_user.llm_repeat_last_n
             }
             user_sessions[admin_user.username] = {
-                "safe_store_instances": {}, "discussions": {},
+                "discussions": {},
                 "active_vectorizer": admin_user.safe_store_vectorizer,
                 "lollms_model_name": admin_user.lollms_model_name,
                 "llm_params": {k: v for k, v in session_llm_params.items() if v is not None},
@@ -328,7 +329,7 @@ async def get_user_from_api_key(
 
     is_valid = await loop.run_in_executor(
         executor,
-        lambda: verify_api_key(api_key, db_key.key_hash)
+        lambda: api_key_cache.verify(api_key, db_key.id, db_key.user_id, db_key.key_hash)
     )
     if not is_valid:
         raise HTTPException(status_code=401, detail="Invalid API Key.")
@@ -350,7 +351,7 @@ async def get_user_from_api_key(
             "repeat_last_n": getattr(user, "llm_repeat_last_n", None)
         }
         user_sessions[user.username] = {
-            "safe_store_instances": {}, "discussions": {},
+            "discussions": {},
             "active_vectorizer": getattr(user, "safe_store_vectorizer", None),
             "lollms_model_name": getattr(user, "lollms_model_name", None),
             "llm_params": {k: v for k, v in session_llm_params.items() if v is not None},
@@ -1644,17 +1645,31 @@ async def extract_text_from_file(
     request: FileExtractionRequest,
     user: DBUser = Depends(get_user_from_api_key)
 ):
+    tmp_path = None
     try:
         file_bytes = base64.b64decode(request.file)
-        # File extraction can be CPU intensive for large docs
+        # File extraction can be CPU intensive for large docs: hand the extraction
+        # pool a temporary file path rather than the bytes
+        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(request.filename).suffix) as tmp:
+            tmp.write(file_bytes)
+            tmp_path = Path(tmp.name)
+        del file_bytes
         loop = asyncio.get_running_loop()
         extracted_text, _ = await loop.run_in_executor(
             executor, 
-            lambda: extract_text_from_file_bytes(file_bytes, request.filename)
+            lambda: extract_document_text(tmp_path, request.filename, extract_images=False)
         )
         return FileExtractionResponse(text=extracted_text)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="Invalid base64 encoding.")
     except Exception as e:
         trace_exception(e)
         raise HTTPException(status_code=500, detail=f"File extraction failed: {str(e)}")
+    finally:
+        if tmp_path and tmp_path.exists():
+            try:
+                tmp_path.unlink()
+            except Exception:
+                pass
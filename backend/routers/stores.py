@@ -14,6 +14,8 @@ from pydantic import BaseModel
 from sqlalchemy.orm import joinedload
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Third-Party Imports
 from fastapi import (
@@ -90,13 +92,16 @@ except ImportError:
 from backend.session import (
     get_current_active_user,
     get_safe_store_instance,
-    get_user_datastore_root_path,
-    user_sessions
+    get_user_datastore_root_path
 )
 from backend.task_manager import task_manager, Task
 # FIX: Import RAGBinding as DBRAGBinding to match usage
 from backend.db.models.config import RAGBinding as DBRAGBinding
-from backend.routers.files import extract_text_from_file_bytes
+from backend.document_extraction import parse_document_for_indexing
+from backend.rag_executor import run_rag
+from backend.safe_store_registry import safe_store_registry
+from backend.rag_query_cache import rag_query_cache
+from backend.ws_manager import manager
 
 # --- NEW Pydantic Models for Graph Operations ---
 class DataStoreDetails(BaseModel):
@@ -154,7 +159,30 @@ def _sanitize_numpy(data: Any) -> Any:
     return data
 
 # --- Task Functions ---
+RAG_METADATA_PROMPT = "Generate short metadata for this document. Extract the title, a brief subject, and any authors mentioned. Present this as a JSON object with keys 'title', 'subject', and 'authors' (as a list of strings)."
+RAG_METADATA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "description": "A concise and descriptive title for the document."},
+        "subject": {"type": "string", "description": "The main subject or topic of the document."},
+        "authors": {"type": "array", "items": {"type": "string"}, "description": "A list of authors, if any are mentioned."}
+    },
+    "required": ["title", "subject"]
+}
+
+def _invalidate_rag_query_cache(datastore_id: str):
+    """Drops cached RAG tool results for a datastore after its content changed, in every worker."""
+    rag_query_cache.invalidate(datastore_id)
+    manager.broadcast_internal_event_sync("rag_query_cache_invalidate", {"datastore_id": datastore_id})
+
 def _upload_rag_files_task(task: Task, username: str, datastore_id: str, file_paths: List[str], metadata_option: str, manual_metadata_json: str, vectorize_with_metadata: bool):
+    """
+    Staged ingestion pipeline:
+      1. parse: files are parsed in parallel (extraction process pool),
+      2. metadata: optional LLM metadata calls run concurrently with bounded parallelism,
+      3. index: this thread is the single SafeStore writer (chunking, vectorization, insert)
+         and consumes files as soon as their earlier stages are done.
+    """
     db = next(get_db())
     try:
         datastore_record = db.query(DBDataStore).filter(DBDataStore.id == datastore_id).first()
@@ -172,50 +200,66 @@ def _upload_rag_files_task(task: Task, username: str, datastore_id: str, file_pa
 
         processed_count = 0
         error_count = 0
+        total_chunks = 0
         total_files = len(file_paths)
-        
-        with ss:
-            for i, file_path_str in enumerate(file_paths):
+        parse_workers = max(1, int(settings.get("rag_ingestion_parse_workers", 4)))
+        metadata_slots = threading.Semaphore(max(1, int(settings.get("rag_ingestion_metadata_concurrency", 2))))
+        stage_counts = {"parsed": 0, "metadata": 0}
+        stage_lock = threading.Lock()
+
+        def prepare(file_path: Path):
+            """Parse + metadata stages. Runs in a pipeline worker thread."""
+            if task.cancellation_event.is_set():
+                return None
+            try:
+                # A ParsingError (encrypted/unreadable file) propagates: the file is skipped, not indexed
+                text = parse_document_for_indexing(file_path)
+            finally:
+                with stage_lock:
+                    stage_counts["parsed"] += 1
+
+            metadata = None
+            if metadata_option == 'manual':
+                metadata = manual_metadata.get(file_path.name)
+            elif metadata_option == 'auto-generate' and lc:
+                if text.strip():
+                    with metadata_slots:
+                        if task.cancellation_event.is_set():
+                            return None
+                        metadata = lc.generate_structured_content(text[:12000], schema=RAG_METADATA_SCHEMA, system_prompt=RAG_METADATA_PROMPT)
+                else:
+                    task.log(f"Skipping metadata generation for empty file {file_path.name}", "WARNING")
+                with stage_lock:
+                    stage_counts["metadata"] += 1
+            return text, metadata
+
+        start_time = time.time()
+        with ss, ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix="rag-ingest") as pipeline:
+            futures = {pipeline.submit(prepare, Path(p)): Path(p) for p in file_paths}
+            for indexed, future in enumerate(as_completed(futures), start=1):
                 if task.cancellation_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
                     task.log("Upload task cancelled.", level="WARNING")
                     break
-                
-                file_path = Path(file_path_str)
+
+                file_path = futures[future]
                 task.set_file_info(file_name=file_path.name, total_files=total_files)
-                task.log(f"Processing file {i+1}/{total_files}: {file_path.name}")
-                
                 try:
-                    metadata = None
-                    if metadata_option == 'manual':
-                        metadata = manual_metadata.get(file_path.name)
-                        if metadata:
-                            task.log(f"Using manual metadata: {metadata}")
-
-                    elif metadata_option == 'auto-generate' and lc:
-                        task.log(f"Generating metadata for {file_path.name}")
-                        file_bytes = file_path.read_bytes()
-                        text_content, _ = extract_text_from_file_bytes(file_bytes, file_path.name)
-
-                        if text_content.strip():
-                            metadata_prompt = "Generate short metadata for this document. Extract the title, a brief subject, and any authors mentioned. Present this as a JSON object with keys 'title', 'subject', and 'authors' (as a list of strings)."
-                            schema = {
-                                "type": "object",
-                                "properties": {
-                                    "title": {"type": "string", "description": "A concise and descriptive title for the document."},
-                                    "subject": {"type": "string", "description": "The main subject or topic of the document."},
-                                    "authors": {"type": "array", "items": {"type": "string"}, "description": "A list of authors, if any are mentioned."}
-                                },
-                                "required": ["title", "subject"]
-                            }
-                            truncated_text = text_content[:12000]
-                            metadata = lc.generate_structured_content(truncated_text, schema=schema, system_prompt=metadata_prompt)
-                            task.log(f"Generated metadata: {metadata}")
-                        else:
-                            task.log(f"Skipping metadata generation for empty file {file_path.name}", "WARNING")
-
-                    # Use new add_document return format
-                    stats = ss.add_document(
-                        str(file_path),
+                    prepared = future.result()
+                    if prepared is None:
+                        continue
+                    text, metadata = prepared
+                    if metadata:
+                        task.log(f"Using metadata for {file_path.name}: {metadata}")
+
+                    # The text was parsed with SafeStore's own parser, so add_text indexes
+                    # exactly what add_document would, under the same document path. Unlike
+                    # add_document, re-uploads are deduplicated on the hash of this text
+                    # rather than of the file bytes.
+                    stats = ss.add_text(
+                        unique_id=str(file_path.resolve()),
+                        text=text,
                         metadata=metadata,
                         vectorize_with_metadata=vectorize_with_metadata if metadata else False,
                     )
@@ -225,6 +269,7 @@ def _upload_rag_files_task(task: Task, username: str, datastore_id: str, file_pa
 
                     if num_added > 0:
                         processed_count += 1
+                        total_chunks += num_added
                         msg = f"Successfully added {num_added} chunks from {file_path.name}."
                         if num_ignored > 0:
                             msg += f" (Ignored {num_ignored} invalid/empty chunks)"
@@ -245,6 +290,13 @@ def _upload_rag_files_task(task: Task, username: str, datastore_id: str, file_pa
                             task.log(f"Deleted empty/invalid file {file_path.name}.")
                         except: pass
 
+                except safe_store.ParsingError as e:
+                    error_count += 1
+                    task.log(f"Failed to parse {file_path.name}, skipped: {e}", level="WARNING")
+                    try:
+                        file_path.unlink()
+                    except: pass
+
                 except Exception as e:
                     error_count += 1
                     task.log(f"Error processing {file_path.name}: {e}", level="ERROR")
@@ -254,10 +306,25 @@ def _upload_rag_files_task(task: Task, username: str, datastore_id: str, file_pa
                             file_path.unlink()
                     except: pass
                 
-                progress = int(100 * (i + 1) / total_files)
-                task.set_progress(progress)
+                elapsed = max(time.time() - start_time, 1e-6)
+                with stage_lock:
+                    parsed, with_metadata = stage_counts["parsed"], stage_counts["metadata"]
+                stage_msg = f"Parsed {parsed}/{total_files}"
+                if metadata_option == 'auto-generate' and lc:
+                    stage_msg += f", metadata {with_metadata}/{total_files}"
+                task.log(f"{stage_msg}, indexed {indexed}/{total_files} ({total_chunks / elapsed:.1f} chunks/s)")
+                task.set_progress(int(100 * indexed / total_files))
         
-        task.result = {"message": f"Processing complete. Added {processed_count} files. Encountered {error_count} issues."}
+        if processed_count:
+            _invalidate_rag_query_cache(datastore_id)
+
+        elapsed = max(time.time() - start_time, 1e-6)
+        task.result = {
+            "message": f"Processing complete. Added {processed_count} files. Encountered {error_count} issues.",
+            "chunks_added": total_chunks,
+            "elapsed_seconds": round(elapsed, 2),
+            "chunks_per_second": round(total_chunks / elapsed, 2)
+        }
 
     except Exception as e:
         traceback.print_exc()
@@ -342,6 +409,7 @@ def _scrape_url_task(task: Task, username: str, datastore_id: str, url: str, dep
                 task.log("Warning: No content chunks were indexed from the scraped page.", level="WARNING")
             else:
                 task.log(f"Successfully indexed {num_added} chunks from scraped content.")
+                _invalidate_rag_query_cache(datastore_id)
             
         visited_urls = results.get('visited_urls', [])
         task.log(f"Successfully scraped {len(visited_urls)} page(s).")
@@ -472,7 +540,7 @@ async def get_datastore_details(
     
     try:
         # This will also handle permission checks
-        ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_query")
+        ss = await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="read_query")
         
         datastore_record = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
         if not datastore_record:
@@ -486,18 +554,22 @@ async def get_datastore_details(
         if db_path.exists():
             size_bytes = os.path.getsize(db_path)
         
-        chunk_count = 0
-        nodes_count = 0
-        edges_count = 0
-        with ss:
-            chunk_count = ss.db.count('chunks')
-            if GraphStore:
-                try:
-                    gs = GraphStore(ss)
-                    nodes_count = gs.count_nodes()
-                    edges_count = gs.count_relationships()
-                except Exception as graph_err:
-                    print(f"Could not get graph stats for datastore {datastore_id}: {graph_err}")
+        def _counts():
+            chunk_count = 0
+            nodes_count = 0
+            edges_count = 0
+            with ss:
+                chunk_count = ss.db.count('chunks')
+                if GraphStore:
+                    try:
+                        gs = GraphStore(ss)
+                        nodes_count = gs.count_nodes()
+                        edges_count = gs.count_relationships()
+                    except Exception as graph_err:
+                        print(f"Could not get graph stats for datastore {datastore_id}: {graph_err}")
+            return chunk_count, nodes_count, edges_count
+
+        chunk_count, nodes_count, edges_count = await run_rag("details", _counts)
 
         return DataStoreDetails(
             size_bytes=size_bytes, 
@@ -521,7 +593,7 @@ async def upload_rag_documents_to_datastore(
 ) -> TaskInfo:
     if not safe_store: raise HTTPException(status_code=501, detail="SafeStore not available.")
     
-    get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+    await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="read_write")
     datastore_record = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
     datastore_docs_path = get_user_datastore_root_path(datastore_record.owner.username) / "safestore_docs" / datastore_id
     datastore_docs_path.mkdir(parents=True, exist_ok=True)
@@ -556,7 +628,7 @@ async def scrape_url_to_datastore(
     if not safe_store: raise HTTPException(status_code=501, detail="SafeStore not available.")
     if not ScrapeMaster: raise HTTPException(status_code=501, detail="ScrapeMaster not installed.")
 
-    get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+    await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="read_write")
     datastore_record = db.query(DBDataStore).filter(DBDataStore.id == datastore_id).first()
     if not datastore_record: raise HTTPException(status_code=404, detail="Datastore not found.")
 
@@ -573,11 +645,13 @@ async def scrape_url_to_datastore(
 async def list_rag_documents_in_datastore(datastore_id: str, current_user: UserAuthDetails = Depends(get_current_active_user), db: Session = Depends(get_db)) -> List[SafeStoreDocumentInfo]:
     if not safe_store: 
         return []
-    ss = get_safe_store_instance(current_user.username, datastore_id, db) 
+    ss = await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db)
     managed_docs = []
     try:
-        with ss: 
-            stored_meta = ss.list_documents()
+        def _list_documents():
+            with ss:
+                return ss.list_documents()
+        stored_meta = await run_rag("list_documents", _list_documents)
         
         for doc_meta in stored_meta:
             original_path_str = doc_meta.get("file_path")
@@ -603,7 +677,7 @@ async def get_rag_file_content(
     if not safe_store:
         raise HTTPException(status_code=501, detail="SafeStore not available.")
     
-    ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_query")
+    ss = await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="read_query")
     
     datastore_record = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
     
@@ -614,7 +688,7 @@ async def get_rag_file_content(
     
     try:
         # reconstruct_document_text should return the full text
-        content = ss.reconstruct_document_text(str(file_path))
+        content = await run_rag("reconstruct", ss.reconstruct_document_text, str(file_path))
         if content is None:
              raise HTTPException(status_code=404, detail="Content not found or could not be reconstructed.")
         return {"content": content}
@@ -626,7 +700,7 @@ async def get_rag_file_content(
 async def delete_rag_document_from_datastore(datastore_id: str, filename: str, current_user: UserAuthDetails = Depends(get_current_active_user), db: Session = Depends(get_db)) -> Dict[str, str]:
     if not safe_store: raise HTTPException(status_code=501, detail="SafeStore not available.")
     
-    ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+    ss = await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="read_write")
     
     datastore_record = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
     s_filename = secure_filename(filename)
@@ -637,7 +711,10 @@ async def delete_rag_document_from_datastore(datastore_id: str, filename: str, c
     if not file_to_delete_path.is_file(): raise HTTPException(status_code=404, detail=f"Document '{s_filename}' not found in datastore {datastore_id}.")
     
     try:
-        with ss: ss.delete_document_by_path(str(file_to_delete_path))
+        def _delete():
+            with ss: ss.delete_document_by_path(str(file_to_delete_path))
+        await run_rag("delete_document", _delete)
+        _invalidate_rag_query_cache(datastore_id)
         file_to_delete_path.unlink()
         return {"message": f"Document '{s_filename}' deleted successfully from datastore {datastore_id}."}
     except Exception as e:
@@ -653,7 +730,7 @@ async def batch_delete_rag_documents_from_datastore(
 ) -> Dict[str, Any]:
     if not safe_store: raise HTTPException(status_code=501, detail="SafeStore not available.")
     
-    ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+    ss = await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="read_write")
     
     datastore_record = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
     datastore_docs_path = get_user_datastore_root_path(datastore_record.owner.username) / "safestore_docs" / datastore_id
@@ -661,29 +738,35 @@ async def batch_delete_rag_documents_from_datastore(
     deleted_count = 0
     failed_files = []
 
-    with ss:
-        for filename in request.filenames:
-            s_filename = secure_filename(filename)
-            if not s_filename or s_filename != filename:
-                failed_files.append(filename)
-                continue
+    def _delete_all():
+        nonlocal deleted_count
+        with ss:
+            for filename in request.filenames:
+                s_filename = secure_filename(filename)
+                if not s_filename or s_filename != filename:
+                    failed_files.append(filename)
+                    continue
             
-            file_to_delete_path = datastore_docs_path / s_filename
+                file_to_delete_path = datastore_docs_path / s_filename
             
-            try:
-                # This will remove embeddings from the DB.
-                # It doesn't raise an error if the document doesn't exist in the DB.
-                ss.delete_document_by_path(str(file_to_delete_path))
+                try:
+                    # This will remove embeddings from the DB.
+                    # It doesn't raise an error if the document doesn't exist in the DB.
+                    ss.delete_document_by_path(str(file_to_delete_path))
 
-                # If file exists on disk, delete it. If it doesn't, that's fine too.
-                if file_to_delete_path.is_file():
-                    file_to_delete_path.unlink()
+                    # If file exists on disk, delete it. If it doesn't, that's fine too.
+                    if file_to_delete_path.is_file():
+                        file_to_delete_path.unlink()
                 
-                deleted_count += 1
-            except Exception as e:
-                # This will catch file permission errors etc.
-                print(f"Error during deletion of {filename}: {e}")
-                failed_files.append(filename)
+                    deleted_count += 1
+                except Exception as e:
+                    # This will catch file permission errors etc.
+                    print(f"Error during deletion of {filename}: {e}")
+                    failed_files.append(filename)
+
+    await run_rag("delete_document", _delete_all)
+    if deleted_count:
+        _invalidate_rag_query_cache(datastore_id)
 
     return {
         "message": f"Deleted {deleted_count} documents. Failed to delete {len(failed_files)} documents.",
@@ -702,13 +785,15 @@ async def query_datastore(
         raise HTTPException(status_code=501, detail="SafeStore not available.")
     
     try:
-        ss = get_safe_store_instance(current_user.username, datastore_id, db)
-        with ss:
-            results = ss.query(
-                request_data.query, 
-                top_k=request_data.top_k, 
-                min_similarity_percent=request_data.min_similarity_percent
-            )
+        def _query():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db)
+            with ss:
+                return ss.query(
+                    request_data.query, 
+                    top_k=request_data.top_k, 
+                    min_similarity_percent=request_data.min_similarity_percent
+                )
+        results = await run_rag("query", _query)
         sanitized_results = _sanitize_numpy(results)
         return sanitized_results
     except Exception as e:
@@ -725,7 +810,7 @@ async def generate_datastore_graph(
     if not safe_store:
         raise HTTPException(status_code=501, detail="SafeStore not available.")
 
-    ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="revectorize")
+    ss = await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="revectorize")
     datastore_record = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
     if not datastore_record:
         raise HTTPException(status_code=404, detail="Datastore metadata not found in main DB.")
@@ -755,7 +840,7 @@ async def update_datastore_graph(
     if not safe_store:
         raise HTTPException(status_code=501, detail="SafeStore not available.")
 
-    ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="revectorize")
+    ss = await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="revectorize")
     datastore_record = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
     if not datastore_record:
         raise HTTPException(status_code=404, detail="Datastore metadata not found in main DB.")
@@ -785,11 +870,12 @@ async def get_datastore_graph(
         raise HTTPException(status_code=501, detail="GraphStore is not available.")
     
     try:
-        ss = get_safe_store_instance(current_user.username, datastore_id, db)
-        with ss:
-            gs = GraphStore(ss, llm_executor_callback=None)
-            nodes = gs.get_all_nodes_for_visualization(limit=5000)
-            edges = gs.get_all_relationships_for_visualization(limit=10000)
+        def _load_graph():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db)
+            with ss:
+                gs = GraphStore(ss, llm_executor_callback=None)
+                return gs.get_all_nodes_for_visualization(limit=5000), gs.get_all_relationships_for_visualization(limit=10000)
+        nodes, edges = await run_rag("graph_load", _load_graph)
         
         sanitized_nodes = _sanitize_numpy(nodes)
         sanitized_edges = _sanitize_numpy(edges)
@@ -811,14 +897,16 @@ async def query_datastore_graph(
         raise HTTPException(status_code=501, detail="GraphStore is not available.")
     
     try:
-        llm_client = build_lollms_client_from_params(username=current_user.username)
+        llm_client = await run_rag("open", build_lollms_client_from_params, username=current_user.username)
         def llm_executor_callback(prompt: str) -> str:
             return llm_client.generate_text(prompt, max_new_tokens=2048)
             
-        ss = get_safe_store_instance(current_user.username, datastore_id, db)
-        with ss:
-            gs = GraphStore(ss, llm_executor_callback=llm_executor_callback)
-            results = gs.query_graph(request_data.query, output_mode="chunks_summary")
+        def _query_graph():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db)
+            with ss:
+                gs = GraphStore(ss, llm_executor_callback=llm_executor_callback)
+                return gs.query_graph(request_data.query, output_mode="chunks_summary")
+        results = await run_rag("graph_query", _query_graph)
         sanitized_results = _sanitize_numpy(results)
         return sanitized_results
     except Exception as e:
@@ -835,10 +923,12 @@ async def wipe_datastore_graph(
         raise HTTPException(status_code=501, detail="GraphStore is not available.")
     
     try:
-        ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="revectorize")
-        with ss:
-            gs = GraphStore(ss, llm_executor_callback=None)
-            gs.delete_all_graph_data()
+        def _wipe():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="revectorize")
+            with ss:
+                gs = GraphStore(ss, llm_executor_callback=None)
+                gs.delete_all_graph_data()
+        await run_rag("graph_write", _wipe)
         return {"message": "Graph data has been successfully wiped."}
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
@@ -855,10 +945,12 @@ async def add_graph_node(
 ):
     if not GraphStore: raise HTTPException(status_code=501, detail="GraphStore not available.")
     try:
-        ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
-        with ss:
-            gs = GraphStore(ss)
-            node_id = gs.add_node(node_data.label, node_data.properties)
+        def _edit_graph():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+            with ss:
+                gs = GraphStore(ss)
+                return gs.add_node(node_data.label, node_data.properties)
+        node_id = await run_rag("graph_write", _edit_graph)
         return _sanitize_numpy({"id": node_id, "label": node_data.label, "properties": node_data.properties})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -873,10 +965,12 @@ async def update_graph_node(
 ):
     if not GraphStore: raise HTTPException(status_code=501, detail="GraphStore not available.")
     try:
-        ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
-        with ss:
-            gs = GraphStore(ss)
-            gs.update_node(node_id, node_data.label, node_data.properties)
+        def _edit_graph():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+            with ss:
+                gs = GraphStore(ss)
+                gs.update_node(node_id, node_data.label, node_data.properties)
+        await run_rag("graph_write", _edit_graph)
         return _sanitize_numpy({"id": node_id, "label": node_data.label, "properties": node_data.properties})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -890,10 +984,12 @@ async def delete_graph_node(
 ):
     if not GraphStore: raise HTTPException(status_code=501, detail="GraphStore not available.")
     try:
-        ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
-        with ss:
-            gs = GraphStore(ss)
-            gs.delete_node(node_id)
+        def _edit_graph():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+            with ss:
+                gs = GraphStore(ss)
+                gs.delete_node(node_id)
+        await run_rag("graph_write", _edit_graph)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -906,10 +1002,12 @@ async def add_graph_edge(
 ):
     if not GraphStore: raise HTTPException(status_code=501, detail="GraphStore not available.")
     try:
-        ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
-        with ss:
-            gs = GraphStore(ss)
-            edge_id = gs.add_relationship(edge_data.source_id, edge_data.target_id, edge_data.label, edge_data.properties)
+        def _edit_graph():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+            with ss:
+                gs = GraphStore(ss)
+                return gs.add_relationship(edge_data.source_id, edge_data.target_id, edge_data.label, edge_data.properties)
+        edge_id = await run_rag("graph_write", _edit_graph)
         return _sanitize_numpy({"id": edge_id, **edge_data.model_dump()})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -923,10 +1021,12 @@ async def delete_graph_edge(
 ):
     if not GraphStore: raise HTTPException(status_code=501, detail="GraphStore not available.")
     try:
-        ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
-        with ss:
-            gs = GraphStore(ss)
-            gs.delete_relationship(edge_id)
+        def _edit_graph():
+            ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+            with ss:
+                gs = GraphStore(ss)
+                gs.delete_relationship(edge_id)
+        await run_rag("graph_write", _edit_graph)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1163,7 +1263,7 @@ async def create_datastore(ds_create: DataStoreCreate, current_user: UserAuthDet
         db.commit()
         db.refresh(new_ds_db_obj)
         # This initializes the .db file on creation
-        get_safe_store_instance(current_user.username, new_ds_db_obj.id, db)
+        await run_rag("open", get_safe_store_instance, current_user.username, new_ds_db_obj.id, db)
         
         data_store_public = DataStorePublic(
             name=new_ds_db_obj.name,
@@ -1193,7 +1293,7 @@ async def update_datastore(datastore_id: str, ds_update: DataStoreEdit, current_
     ds_db_obj = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
     if not ds_db_obj: raise HTTPException(status_code=404, detail="DataStore not found.")
     
-    get_safe_store_instance(current_user.username, datastore_id, db, permission_level="read_write")
+    await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="read_write")
 
     if ds_update.name != ds_db_obj.name:
         existing_ds = db.query(DBDataStore).filter(DBDataStore.owner_user_id == ds_db_obj.owner_user_id, DBDataStore.name == ds_update.name, DBDataStore.id != datastore_id).first()
@@ -1239,11 +1339,11 @@ async def delete_datastore(datastore_id: str, current_user: UserAuthDetails = De
         db.delete(ds_db_obj)
         db.commit()
         
-        if owner_username in user_sessions and datastore_id in user_sessions[owner_username].get("safe_store_instances", {}):
-            del user_sessions[owner_username]["safe_store_instances"][datastore_id]
+        safe_store_registry.invalidate(datastore_id)
+        rag_query_cache.invalidate(datastore_id)
+        manager.broadcast_internal_event_sync("safe_store_invalidate", {"datastore_id": datastore_id})
         
         # Using background tasks for file deletion is safer for responsiveness
-        from fastapi import BackgroundTasks
         background_tasks = BackgroundTasks()
         background_tasks.add_task(shutil.rmtree, ds_docs_path, ignore_errors=True)
         background_tasks.add_task(ds_file_path.unlink, missing_ok=True)
@@ -1383,7 +1483,7 @@ async def export_datastore(
         raise HTTPException(status_code=501, detail="SafeStore not available.")
 
     # Permission check: owner or revectorize permission required for full export
-    ss = get_safe_store_instance(current_user.username, datastore_id, db, permission_level="revectorize")
+    ss = await run_rag("open", get_safe_store_instance, current_user.username, datastore_id, db, permission_level="revectorize")
     
     datastore_record = db.query(DBDataStore).options(joinedload(DBDataStore.owner)).filter(DBDataStore.id == datastore_id).first()
     if not datastore_record:
@@ -1418,8 +1518,10 @@ async def export_datastore(
             json.dump(metadata, f, indent=2)
 
         # 2. Export document list from SafeStore
-        with ss:
-            docs_list = ss.list_documents()
+        def _list_documents():
+            with ss:
+                return ss.list_documents()
+        docs_list = await run_rag("list_documents", _list_documents)
         
         with open(export_dir / "documents.json", "w") as f:
             json.dump(docs_list, f, indent=2)
@@ -1553,7 +1655,7 @@ async def import_datastore(
         imported_db = export_root / "datastore.db"
         if imported_db.exists():
             # Initialize SafeStore first to create the structure, then overwrite
-            get_safe_store_instance(current_user.username, new_ds.id, db, permission_level="revectorize")
+            await run_rag("open", get_safe_store_instance, current_user.username, new_ds.id, db, permission_level="revectorize")
             shutil.copy2(imported_db, new_db_path)
 
         # Copy documents folder
@@ -1565,8 +1667,9 @@ async def import_datastore(
             shutil.copytree(imported_docs, new_docs_path)
 
         # Clear the cache so it reloads with the new data
-        if current_user.username in user_sessions and new_ds.id in user_sessions[current_user.username].get("safe_store_instances", {}):
-            del user_sessions[current_user.username]["safe_store_instances"][new_ds.id]
+        safe_store_registry.invalidate(new_ds.id)
+        rag_query_cache.invalidate(new_ds.id)
+        manager.broadcast_internal_event_sync("safe_store_invalidate", {"datastore_id": new_ds.id})
 
         return DataStorePublic(
             id=new_ds.id,
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from backend.session import get_current_active_user
 from backend.task_manager import task_manager, _serialize_task
 from backend.models import TaskInfo, UserAuthDetails
+from backend.models.task import TaskQueueStats
 
 tasks_router = APIRouter(
     prefix="/api/tasks",
@@ -34,6 +35,14 @@ def get_all_tasks(
     # This ensures logs and results are truncated for the list view.
     return [_serialize_task(task) for task in tasks]
 
+@tasks_router.get("/queue-stats", response_model=TaskQueueStats)
+def get_task_queue_stats(current_user: UserAuthDetails = Depends(get_current_active_user)):
+    """
+    Returns the worker pool state of this worker process: queue depth and wait times
+    per priority class. Per-user breakdowns are only included for admins.
+    """
+    return task_manager.get_queue_stats(include_users=current_user.is_admin)
+
 @tasks_router.get("/{task_id}", response_model=TaskInfo)
 def get_task_details(task_id: str, current_user: UserAuthDetails = Depends(get_current_active_user)):
     """
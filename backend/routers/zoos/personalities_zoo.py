@@ -24,7 +24,7 @@ from backend.models import (
 from backend.session import get_current_admin_user
 from backend.config import PERSONALITIES_ZOO_ROOT_PATH
 from backend.task_manager import task_manager, Task
-from backend.zoo_cache import get_all_items, get_all_categories, force_build_full_cache
+from backend.zoo_cache import query_items, get_all_categories, force_build_full_cache
 from backend.routers.extensions.app_utils import to_task_info, pull_repo_task
 from backend.routers.zoos.prompts_zoo import PromptZooRepositoryCreate, PromptZooRepositoryPublic
 
@@ -168,12 +168,29 @@ def get_available(
     repository: Optional[str] = None,
     starred_names: Optional[List[str]] = Query(None, alias="starred_names[]")
 ):
-    all_items_raw = get_all_items('personality')
     installed_recs = db.query(DBPersonality).filter(DBPersonality.owner_user_id.is_(None)).all()
     installed_map = {p.name: p for p in installed_recs}
 
-    all_items = []
-    for info in all_items_raw:
+    # --- FILTERING, SORTING & PAGINATION (in the zoo index) ---
+    include_names = None
+    exclude_names = None
+    if installation_status == 'Installed':
+        include_names = set(installed_map)
+    elif installation_status == 'Uninstalled':
+        exclude_names = set(installed_map)
+    if category == 'Starred':
+        starred = set(starred_names or [])
+        include_names = starred if include_names is None else include_names & starred
+        category = None
+
+    page_items, total = query_items(
+        'personality', page=page, page_size=page_size, sort_by=sort_by, sort_order=sort_order,
+        category=category, repository=repository, search_query=search_query,
+        include_names=include_names, exclude_names=exclude_names
+    )
+
+    paginated = []
+    for info in page_items:
         try:
             is_installed = info.get('name') in installed_map
             
@@ -192,42 +209,10 @@ def get_available(
                 "update_available": update_available,
                 "has_readme": (PERSONALITIES_ZOO_ROOT_PATH / info['repository'] / info['folder_name'] / "README.md").exists() 
             }
-            all_items.append(ZooPersonalityInfo(**model_data))
+            paginated.append(ZooPersonalityInfo(**model_data))
         except (PydanticValidationError, Exception) as e:
             print(f"ERROR: Could not process cached personality data for {info.get('name')}. Error: {e}")
 
-    # --- FILTERING ---
-    filtered_items = all_items
-    if installation_status:
-        if installation_status == 'Installed':
-            filtered_items = [i for i in filtered_items if i.is_installed]
-        elif installation_status == 'Uninstalled':
-            filtered_items = [i for i in filtered_items if not i.is_installed]
-    if repository and repository != 'All':
-        filtered_items = [item for item in filtered_items if item.repository == repository]
-    if category and category != 'All':
-        if category == 'Starred':
-            if starred_names:
-                filtered_items = [i for i in filtered_items if i.name in starred_names]
-            else:
-                filtered_items = []
-        else:
-            filtered_items = [i for i in filtered_items if i.category == category]
-            
-    if search_query:
-        q = search_query.lower()
-        filtered_items = [i for i in filtered_items if q in i.name.lower() or (i.description and q in i.description.lower())]
-    
-    # --- SORTING ---
-    filtered_items.sort(key=lambda item: (
-        str(getattr(item, sort_by, '') or '').lower()
-    ), reverse=(sort_order == 'desc'))
-    
-    # --- PAGINATION ---
-    total = len(filtered_items)
-    start = (page - 1) * page_size
-    paginated = filtered_items[start:start + page_size]
-
     return ZooPersonalityInfoResponse(items=paginated, total=total, page=page, pages=(total + page_size - 1) // page_size if page_size > 0 else 0)
 
 @personalities_zoo_router.get("/readme", response_class=PlainTextResponse)
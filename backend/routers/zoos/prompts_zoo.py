@@ -20,7 +20,7 @@ from backend.models import (
 from backend.session import get_current_admin_user, get_user_lollms_client
 from backend.config import PROMPTS_ZOO_ROOT_PATH
 from backend.task_manager import task_manager, Task
-from backend.zoo_cache import get_all_items, get_all_categories, force_build_full_cache
+from backend.zoo_cache import query_items, get_all_categories, force_build_full_cache
 from backend.settings import settings
 from backend.routers.extensions.app_utils import to_task_info, pull_repo_task
 
@@ -254,12 +254,20 @@ def get_available_zoo_prompts(
     category: Optional[str] = None, search_query: Optional[str] = None, 
     installation_status: Optional[str] = None, repository: Optional[str] = None
 ):
-    all_items_raw = get_all_items('prompt')
     installed_prompts_q = db.query(DBSavedPrompt).filter(DBSavedPrompt.owner_user_id.is_(None)).all()
     installed_prompts = {item.name.lower(): item for item in installed_prompts_q}
-    
-    all_items = []
-    for info in all_items_raw:
+
+    # --- FILTERING, SORTING & PAGINATION (in the zoo index) ---
+    page_items, total_items = query_items(
+        'prompt', page=page, page_size=page_size, sort_by=sort_by, sort_order=sort_order,
+        category=category, repository=repository, search_query=search_query,
+        include_names=set(installed_prompts) if installation_status == 'Installed' else None,
+        exclude_names=set(installed_prompts) if installation_status == 'Uninstalled' else None,
+        case_insensitive_names=True
+    )
+
+    paginated_items = []
+    for info in page_items:
         try:
             is_installed = info.get('name', '').lower() in installed_prompts
             
@@ -294,31 +302,10 @@ def get_available_zoo_prompts(
             model_data['update_available'] = update_available
             model_data['repo_version'] = repo_version
             
-            all_items.append(ZooPromptInfo(**model_data))
+            paginated_items.append(ZooPromptInfo(**model_data))
         except (PydanticValidationError, Exception) as e:
             print(f"ERROR: Could not process cached prompt data for {info.get('name')}. Error: {e}")
     
-    # --- FILTERING ---
-    filtered_items = all_items
-    if installation_status:
-        if installation_status == 'Installed': filtered_items = [item for item in filtered_items if item.is_installed]
-        elif installation_status == 'Uninstalled': filtered_items = [item for item in filtered_items if not item.is_installed]
-    if repository and repository != 'All': filtered_items = [item for item in filtered_items if item.repository == repository]
-    if category and category != 'All': filtered_items = [item for item in filtered_items if item.category == category]
-    if search_query:
-        q = search_query.lower()
-        filtered_items = [item for item in filtered_items if q in item.name.lower() or (item.description and q in item.description.lower())]
-    
-    # --- SORTING ---
-    filtered_items.sort(key=lambda item: (
-        str(getattr(item, sort_by, '') or '').lower()
-    ), reverse=(sort_order == 'desc'))
-
-    # --- PAGINATION ---
-    total_items = len(filtered_items)
-    start = (page - 1) * page_size
-    end = start + page_size
-    paginated_items = filtered_items[start:end]
     return ZooPromptInfoResponse(items=paginated_items, total=total_items, page=page, pages=(total_items + page_size - 1) // page_size if page_size > 0 else 0)
 
 @prompts_zoo_router.get("/readme", response_class=PlainTextResponse)
@@ -0,0 +1,29 @@
+# backend/routers/zoos/zoo_icons.py
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from backend.zoo_cache import get_icon
+
+# Public on purpose: catalogue icons are artwork from the configured zoo repositories,
+# and they are loaded by plain <img> tags that cannot send the bearer token.
+zoo_icons_router = APIRouter(
+    prefix="/api/zoo_icons",
+    tags=["Zoo Icons"]
+)
+
+@zoo_icons_router.get("/{icon_hash}")
+async def get_zoo_icon(icon_hash: str, request: Request):
+    """
+    Serves an icon of the zoo catalogues by the SHA-256 of its bytes. The hash is
+    the ETag, and since a different icon gets a different URL the response can be
+    cached forever.
+    """
+    etag = f'"{icon_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    data = await asyncio.to_thread(get_icon, icon_hash)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Icon not found.")
+    return Response(content=data, media_type="image/png", headers=headers)
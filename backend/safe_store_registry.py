@@ -0,0 +1,228 @@
+# backend/safe_store_registry.py
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+import psutil
+from ascii_colors import ASCIIColors
+from backend.settings import settings
+
+try:
+    import safe_store
+except ImportError:
+    safe_store = None
+
+
+if safe_store is not None:
+    class SharedSafeStore(safe_store.SafeStore):
+        """
+        SafeStore shared by every user of a datastore.
+
+        The stock context manager closes the connection and drops the vectorizer
+        on exit, which would reload the model on the next `with ss:` block. Here
+        entering/leaving only counts active users; the connection and vectorizer
+        stay loaded until the registry evicts the store.
+        """
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._active_users = 0
+
+        def __enter__(self):
+            with self._instance_lock:
+                self._active_users += 1
+                try:
+                    return super().__enter__()
+                except Exception:
+                    self._active_users -= 1
+                    raise
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            with self._instance_lock:
+                self._active_users = max(0, self._active_users - 1)
+
+        @property
+        def active_users(self) -> int:
+            return self._active_users
+else:
+    SharedSafeStore = None
+
+
+class SafeStoreRegistry:
+    """
+    Process-wide cache of open SafeStore instances, keyed by datastore id.
+
+    A datastore shared with many users is opened (and its vectorizer loaded) once
+    per process instead of once per user session. Permission checks stay in
+    get_safe_store_instance and run on every request. Stores are evicted LRU-first
+    when over the entry count or the memory budget, and after an idle period;
+    stores currently inside a `with` block are never evicted.
+    """
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._open_locks: Dict[str, threading.Lock] = {}
+        self._last_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _max_entries() -> int:
+        return max(1, int(settings.get("safe_store_cache_max_entries", 32)))
+
+    @staticmethod
+    def _idle_timeout() -> float:
+        return float(settings.get("safe_store_cache_idle_timeout", 1800))
+
+    @staticmethod
+    def _memory_budget_bytes() -> int:
+        return int(float(settings.get("safe_store_cache_memory_budget_mb", 4096)) * 1024 * 1024)
+
+    @staticmethod
+    def _close(datastore_id: str, entry: Dict[str, Any]):
+        try:
+            safe_store.SafeStore.close(entry["store"])
+        except Exception as e:
+            ASCIIColors.warning(f"[SafeStoreRegistry] Failed to close datastore {datastore_id}: {e}")
+
+    def _evictable_locked(self, now: float, idle_only: bool):
+        timeout = self._idle_timeout()
+        for datastore_id, entry in self._entries.items():
+            if entry["store"].active_users > 0:
+                continue
+            if idle_only and (timeout <= 0 or now - entry["last_used"] <= timeout):
+                continue
+            yield datastore_id
+
+    def _enforce_limits_locked(self, now: float) -> list:
+        """Removes expired / over-budget entries and returns them; close them after releasing the lock."""
+        removed = []
+        for datastore_id in list(self._evictable_locked(now, idle_only=True)):
+            removed.append((datastore_id, self._entries.pop(datastore_id)))
+            self.expirations += 1
+
+        max_entries = self._max_entries()
+        budget = self._memory_budget_bytes()
+        while len(self._entries) > max_entries or self._memory_used_locked() > budget:
+            victim = next(self._evictable_locked(now, idle_only=False), None)
+            if victim is None:
+                break
+            removed.append((victim, self._entries.pop(victim)))
+            self.evictions += 1
+        return removed
+
+    def _close_all(self, removed: list):
+        for datastore_id, entry in removed:
+            self._close(datastore_id, entry)
+
+    def _memory_used_locked(self) -> int:
+        return sum(e["memory_bytes"] for e in self._entries.values())
+
+    def get(self, datastore_id: str, signature: Tuple, factory: Callable[[], Any]):
+        """
+        Returns the shared store for a datastore, opening it with `factory` on a miss.
+        `signature` captures the settings the store was opened with (path, vectorizer,
+        chunking); a different signature reopens the store.
+        """
+        now = time.monotonic()
+        removed = []
+        with self._lock:
+            if now - self._last_sweep > 60:
+                self._last_sweep = now
+                removed = self._enforce_limits_locked(now)
+            entry = self._entries.get(datastore_id)
+            if entry is not None and entry["signature"] == signature:
+                entry["last_used"] = now
+                self._entries.move_to_end(datastore_id)
+                self.hits += 1
+                store = entry["store"]
+            else:
+                store = None
+                open_lock = self._open_locks.setdefault(datastore_id, threading.Lock())
+        self._close_all(removed)
+        if store is not None:
+            return store
+
+        # One opener per datastore: loading a vectorizer can take seconds
+        with open_lock:
+            with self._lock:
+                entry = self._entries.get(datastore_id)
+                if entry is not None and entry["signature"] == signature:
+                    entry["last_used"] = time.monotonic()
+                    self.hits += 1
+                    return entry["store"]
+                stale = self._entries.pop(datastore_id, None) if entry is not None else None
+            if stale is not None:
+                self._close(datastore_id, stale)
+
+            rss_before = psutil.Process().memory_info().rss
+            store = factory()
+            # RSS growth while opening approximates the vectorizer/index footprint
+            memory_bytes = max(0, psutil.Process().memory_info().rss - rss_before)
+
+            with self._lock:
+                now = time.monotonic()
+                self.misses += 1
+                self._entries[datastore_id] = {
+                    "store": store, "signature": signature, "memory_bytes": memory_bytes,
+                    "created_at": now, "last_used": now
+                }
+                # If the new store alone exceeds the budget it drops out of the cache, but the
+                # caller is about to use it, so it is left open (closed when garbage collected)
+                self._entries.move_to_end(datastore_id)
+                removed = [
+                    item for item in self._enforce_limits_locked(now) if item[0] != datastore_id
+                ]
+            self._close_all(removed)
+            return store
+
+    def invalidate(self, datastore_id: str):
+        """Closes and forgets a datastore (deleted, imported over, or reconfigured)."""
+        with self._lock:
+            entry = self._entries.pop(datastore_id, None)
+        if entry:
+            self._close(datastore_id, entry)
+
+    def close_idle(self):
+        with self._lock:
+            removed = self._enforce_limits_locked(time.monotonic())
+        self._close_all(removed)
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        for datastore_id, entry in entries:
+            self._close(datastore_id, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self._max_entries(),
+                "idle_timeout_seconds": self._idle_timeout(),
+                "memory_budget_mb": round(self._memory_budget_bytes() / (1024 * 1024), 1),
+                "memory_used_mb": round(self._memory_used_locked() / (1024 * 1024), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": [
+                    {
+                        "datastore_id": datastore_id,
+                        "name": getattr(e["store"], "name", None),
+                        "active_users": e["store"].active_users,
+                        "memory_mb": round(e["memory_bytes"] / (1024 * 1024), 1),
+                        "idle_seconds": round(now - e["last_used"], 1),
+                    }
+                    for datastore_id, e in reversed(self._entries.items())
+                ],
+            }
+
+
+safe_store_registry = SafeStoreRegistry()
@@ -1,6 +1,11 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple, Any
 import secrets
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
 import smtplib
 import subprocess
 import shutil
@@ -213,6 +218,76 @@ def verify_api_key(plain_key: str, hashed_key: str) -> bool:
     """Verifies a plain text API key against a stored hash."""
     return api_key_context.verify(plain_key, hashed_key)
 
+class VerifiedApiKeyCache:
+    """
+    Bounded, short-lived cache of successful API key verifications, so repeat
+    service requests skip the bcrypt verify. Entries are keyed by an HMAC of the
+    presented key under a per-process secret (the plain key is never stored) and
+    remember the key id, owner and stored hash they were verified against; a hit
+    only counts if the key row fetched for the request still matches. Failed
+    verifications are never cached.
+    """
+    def __init__(self):
+        self._secret = secrets.token_bytes(32)
+        self._entries: "OrderedDict[bytes, Tuple[int, int, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _digest(self, plain_key: str) -> bytes:
+        return hmac.new(self._secret, plain_key.encode("utf-8"), hashlib.sha256).digest()
+
+    def verify(self, plain_key: str, key_id: int, user_id: int, hashed_key: str) -> bool:
+        from backend.settings import settings
+        ttl = float(settings.get("api_key_cache_ttl_seconds", 300))
+        if ttl <= 0:
+            return verify_api_key(plain_key, hashed_key)
+
+        digest = self._digest(plain_key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                if entry[0] == key_id and entry[2] == hashed_key and entry[3] > now:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return True
+                del self._entries[digest]
+            self.misses += 1
+
+        if not verify_api_key(plain_key, hashed_key):
+            return False
+
+        max_entries = max(1, int(settings.get("api_key_cache_max_entries", 10000)))
+        with self._lock:
+            self._entries[digest] = (key_id, user_id, hashed_key, now + ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def invalidate(self, user_id: Optional[int] = None, key_ids: Optional[list] = None):
+        key_ids = set(key_ids or [])
+        with self._lock:
+            stale = [
+                digest for digest, (key_id, owner_id, _, _) in self._entries.items()
+                if key_id in key_ids or (user_id is not None and owner_id == user_id)
+            ]
+            for digest in stale:
+                del self._entries[digest]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+api_key_cache = VerifiedApiKeyCache()
+
+def revoke_cached_api_keys(user_id: Optional[int] = None, key_ids: Optional[list] = None):
+    """Drops cached verifications for deleted keys or a deactivated/deleted user, in every worker."""
+    api_key_cache.invalidate(user_id=user_id, key_ids=key_ids)
+    from backend.ws_manager import manager
+    manager.broadcast_internal_event_sync("api_key_cache_invalidate", {"user_id": user_id, "key_ids": list(key_ids or [])})
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Creates a JWT access token for the main application using the global SECRET_KEY.
@@ -3,11 +3,14 @@ import json
 import traceback
 import datetime
 import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, Optional, Any, cast, Callable, Tuple
 from urllib.parse import urlparse
 
 from fastapi import HTTPException, Depends, status
+from sqlalchemy import event, inspect as sa_inspect
 from sqlalchemy.orm import Session, joinedload, object_session
 from werkzeug.utils import secure_filename
 from ascii_colors import trace_exception, ASCIIColors
@@ -17,7 +20,7 @@ from backend.db.models.user import User as DBUser
 from backend.db.models.service import MCP as DBMCP, App as DBApp
 from backend.db.models.datastore import DataStore as DBDataStore, SharedDataStoreLink as DBSharedDataStoreLink
 from backend.db.models.personality import Personality as DBPersonality
-from backend.db.models.config import GlobalConfig, LLMBinding as DBLLMBinding, TTIBinding as DBTTIBinding, TTSBinding as DBTTSBinding, STTBinding as DBSTTBinding
+from backend.db.models.config import GlobalConfig, LLMBinding as DBLLMBinding
 from lollms_client import LollmsClient
 from backend.models.user import UserAuthDetails
 from backend.models.auth import TokenData
@@ -36,6 +39,8 @@ from backend.config import (
 )
 from backend.settings import settings
 from backend.security import create_access_token
+from backend.safe_store_registry import safe_store_registry, SharedSafeStore
+from backend.binding_catalogue import binding_catalogue
 
 try:
     import safe_store
@@ -46,16 +51,107 @@ except ImportError:
 user_sessions: Dict[str, Dict[str, Any]] = {}
 
 # Authentication Cache to prevent DB bombardment during request bursts
-# Maps Token -> (UserObject, Expiry)
-_token_user_cache: Dict[str, tuple] = {}
+# Maps Token -> (UserObject, Expiry), least recently used first
+_token_user_cache: "OrderedDict[str, tuple]" = OrderedDict()
 _token_cache_lock = threading.Lock()
 TOKEN_CACHE_TTL = 10 # seconds
+TOKEN_CACHE_MAX_ENTRIES = 1000
+
+class AuthSnapshotCache:
+    """
+    Per-user cache of the UserAuthDetails built by get_current_active_user.
+
+    A snapshot is reused while its fingerprint (the user row's updated_at, the
+    settings version and the session values folded into the snapshot) still
+    matches, for at most `auth_snapshot_ttl_seconds`. Local writes to a user row
+    drop the snapshot right away (see _drop_auth_snapshot_on_user_update); the
+    user_cache_invalidate and global_model_cache_invalidate events drop them in
+    every worker. Callers get a copy, so the cached snapshot is never mutated.
+    """
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[tuple, UserAuthDetails, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str, fingerprint: tuple) -> Optional[UserAuthDetails]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] != fingerprint or entry[2] < now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1].model_copy()
+
+    def put(self, username: str, fingerprint: tuple, snapshot: UserAuthDetails):
+        ttl = float(settings.get("auth_snapshot_ttl_seconds", 60))
+        if ttl <= 0:
+            return
+        max_entries = max(1, int(settings.get("auth_snapshot_cache_max_entries", 2000)))
+        with self._lock:
+            self._entries[username] = (fingerprint, snapshot.model_copy(), time.monotonic() + ttl)
+            self._entries.move_to_end(username)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+auth_snapshot_cache = AuthSnapshotCache()
+
+# Columns whose changes do not affect the auth snapshot (touched on every request burst)
+_AUTH_SNAPSHOT_IGNORED_COLUMNS = {"last_activity_at", "updated_at"}
+
+@event.listens_for(DBUser, "after_update")
+def _drop_auth_snapshot_on_user_update(mapper, connection, target):
+    state = sa_inspect(target)
+    for attr in state.attrs:
+        if attr.key not in _AUTH_SNAPSHOT_IGNORED_COLUMNS and attr.history.has_changes():
+            auth_snapshot_cache.invalidate(target.username)
+            invalidate_client_resolutions(target.username)
+            return
+
+def invalidate_client_resolutions(username: Optional[str] = None):
+    """Forgets memoized client resolutions for one user (or everyone)."""
+    with _client_resolution_lock:
+        if username is None:
+            _client_resolution_cache.clear()
+            return
+        for key in [k for k in _client_resolution_cache if k[0] == username]:
+            del _client_resolution_cache[key]
+
+def _client_resolution_key(username: str, session: Dict[str, Any], call_args: tuple) -> Optional[tuple]:
+    try:
+        servers_infos = session.get("servers_infos")
+        return (
+            username, call_args,
+            session.get("lollms_model_name"),
+            json.dumps(session.get("llm_params", {}), sort_keys=True, default=str),
+            json.dumps(servers_infos, sort_keys=True, default=str) if servers_infos is not None else None,
+            binding_catalogue.current_version(), settings.version
+        )
+    except Exception:
+        # Unhashable arguments or catalogue unavailable: take the regular path
+        return None
 
 # Global Client Registry to prevent file descriptor exhaustion
 # Maps Hash(BindingName + Config) -> LollmsClient Instance
 _global_client_registry: Dict[str, LollmsClient] = {}
 _registry_lock = threading.Lock()
 
+# Resolution memo for build_lollms_client_from_params:
+# (username, call arguments, session state, catalogue/settings versions) -> (registry key, expiry)
+_client_resolution_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_client_resolution_lock = threading.Lock()
+CLIENT_RESOLUTION_CACHE_MAX_ENTRIES = 4096
+
 # Locks to prevent race conditions during concurrent requests
 _session_init_lock = threading.Lock()
 _client_build_locks: Dict[str, threading.Lock] = {}
@@ -87,6 +183,7 @@ async def get_current_db_user_from_token(
         if token in _token_user_cache:
             cached_user, expiry = _token_user_cache[token]
             if now < expiry:
+                _token_user_cache.move_to_end(token)
                 # Merge the cached user into the current session to ensure it's attached to the DB
                 return db.merge(cached_user, load=False)
             else:
@@ -130,10 +227,11 @@ async def get_current_db_user_from_token(
         # 4. Update Cache
         with _token_cache_lock:
             _token_user_cache[token] = (user, now + datetime.timedelta(seconds=TOKEN_CACHE_TTL))
+            _token_user_cache.move_to_end(token)
 
-            # Periodic cleanup of expired entries
-            if len(_token_user_cache) > 1000:
-                _token_user_cache.clear()
+            # Evict least recently used tokens
+            while len(_token_user_cache) > TOKEN_CACHE_MAX_ENTRIES:
+                _token_user_cache.popitem(last=False)
 
         return user
 
@@ -185,7 +283,7 @@ def get_current_active_user(db_user: DBUser = Depends(get_current_db_user_from_t
                         "put_thoughts_in_context": db_user.put_thoughts_in_context
                     }
                     user_sessions[username] = {
-                        "safe_store_instances": {}, "discussions": {},
+                        "discussions": {},
                         "active_vectorizer": db_user.safe_store_vectorizer or SAFE_STORE_DEFAULTS.get("global_default_vectorizer"),
                         "lollms_model_name": db_user.lollms_model_name,
                         "llm_params": {k: v for k, v in session_llm_params.items() if v is not None},
@@ -204,6 +302,14 @@ def get_current_active_user(db_user: DBUser = Depends(get_current_db_user_from_t
         if session.get("lollms_model_name") != user_model_full:
             session["lollms_model_name"] = user_model_full
 
+        fingerprint = (
+            db_user.id, db_user.updated_at, db_user.is_active, db_user.is_admin, settings.version,
+            user_model_full, session.get("active_vectorizer"), session.get("active_personality_id")
+        )
+        cached_snapshot = auth_snapshot_cache.get(username, fingerprint)
+        if cached_snapshot is not None:
+            return cached_snapshot
+
         llm_settings_overridden = False
         effective_llm_params = {
             "llm_temperature": db_user.llm_temperature,
@@ -249,7 +355,7 @@ def get_current_active_user(db_user: DBUser = Depends(get_current_db_user_from_t
         default_chunk_size = settings.get("default_chunk_size", 2048)
         default_chunk_overlap = settings.get("default_chunk_overlap", 256)
 
-        return UserAuthDetails(
+        snapshot = UserAuthDetails(
             id=db_user.id, username=username, is_admin=db_user.is_admin, is_moderator=(db_user.is_admin or db_user.is_moderator), is_active=db_user.is_active,
             icon=db_user.icon, first_name=db_user.first_name, family_name=db_user.family_name, email=db_user.email,
             birth_date=db_user.birth_date, receive_notification_emails=db_user.receive_notification_emails,
@@ -349,6 +455,8 @@ def get_current_active_user(db_user: DBUser = Depends(get_current_db_user_from_t
             google_calendar_enabled=db_user.google_calendar_enabled,
             google_gmail_enabled=db_user.google_gmail_enabled
         )
+        auth_snapshot_cache.put(username, fingerprint, snapshot)
+        return snapshot
     finally:
         if db_was_created:
             db.close()
@@ -499,11 +607,37 @@ def build_lollms_client_from_params(
     if not session:
         is_temp_session = True
         session = {
-            "safe_store_instances": {},
             "discussions": {},
             "llm_params": {},
         }
 
+    # --- FAST PATH ---
+    # A repeat request with the same user, arguments, session state, bindings and settings
+    # resolves to the same registry key, so an already-built client is returned without
+    # touching the database.
+    resolution_key = _client_resolution_key(username, session, (
+        binding_alias, model_name, json.dumps(llm_params, sort_keys=True, default=str) if llm_params else None,
+        tti_binding_alias, tti_model_name, json.dumps(tti_params, sort_keys=True, default=str) if tti_params else None,
+        tts_binding_alias, tts_model_name, json.dumps(tts_params, sort_keys=True, default=str) if tts_params else None,
+        stt_binding_alias, stt_model_name, json.dumps(stt_params, sort_keys=True, default=str) if stt_params else None,
+        load_llm, load_tti, load_tts, load_stt, load_mcp
+    ))
+    if resolution_key is not None:
+        with _client_resolution_lock:
+            resolved = _client_resolution_cache.get(resolution_key)
+            if resolved is not None and resolved[1] > time.monotonic():
+                _client_resolution_cache.move_to_end(resolution_key)
+                registry_key = resolved[0]
+            else:
+                registry_key = None
+        if registry_key is not None:
+            with _registry_lock:
+                cached_client = _global_client_registry.get(registry_key)
+            if cached_client is not None:
+                if callback:
+                    callback("⚡ Engine cached - Instant access enabled.", 28, {}) # MSG_TYPE_INIT_PROGRESS = 28
+                return cached_client
+
     db = next(get_db())
     try:
         user_db = db.query(DBUser).filter(DBUser.username == username).first()
@@ -513,31 +647,31 @@ def build_lollms_client_from_params(
         # Validate selected models against active bindings before building client
         if load_llm and user_db.lollms_model_name and '/' in user_db.lollms_model_name:
             binding_alias_check, _ = user_db.lollms_model_name.split('/', 1)
-            is_active = db.query(DBLLMBinding.id).filter(DBLLMBinding.alias == binding_alias_check, DBLLMBinding.is_active == True).first()
+            is_active = binding_catalogue.get_active("llm", binding_alias_check)
             if not is_active:
                 user_db.lollms_model_name = None
 
         if load_tti and user_db.tti_binding_model_name and '/' in user_db.tti_binding_model_name:
             binding_alias_check, _ = user_db.tti_binding_model_name.split('/', 1)
-            is_active = db.query(DBTTIBinding.id).filter(DBTTIBinding.alias == binding_alias_check, DBTTIBinding.is_active == True).first()
+            is_active = binding_catalogue.get_active("tti", binding_alias_check)
             if not is_active:
                 user_db.tti_binding_model_name = None
 
         if load_tti and user_db.iti_binding_model_name and '/' in user_db.iti_binding_model_name:
             binding_alias_check, _ = user_db.iti_binding_model_name.split('/', 1)
-            is_active = db.query(DBTTIBinding.id).filter(DBTTIBinding.alias == binding_alias_check, DBTTIBinding.is_active == True).first()
+            is_active = binding_catalogue.get_active("tti", binding_alias_check)
             if not is_active:
                 user_db.iti_binding_model_name = None
 
         if load_tts and user_db.tts_binding_model_name and '/' in user_db.tts_binding_model_name:
             binding_alias_check, _ = user_db.tts_binding_model_name.split('/', 1)
-            is_active = db.query(DBTTSBinding.id).filter(DBTTSBinding.alias == binding_alias_check, DBTTSBinding.is_active == True).first()
+            is_active = binding_catalogue.get_active("tts", binding_alias_check)
             if not is_active:
                 user_db.tts_binding_model_name = None
                 
         if load_stt and user_db.stt_binding_model_name and '/' in user_db.stt_binding_model_name:
             binding_alias_check, _ = user_db.stt_binding_model_name.split('/', 1)
-            is_active = db.query(DBSTTBinding.id).filter(DBSTTBinding.alias == binding_alias_check, DBSTTBinding.is_active == True).first()
+            is_active = binding_catalogue.get_active("stt", binding_alias_check)
             if not is_active:
                 user_db.stt_binding_model_name = None
 
@@ -583,12 +717,12 @@ def build_lollms_client_from_params(
                     target_binding_alias = user_model_full.split('/', 1)[0]
 
                 if target_binding_alias:
-                    binding_to_use = db.query(DBLLMBinding).filter(DBLLMBinding.alias == target_binding_alias, DBLLMBinding.is_active == True).first()
+                    binding_to_use = binding_catalogue.get_active("llm", target_binding_alias)
                     if binding_to_use:
                          ASCIIColors.debug(f"[ClientBuild] Using user-requested binding: {target_binding_alias}")
 
             if not binding_to_use:
-                binding_to_use = db.query(DBLLMBinding).filter(DBLLMBinding.is_active == True).order_by(DBLLMBinding.id).first()
+                binding_to_use = binding_catalogue.default_active("llm")
                 if binding_to_use:
                     ASCIIColors.debug(f"[ClientBuild] No user model set or binding inactive. Falling back to system default: {binding_to_use.alias}")
             
@@ -672,12 +806,12 @@ def build_lollms_client_from_params(
             if effective_tti_model_full:
                 if '/' in effective_tti_model_full:
                     effective_tti_binding_alias, effective_tti_model_name_part = effective_tti_model_full.split('/', 1)
-                    selected_tti_binding = db.query(DBTTIBinding).filter(DBTTIBinding.alias == effective_tti_binding_alias, DBTTIBinding.is_active == True).first()
+                    selected_tti_binding = binding_catalogue.get_active("tti", effective_tti_binding_alias)
                     if selected_tti_binding:
                         selected_tti_model_name = effective_tti_model_name_part
 
                 if not selected_tti_binding:
-                    selected_tti_binding = db.query(DBTTIBinding).filter(DBTTIBinding.is_active == True).order_by(DBTTIBinding.id).first()
+                    selected_tti_binding = binding_catalogue.default_active("tti")
                     if selected_tti_binding:
                         selected_tti_model_name = selected_tti_binding.default_model_name
             
@@ -722,12 +856,12 @@ def build_lollms_client_from_params(
             if user_tts_model_full:
                 if '/' in user_tts_model_full:
                     tts_binding_alias_local, tts_model_name_local = user_tts_model_full.split('/', 1)
-                    selected_tts_binding = db.query(DBTTSBinding).filter(DBTTSBinding.alias == tts_binding_alias_local, DBTTSBinding.is_active == True).first()
+                    selected_tts_binding = binding_catalogue.get_active("tts", tts_binding_alias_local)
                     if not selected_tts_model_name:
                         selected_tts_model_name = tts_model_name_local
 
             if not selected_tts_binding:
-                selected_tts_binding = db.query(DBTTSBinding).filter(DBTTSBinding.is_active == True).order_by(DBTTSBinding.id).first()
+                selected_tts_binding = binding_catalogue.default_active("tts")
                 if selected_tts_binding and not selected_tts_model_name:
                     selected_tts_model_name = selected_tts_binding.default_model_name
 
@@ -772,12 +906,12 @@ def build_lollms_client_from_params(
             if user_stt_model_full:
                 if '/' in user_stt_model_full:
                     stt_binding_alias_local, stt_model_name_local = user_stt_model_full.split('/', 1)
-                    selected_stt_binding = db.query(DBSTTBinding).filter(DBSTTBinding.alias == stt_binding_alias_local, DBSTTBinding.is_active == True).first()
+                    selected_stt_binding = binding_catalogue.get_active("stt", stt_binding_alias_local)
                     if not selected_stt_model_name:
                         selected_stt_model_name = stt_model_name_local
 
             if not selected_stt_binding:
-                selected_stt_binding = db.query(DBSTTBinding).filter(DBSTTBinding.is_active == True).order_by(DBSTTBinding.id).first()
+                selected_stt_binding = binding_catalogue.default_active("stt")
                 if selected_stt_binding and not selected_stt_model_name:
                     selected_stt_model_name = selected_stt_binding.default_model_name
 
@@ -824,6 +958,14 @@ def build_lollms_client_from_params(
             registry_payload = {k: v for k, v in client_init_params.items() if v is not None}
             registry_key = str(hash(json.dumps(registry_payload, sort_keys=True)))
 
+            if resolution_key is not None:
+                ttl = float(settings.get("client_resolution_cache_ttl_seconds", 60))
+                with _client_resolution_lock:
+                    _client_resolution_cache[resolution_key] = (registry_key, time.monotonic() + ttl)
+                    _client_resolution_cache.move_to_end(resolution_key)
+                    while len(_client_resolution_cache) > CLIENT_RESOLUTION_CACHE_MAX_ENTRIES:
+                        _client_resolution_cache.popitem(last=False)
+
             with _registry_lock:
                 if registry_key in _global_client_registry:
                     # If already loaded, trigger a "Fast Load" completion message
@@ -927,29 +1069,32 @@ def get_safe_store_instance(
                 detail=f"You do not have the required '{permission_level}' permission for this DataStore."
             )
 
-    session = user_sessions.get(requesting_user_username)
-    if not session:
-        raise HTTPException(status_code=500, detail="User session not found for SafeStore access.")
+    # FIX: Ensure 'model' key exists if 'model_name' is present, required for some vectorizers like ollama
+    vectorizer_config = datastore_record.vectorizer_config or {}
+    if isinstance(vectorizer_config, str):
+        try:
+            vectorizer_config = json.loads(vectorizer_config)
+        except Exception:
+            vectorizer_config = {}
     
-    if datastore_id not in session.get("safe_store_instances", {}):
-        ss_db_path = get_datastore_db_path(owner_username, datastore_id)
+    # Make a copy to avoid mutating the DB object if it's attached, though here it's likely fine.
+    # safe_store modifies config passed to it sometimes? better be safe.
+    v_config = vectorizer_config.copy()
+    if 'model_name' in v_config and 'model' not in v_config:
+        v_config['model'] = v_config['model_name']
+
+    ss_db_path = get_datastore_db_path(owner_username, datastore_id)
+    # The open store is shared by every user allowed to access the datastore (the
+    # permission check above runs on each call); it is reopened when these change.
+    signature = (
+        str(ss_db_path), datastore_record.vectorizer_name, json.dumps(v_config, sort_keys=True, default=str),
+        datastore_record.chunk_size, datastore_record.chunk_overlap
+    )
+
+    def _open_store():
         # ASCIIColors.info(f"Recovering vectorizer:{datastore_record.vectorizer_name}")
         try:
-            # FIX: Ensure 'model' key exists if 'model_name' is present, required for some vectorizers like ollama
-            vectorizer_config = datastore_record.vectorizer_config or {}
-            if isinstance(vectorizer_config, str):
-                try:
-                    vectorizer_config = json.loads(vectorizer_config)
-                except Exception:
-                    vectorizer_config = {}
-            
-            # Make a copy to avoid mutating the DB object if it's attached, though here it's likely fine.
-            # safe_store modifies config passed to it sometimes? better be safe.
-            v_config = vectorizer_config.copy()
-            if 'model_name' in v_config and 'model' not in v_config:
-                v_config['model'] = v_config['model_name']
-
-            ss_instance = safe_store.SafeStore(
+            return SharedSafeStore(
                 name=datastore_record.name,
                 description=datastore_record.description,
                 db_path=ss_db_path,
@@ -961,14 +1106,14 @@ def get_safe_store_instance(
                 expand_after=10,
                 chunking_strategy="token"
             )
-            ss_instance.name = datastore_record.name
-            ss_instance.description = datastore_record.description
-            session.setdefault("safe_store_instances", {})[datastore_id] = ss_instance
         except Exception as e:
             trace_exception(e)
             raise HTTPException(status_code=500, detail=f"Could not initialize SafeStore for {datastore_id}: {str(e)}")
-            
-    return cast(safe_store.SafeStore, session["safe_store_instances"][datastore_id])
+
+    ss_instance = safe_store_registry.get(datastore_id, signature, _open_store)
+    ss_instance.name = datastore_record.name
+    ss_instance.description = datastore_record.description
+    return cast(safe_store.SafeStore, ss_instance)
 
 
 def get_user_data_root(username: str) -> Path:
@@ -1047,6 +1192,9 @@ def invalidate_model_cache(db: Session):
     db.commit()
     with _registry_lock:
         _global_client_registry.clear()
+    auth_snapshot_cache.clear()
+    binding_catalogue.invalidate()
+    invalidate_client_resolutions()
 
     # Broadcast to all other workers to clear their registries and client caches
     from backend.ws_manager import manager
@@ -7,6 +7,8 @@ class _Settings:
     _instance = None
     _settings_cache: Dict[str, Any] = {}
     _is_loaded = False
+    # Bumped on every (re)load so caches derived from settings can detect changes
+    version = 0
 
     def __new__(cls):
         if cls._instance is None:
@@ -68,6 +70,7 @@ class _Settings:
 
             print(f"INFO: Loaded {len(self._settings_cache)} settings into cache.")
             self._is_loaded = True
+            self.version += 1
         except Exception as e:
             print(f"CRITICAL: An unexpected error occurred while loading settings: {e}.")
             self._is_loaded = False
@@ -4,52 +4,68 @@ import threading
 import traceback
 import json
 import os
-from typing import List, Dict, Any, Callable, Optional
+import time
+import heapq
+import itertools
+import importlib
+from collections import deque
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy.orm.attributes import flag_modified
-from backend.db.models.db_task import DBTask
+from backend.db.models.db_task import DBTask, DBTaskLog
 from backend.db.base import TaskStatus
 from backend.ws_manager import manager
 from backend.models.task import TaskInfo
 from backend.db.models.user import User as DBUser
+from backend.settings import settings
 from backend.tasks.utils import _to_task_info
 
-def _serialize_task(db_task: DBTask) -> Optional[dict]:
+FINAL_TASK_STATES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+# Scheduling classes, lower value is served first
+TASK_PRIORITIES = {"interactive": 0, "background": 1, "maintenance": 2}
+DEFAULT_TASK_PRIORITY = "background"
+
+# Columns of the tasks table that are buffered in memory and flushed in batches
+BUFFERED_TASK_FIELDS = (
+    "status", "progress", "description", "file_name", "total_files",
+    "result", "error", "started_at", "completed_at"
+)
+
+def _serialize_task_state(state: Dict[str, Any]) -> Optional[dict]:
     """
-    Serializes a SQLAlchemy DBTask object into a dictionary suitable for JSON transport.
-    Ensures that the owner relationship is loaded.
+    Serializes a task state (either an in-memory Task state or a DBTask row converted
+    to a dict) into a dictionary suitable for JSON transport.
     """
-    if not db_task:
-        return None
-    
     try:
         # 1. Truncate Logs with Cumulative Size Guard
         # This prevents a payload from exploding if multiple logs are individually "medium" sized.
         recent_logs = []
-        if db_task.logs and isinstance(db_task.logs, list):
+        logs = state.get("logs")
+        if logs and isinstance(logs, (list, deque)):
             cumulative_size = 0
             # Iterate backwards through last 10 logs
-            for log in reversed(db_task.logs[-10:]):
+            for log in reversed(list(logs)[-10:]):
                 msg = log.get("message", "")
                 # Clip very long single entries
                 if len(msg) > 2000:
                     msg = msg[:2000] + "... [clipped]"
-                
+
                 log_entry = {**log, "message": msg}
                 entry_size = len(json.dumps(log_entry))
-                
+
                 # If adding this log would push the payload toward the 1MB limit, stop here.
                 if cumulative_size + entry_size > 50000: # 50KB limit for logs in UI
                     recent_logs.insert(0, {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(), "message": "[Older logs omitted]", "level": "INFO"})
                     break
-                    
+
                 recent_logs.insert(0, log_entry)
                 cumulative_size += entry_size
-            
+
         # 2. STRIP LARGE RESULTS (Crucial for Images)
         # We NEVER send the full base64 image or huge JSON over WebSocket.
         # This data is saved in the DB; the UI will fetch it via standard API calls.
-        safe_result = db_task.result
+        safe_result = state.get("result")
         if safe_result:
             if isinstance(safe_result, str) and len(safe_result) > 10000:
                 # Flag to the UI that data exists but is omitted for transport stability
@@ -63,25 +79,26 @@ def _serialize_task(db_task: DBTask) -> Optional[dict]:
                     safe_result = "[Unserializable Data]"
 
         task_info = {
-            "id": db_task.id,
-            "name": db_task.name,
-            "description": db_task.description,
-            "status": db_task.status,
-            "progress": db_task.progress,
+            "id": state.get("id"),
+            "name": state.get("name"),
+            "description": state.get("description"),
+            "status": state.get("status"),
+            "progress": state.get("progress") or 0,
             "logs": recent_logs,
             "result": safe_result,
-            "error": db_task.error,
-            "result": db_task.result,
-            "error": db_task.error,
-            "created_at": db_task.created_at,
-            "started_at": db_task.started_at,
-            "completed_at": db_task.completed_at,
-            "updated_at": db_task.updated_at,
-            "file_name": db_task.file_name,
-            "total_files": db_task.total_files,
-            "owner_username": db_task.owner.username if db_task.owner else "System"
+            "error": state.get("error"),
+            "result": state.get("result"),
+            "error": state.get("error"),
+            "created_at": state.get("created_at"),
+            "started_at": state.get("started_at"),
+            "completed_at": state.get("completed_at"),
+            "updated_at": state.get("updated_at"),
+            "file_name": state.get("file_name"),
+            "total_files": state.get("total_files"),
+            "owner_username": state.get("owner_username") or "System",
+            "priority": state.get("priority") or DEFAULT_TASK_PRIORITY
         }
-        
+
         # Serialize datetime objects to ISO strings
         for key in ['created_at', 'started_at', 'completed_at', 'updated_at']:
             if task_info[key] and isinstance(task_info[key], datetime.datetime):
@@ -89,19 +106,71 @@ def _serialize_task(db_task: DBTask) -> Optional[dict]:
 
         return task_info
     except Exception as e:
-        print(f"Error serializing task {db_task.id}: {e}")
+        print(f"Error serializing task {state.get('id')}: {e}")
         return None
 
+def _db_task_to_state(db_task: DBTask) -> Dict[str, Any]:
+    state = {field: getattr(db_task, field) for field in BUFFERED_TASK_FIELDS}
+    state.update({
+        "id": db_task.id,
+        "name": db_task.name,
+        "created_at": db_task.created_at,
+        "updated_at": db_task.updated_at,
+        "owner_user_id": db_task.owner_user_id,
+        "owner_username": db_task.owner.username if db_task.owner else None,
+        "priority": db_task.priority,
+        "logs": db_task.logs,
+    })
+    return state
+
+def _build_job_spec(target: Callable, args: tuple, kwargs: Optional[dict]) -> Optional[dict]:
+    """
+    Describes a task as an importable function plus JSON arguments so that it can be
+    re-queued after a restart. Returns None for closures, methods or non-JSON arguments;
+    those tasks are not restorable and fail on restart as before.
+    """
+    module = getattr(target, "__module__", None)
+    qualname = getattr(target, "__qualname__", "")
+    if not module or not qualname or "." in qualname or "<" in qualname:
+        return None
+    spec = {"target": f"{module}:{qualname}", "args": list(args or ()), "kwargs": kwargs or {}}
+    try:
+        json.dumps(spec)
+    except (TypeError, ValueError):
+        return None
+    return spec
+
+def _resolve_job_target(spec: dict) -> Callable:
+    module_name, func_name = spec["target"].split(":", 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+def _serialize_task(db_task: DBTask) -> Optional[dict]:
+    """
+    Serializes a SQLAlchemy DBTask object into a dictionary suitable for JSON transport.
+    Ensures that the owner relationship is loaded.
+    """
+    if not db_task:
+        return None
+    try:
+        return _serialize_task_state(_db_task_to_state(db_task))
+    except Exception as e:
+        print(f"Error serializing task {db_task.id}: {e}")
+        return None
 
-import time
 
 class Task:
     """
-    Represents a runnable task that updates its state in the database.
-    This object is managed by the TaskManager and executed in a separate thread.
+    Represents a runnable task executed in a separate thread.
+
+    Progress, description and log updates only touch an in-memory state buffer.
+    The TaskManager flusher writes the accumulated changes to the database in batches
+    (one transaction for all dirty tasks), while status transitions are written
+    immediately. WebSocket updates are built from the in-memory state.
     """
-    def __init__(self, id: str, name: str, description: Optional[str], target: Callable, args: tuple, kwargs: dict, owner_username: Optional[str], db_session_factory: Callable[[], Session]):
+    def __init__(self, id: str, name: str, description: Optional[str], target: Callable, args: tuple, kwargs: dict, owner_username: Optional[str], db_session_factory: Callable[[], Session], initial_state: Optional[Dict[str, Any]] = None, flusher: Optional["TaskManager"] = None, priority: str = DEFAULT_TASK_PRIORITY):
         self.id = id
+        self.priority = priority if priority in TASK_PRIORITIES else DEFAULT_TASK_PRIORITY
+        self.enqueued_at: Optional[float] = None
         self.name = name
         self.description = description
         self.target = target
@@ -112,76 +181,139 @@ class Task:
         self.cancellation_event = threading.Event()
         self.process = None
         self.db_lock = threading.Lock()
-        
+        self.flusher = flusher
+
+        # In-memory mirror of the task row plus the not-yet-persisted changes
+        self.state_lock = threading.Lock()
+        self.state: Dict[str, Any] = dict(initial_state or {"id": id, "name": name, "description": description, "owner_username": owner_username})
+        self.state.pop("logs", None)
+        self.recent_logs: deque = deque(maxlen=10)
+        self._dirty_fields: set = set()
+        self._pending_logs: List[dict] = []
+
         # Throttling state to prevent WebSocket flooding and frontend crashes (STATUS_BREAKPOINT)
         self.last_broadcast_time = 0
         self.broadcast_interval = 0.1  # Max 10 updates per second
+        self._broadcast_pending = False
+
+    def _send_task_payload(self, task_data: dict, owner_user_id: Optional[int], is_finished: bool):
+        payload = {"type": "task_update", "data": task_data}
+
+        # Broadcast to admins and the specific user (if any)
+        # The manager will handle sending this to all relevant connections across all workers.
+        manager.broadcast_to_admins_sync(payload)
+        if owner_user_id:
+            # [FIX] Ensure user ID is passed as int for consistent lookup in connection manager
+            manager.send_personal_message_sync(payload, int(owner_user_id))
+
+        # Handle special 'result' payloads for direct UI updates
+        if is_finished:
+            end_payload = {"type": "task_end", "data": task_data}
+            if owner_user_id:
+                manager.send_personal_message_sync(end_payload, int(owner_user_id))
+            manager.broadcast_to_admins_sync(end_payload)
 
     def _broadcast_update(self, db_task: DBTask, force: bool = False):
-        """Sends a WebSocket update for the task. Throttled to prevent UI flooding."""
+        """Sends a WebSocket update built from a DB row (used outside of the running thread)."""
         if not db_task:
             return
-        
-        now = time.time()
-        # Always broadcast if it's a final state or forced, otherwise check interval
-        is_final_state = db_task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]
-        
-        if not force and not is_final_state and (now - self.last_broadcast_time < self.broadcast_interval):
-            return
-
         try:
-            self.last_broadcast_time = now
             task_data = _serialize_task(db_task)
             if not task_data:
                 return
-
-            payload = {"type": "task_update", "data": task_data}
-            
-            # Broadcast to admins and the specific user (if any)
-            # The manager will handle sending this to all relevant connections across all workers.
-            manager.broadcast_to_admins_sync(payload)
-            if db_task.owner_user_id:
-                # [FIX] Ensure user ID is passed as int for consistent lookup in connection manager
-                manager.send_personal_message_sync(payload, int(db_task.owner_user_id))
-
-            # Handle special 'result' payloads for direct UI updates
-            is_finished = db_task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]
-            
-            if is_finished:
-                end_payload = {"type": "task_end", "data": task_data}
-                if db_task.owner_user_id:
-                    manager.send_personal_message_sync(end_payload, int(db_task.owner_user_id))
-                manager.broadcast_to_admins_sync(end_payload)
+            self.last_broadcast_time = time.time()
+            self._send_task_payload(task_data, db_task.owner_user_id, db_task.status in FINAL_TASK_STATES)
         except Exception as e:
             print(f"Error broadcasting task update for {self.id}: {e}")
             traceback.print_exc()
 
+    def _broadcast_state(self, force: bool = False):
+        """Sends a WebSocket update from the in-memory state. Throttled to prevent UI flooding."""
+        now = time.time()
+        with self.state_lock:
+            is_final_state = self.state.get("status") in FINAL_TASK_STATES
+            # Always broadcast if it's a final state or forced, otherwise check interval
+            if not force and not is_final_state and (now - self.last_broadcast_time < self.broadcast_interval):
+                # Remember that the UI is behind; the flusher sends the coalesced state.
+                self._broadcast_pending = True
+                return
+            self.last_broadcast_time = now
+            self._broadcast_pending = False
+            snapshot = {**self.state, "logs": list(self.recent_logs)}
 
-    def _update_db(self, **kwargs):
-        """Safely updates the task's record in the database."""
+        try:
+            task_data = _serialize_task_state(snapshot)
+            if task_data:
+                self._send_task_payload(task_data, snapshot.get("owner_user_id"), is_final_state)
+        except Exception as e:
+            print(f"Error broadcasting task update for {self.id}: {e}")
+            traceback.print_exc()
+
+    def _take_pending(self) -> Tuple[Dict[str, Any], List[dict]]:
+        """Detaches the buffered changes so that they can be written outside the state lock."""
+        with self.state_lock:
+            fields = {key: self.state.get(key) for key in self._dirty_fields}
+            if fields:
+                fields["updated_at"] = self.state.get("updated_at")
+            logs = self._pending_logs
+            self._dirty_fields = set()
+            self._pending_logs = []
+        return fields, logs
+
+    def _restore_pending(self, fields: Dict[str, Any], logs: List[dict]):
+        """Puts back changes that failed to be written so the next flush retries them."""
+        with self.state_lock:
+            self._dirty_fields.update(key for key in fields if key != "updated_at")
+            self._pending_logs = logs + self._pending_logs
+
+    def _write_pending(self, db: Session, fields: Dict[str, Any], logs: List[dict]):
+        if fields:
+            db.query(DBTask).filter(DBTask.id == self.id).update(fields, synchronize_session=False)
+        if logs:
+            db.execute(insert(DBTaskLog), [{"task_id": self.id, **entry} for entry in logs])
+
+    def has_pending_changes(self) -> bool:
+        with self.state_lock:
+            return bool(self._dirty_fields or self._pending_logs)
+
+    def flush(self):
+        """Writes this task's buffered changes to the database immediately."""
+        fields, logs = self._take_pending()
+        if not fields and not logs:
+            return
         with self.db_lock:
             with self.db_session_factory() as db:
                 try:
-                    task_record = db.query(DBTask).options(joinedload(DBTask.owner)).filter(DBTask.id == self.id).first()
-                    if not task_record:
-                        return
-                    
-                    for key, value in kwargs.items():
-                        setattr(task_record, key, value)
-                    
-                    task_record.updated_at = datetime.datetime.now(datetime.timezone.utc)
-                    
+                    self._write_pending(db, fields, logs)
                     db.commit()
-                    db.refresh(task_record, ['owner'])
-                    
-                    # If we are setting a final status, force the broadcast
-                    force_broadcast = "status" in kwargs and kwargs["status"] in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]
-                    self._broadcast_update(task_record, force=force_broadcast)
                 except Exception as e:
-                    print(f"CRITICAL: Task {self.id} - Failed to update database: {e}")
+                    print(f"CRITICAL: Task {self.id} - Failed to flush state to database: {e}")
                     traceback.print_exc()
                     db.rollback()
+                    self._restore_pending(fields, logs)
 
+    def _mark_dirty(self):
+        if self.flusher:
+            self.flusher.mark_dirty(self)
+        else:
+            self.flush()
+
+    def _update_db(self, **kwargs):
+        """Updates the task's state. Status transitions are persisted immediately, the rest is batched."""
+        with self.state_lock:
+            self.state.update(kwargs)
+            self.state["updated_at"] = datetime.datetime.now(datetime.timezone.utc)
+            self._dirty_fields.update(key for key in kwargs if key in BUFFERED_TASK_FIELDS)
+
+        is_transition = "status" in kwargs
+        if is_transition:
+            self.flush()
+        else:
+            self._mark_dirty()
+
+        # If we are setting a final status, force the broadcast
+        force_broadcast = is_transition and kwargs["status"] in FINAL_TASK_STATES
+        self._broadcast_state(force=force_broadcast)
 
     def log(self, message: str, level: str = "INFO"):
         """Adds a log entry to the task's record."""
@@ -190,30 +322,12 @@ class Task:
             "message": message,
             "level": level
         }
-        with self.db_lock:
-            with self.db_session_factory() as db:
-                try:
-                    task_record = db.query(DBTask).options(joinedload(DBTask.owner)).filter(DBTask.id == self.id).first()
-                    if task_record:
-                        if task_record.logs is None:
-                            task_record.logs = []
-                        
-                        # Clone logs to ensure SQLAlchemy detects change on mutable JSON
-                        current_logs = list(task_record.logs)
-                        current_logs.append(log_entry)
-                        task_record.logs = current_logs
-                        
-                        task_record.updated_at = datetime.datetime.now(datetime.timezone.utc)
-                        
-                        flag_modified(task_record, "logs")
-                        db.commit()
-                        db.refresh(task_record, ['owner'])
-                        self._broadcast_update(task_record)
-                except Exception as e:
-                    print(f"CRITICAL: Task {self.id} - Failed to write log to database: {e}")
-                    traceback.print_exc()
-                    db.rollback()
-
+        with self.state_lock:
+            self._pending_logs.append(log_entry)
+            self.recent_logs.append(log_entry)
+            self.state["updated_at"] = datetime.datetime.now(datetime.timezone.utc)
+        self._mark_dirty()
+        self._broadcast_state()
 
     def set_progress(self, value: int):
         """Sets the task's progress percentage."""
@@ -222,7 +336,7 @@ class Task:
     def set_description(self, description: str):
         """Updates the task's description."""
         self._update_db(description=description)
-    
+
     def set_file_info(self, file_name: str, total_files: int):
         """Sets file-related information for the task."""
         self._update_db(file_name=file_name, total_files=total_files)
@@ -242,12 +356,12 @@ class Task:
         """The main execution method for the task thread."""
         self._update_db(status=TaskStatus.RUNNING, started_at=datetime.datetime.now(datetime.timezone.utc))
         self.log(f"Task '{self.name}' started.")
-        
+
         final_updates = {}
 
         try:
             result = self.target(self, *self.args, **self.kwargs)
-            
+
             if self.cancellation_event.is_set():
                 final_updates["status"] = TaskStatus.CANCELLED
                 self.log(f"Task '{self.name}' was cancelled.", level="WARNING")
@@ -269,32 +383,247 @@ class Task:
 class TaskManager:
     """
     Manages the lifecycle of background tasks in a persistent, thread-safe manner.
+
+    Tasks are executed by a fixed-size worker pool. Pending tasks wait in a priority
+    queue (interactive > background > maintenance) with a per-user concurrency cap,
+    and restorable pending tasks are re-queued from the database after a restart.
+    Also owns the flusher thread that persists buffered task state in batches.
     """
     def __init__(self, db_session_factory: Optional[Callable[[], Session]] = None):
         self.db_session_factory = db_session_factory
         self.active_tasks: Dict[str, Task] = {}
         self.lock = threading.Lock()
 
+        # Batched state flushing
+        self._dirty_tasks: Dict[str, Task] = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flusher_thread: Optional[threading.Thread] = None
+
+        # Worker pool / scheduling
+        self._queue: List[Tuple[int, int, Task]] = []
+        self._queue_cond = threading.Condition()
+        self._sequence = itertools.count()
+        self._workers: List[threading.Thread] = []
+        self._running: Dict[str, Task] = {}
+        self._running_per_user: Dict[str, int] = {}
+        self._wait_samples: Dict[str, deque] = {name: deque(maxlen=500) for name in TASK_PRIORITIES}
+
     def init_app(self, db_session_factory: Callable[[], Session]):
         """Initializes the TaskManager with a database session factory."""
         self.db_session_factory = db_session_factory
+        self._start_flusher()
+        self._start_workers()
+
+    # --- Worker pool ---
+
+    @staticmethod
+    def _max_workers() -> int:
+        return max(1, int(settings.get("tasks_max_workers", min(8, (os.cpu_count() or 2) + 2))))
+
+    @staticmethod
+    def _max_per_user() -> int:
+        return max(1, int(settings.get("tasks_max_concurrent_per_user", 2)))
+
+    def _start_workers(self):
+        with self._queue_cond:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            for i in range(len(self._workers), self._max_workers()):
+                worker = threading.Thread(target=self._worker_loop, name=f"TaskWorker-{i}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def _can_start_locked(self, task: Task) -> bool:
+        pool_size = len(self._workers)
+        if task.owner_username and self._running_per_user.get(task.owner_username, 0) >= self._max_per_user():
+            return False
+        if task.priority != "interactive" and pool_size > 1:
+            # Keep some capacity free for interactive work
+            reserved = int(settings.get("tasks_reserved_interactive_workers", 1))
+            busy_non_interactive = sum(1 for t in self._running.values() if t.priority != "interactive")
+            if busy_non_interactive >= max(1, pool_size - reserved):
+                return False
+        if task.priority == "maintenance":
+            max_maintenance = max(1, pool_size // 4)
+            if sum(1 for t in self._running.values() if t.priority == "maintenance") >= max_maintenance:
+                return False
+        return True
+
+    def _pick_next_locked(self) -> Optional[Task]:
+        for entry in sorted(self._queue):
+            task = entry[2]
+            if self._can_start_locked(task):
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                return task
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._queue_cond:
+                task = self._pick_next_locked()
+                while task is None:
+                    self._queue_cond.wait()
+                    task = self._pick_next_locked()
+                self._running[task.id] = task
+                if task.owner_username:
+                    self._running_per_user[task.owner_username] = self._running_per_user.get(task.owner_username, 0) + 1
+                if task.enqueued_at is not None:
+                    self._wait_samples[task.priority].append(time.monotonic() - task.enqueued_at)
+            try:
+                self._run_and_cleanup(task)
+            except Exception as e:
+                print(f"CRITICAL: Task worker error while running {task.id}: {e}")
+                traceback.print_exc()
+            finally:
+                with self._queue_cond:
+                    self._running.pop(task.id, None)
+                    if task.owner_username:
+                        remaining = self._running_per_user.get(task.owner_username, 1) - 1
+                        if remaining > 0:
+                            self._running_per_user[task.owner_username] = remaining
+                        else:
+                            self._running_per_user.pop(task.owner_username, None)
+                    self._queue_cond.notify_all()
+
+    def _enqueue(self, task: Task):
+        with self.lock:
+            self.active_tasks[task.id] = task
+        with self._queue_cond:
+            task.enqueued_at = time.monotonic()
+            heapq.heappush(self._queue, (TASK_PRIORITIES[task.priority], next(self._sequence), task))
+            self._queue_cond.notify_all()
+        if not any(w.is_alive() for w in self._workers):
+            self._start_workers()
+
+    def _dequeue(self, task_id: str) -> Optional[Task]:
+        """Removes a task that has not started yet from the queue."""
+        with self._queue_cond:
+            for entry in self._queue:
+                if entry[2].id == task_id:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    return entry[2]
+        return None
+
+    def get_queue_stats(self, include_users: bool = False) -> Dict[str, Any]:
+        """Queue depth, running counts and recent wait times per priority class."""
+        now = time.monotonic()
+        with self._queue_cond:
+            queued = [entry[2] for entry in self._queue]
+            running = list(self._running.values())
+            per_user = dict(self._running_per_user)
+            samples = {name: list(values) for name, values in self._wait_samples.items()}
+
+        classes = {}
+        for name in TASK_PRIORITIES:
+            class_queued = [t for t in queued if t.priority == name]
+            waits = sorted(samples[name])
+            classes[name] = {
+                "queued": len(class_queued),
+                "running": sum(1 for t in running if t.priority == name),
+                "oldest_wait_seconds": round(max((now - t.enqueued_at for t in class_queued if t.enqueued_at), default=0.0), 3),
+                "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95_wait_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                "max_wait_seconds": round(waits[-1], 3) if waits else 0.0,
+            }
+
+        stats = {
+            "workers": len(self._workers),
+            "busy_workers": len(running),
+            "queue_depth": len(queued),
+            "max_concurrent_per_user": self._max_per_user(),
+            "classes": classes,
+        }
+        if include_users:
+            queued_per_user: Dict[str, int] = {}
+            for t in queued:
+                key = t.owner_username or "System"
+                queued_per_user[key] = queued_per_user.get(key, 0) + 1
+            stats["running_per_user"] = per_user
+            stats["queued_per_user"] = queued_per_user
+        return stats
+
+    # --- Batched state flushing ---
+
+    def _start_flusher(self):
+        if self._flusher_thread and self._flusher_thread.is_alive():
+            return
+        self._flusher_thread = threading.Thread(target=self._flush_loop, name="TaskStateFlusher", daemon=True)
+        self._flusher_thread.start()
+
+    def mark_dirty(self, task: Task):
+        """Queues a task for the next batched flush. Large log backlogs trigger an early flush."""
+        with self._dirty_lock:
+            self._dirty_tasks[task.id] = task
+        if len(task._pending_logs) >= settings.get("task_flush_max_pending_logs", 200):
+            self._flush_event.set()
+        if not (self._flusher_thread and self._flusher_thread.is_alive()):
+            self._start_flusher()
+
+    def _flush_loop(self):
+        while True:
+            interval = float(settings.get("task_flush_interval_seconds", 1.0))
+            self._flush_event.wait(timeout=max(0.05, interval))
+            self._flush_event.clear()
+            try:
+                self.flush_all()
+            except Exception as e:
+                print(f"CRITICAL: Task state flusher error: {e}")
+                traceback.print_exc()
+
+    def flush_all(self):
+        """Writes every dirty task's buffered progress and logs in a single transaction."""
+        with self._dirty_lock:
+            tasks = list(self._dirty_tasks.values())
+            self._dirty_tasks.clear()
+        if not tasks or not self.db_session_factory:
+            return
+
+        pending = [(task, *task._take_pending()) for task in tasks]
+        pending = [(task, fields, logs) for task, fields, logs in pending if fields or logs]
+        if pending:
+            with self.db_session_factory() as db:
+                try:
+                    for task, fields, logs in pending:
+                        task._write_pending(db, fields, logs)
+                    db.commit()
+                except Exception as e:
+                    print(f"CRITICAL: Failed to flush {len(pending)} task states to database: {e}")
+                    db.rollback()
+                    for task, fields, logs in pending:
+                        task._restore_pending(fields, logs)
+                        with self._dirty_lock:
+                            self._dirty_tasks[task.id] = task
+                    return
+
+        # Send the coalesced state of tasks whose last update was throttled
+        for task in tasks:
+            if task._broadcast_pending:
+                task._broadcast_state(force=True)
 
     def _run_and_cleanup(self, task: Task):
         """Wrapper to run a task and ensure it's removed from the active list upon completion."""
         try:
             task.run()
         finally:
+            task.flush()
+            with self._dirty_lock:
+                self._dirty_tasks.pop(task.id, None)
             with self.lock:
                 if task.id in self.active_tasks:
                     del self.active_tasks[task.id]
 
-    def submit_task(self, name: str, target: Callable, args: tuple = (), kwargs: dict = None, description: Optional[str] = None, owner_username: Optional[str] = None) -> TaskInfo:
+    def submit_task(self, name: str, target: Callable, args: tuple = (), kwargs: dict = None, description: Optional[str] = None, owner_username: Optional[str] = None, priority: str = DEFAULT_TASK_PRIORITY) -> TaskInfo:
         """
-        Creates a task record in the DB, and starts its execution in a new thread.
+        Creates a PENDING task record in the DB and queues it for the worker pool.
+        `priority` is one of "interactive", "background" or "maintenance".
         """
         if not self.db_session_factory:
             raise RuntimeError("TaskManager not initialized. Call init_app first.")
-            
+        if priority not in TASK_PRIORITIES:
+            priority = DEFAULT_TASK_PRIORITY
+
         with self.db_session_factory() as db:
             owner_id = None
             if owner_username:
@@ -305,39 +634,85 @@ class TaskManager:
             new_db_task = DBTask(
                 name=name,
                 description=description or name,
-                owner_user_id=owner_id
+                owner_user_id=owner_id,
+                priority=priority,
+                job_spec=_build_job_spec(target, args, kwargs)
             )
             db.add(new_db_task)
             db.commit()
             db.refresh(new_db_task, ['owner'])
-            
+
             task_info_to_return = _to_task_info(new_db_task)
+            initial_state = _db_task_to_state(new_db_task)
 
             # Initial broadcast that the task has been created
             task_instance_for_broadcast = Task(id=new_db_task.id, name=name, description=description, target=target, args=args, kwargs=kwargs, owner_username=owner_username, db_session_factory=self.db_session_factory)
             task_instance_for_broadcast._broadcast_update(new_db_task)
 
 
-        task_instance = Task(id=new_db_task.id, name=name, description=description, target=target, args=args, kwargs=kwargs, owner_username=owner_username, db_session_factory=self.db_session_factory)
-        
-        with self.lock:
-            self.active_tasks[task_instance.id] = task_instance
+        task_instance = Task(id=new_db_task.id, name=name, description=description, target=target, args=args, kwargs=kwargs, owner_username=owner_username, db_session_factory=self.db_session_factory, initial_state=initial_state, flusher=self, priority=priority)
+        self._enqueue(task_instance)
 
-        thread = threading.Thread(target=self._run_and_cleanup, args=(task_instance,), daemon=True)
-        thread.start()
-        
         return task_info_to_return
 
+    def restore_pending_tasks(self) -> int:
+        """
+        Re-queues PENDING tasks left in the database by a previous run.
+        Must be called by a single worker process to avoid running them twice.
+        """
+        if not self.db_session_factory:
+            return 0
+        restored = 0
+        with self.db_session_factory() as db:
+            pending = db.query(DBTask).options(joinedload(DBTask.owner)).filter(
+                DBTask.status == TaskStatus.PENDING, DBTask.job_spec.isnot(None)
+            ).order_by(DBTask.created_at).all()
+            for db_task in pending:
+                with self.lock:
+                    if db_task.id in self.active_tasks:
+                        continue
+                try:
+                    target = _resolve_job_target(db_task.job_spec)
+                except Exception as e:
+                    db_task.status = TaskStatus.FAILED
+                    db_task.error = f"Could not restore task after restart: {e}"
+                    db_task.completed_at = datetime.datetime.now(datetime.timezone.utc)
+                    continue
+                owner_username = db_task.owner.username if db_task.owner else None
+                task_instance = Task(
+                    id=db_task.id, name=db_task.name, description=db_task.description, target=target,
+                    args=tuple(db_task.job_spec.get("args", [])), kwargs=db_task.job_spec.get("kwargs", {}),
+                    owner_username=owner_username, db_session_factory=self.db_session_factory,
+                    initial_state=_db_task_to_state(db_task), flusher=self, priority=db_task.priority or DEFAULT_TASK_PRIORITY
+                )
+                self._enqueue(task_instance)
+                restored += 1
+            db.commit()
+        if restored:
+            print(f"INFO: Re-queued {restored} pending background tasks.")
+        return restored
+
     def cancel_task(self, task_id: str) -> bool:
         """
-        Cancels a task. If the task is actively running, it signals the thread.
+        Cancels a task. Queued tasks are removed from the queue, running tasks are signalled.
         If the task is a "zombie" (in DB but not running), it updates the DB directly.
         """
+        queued_task = self._dequeue(task_id)
+        if queued_task:
+            queued_task.cancellation_event.set()
+            queued_task.log("Task cancelled before it started.", level="WARNING")
+            queued_task._update_db(status=TaskStatus.CANCELLED, completed_at=datetime.datetime.now(datetime.timezone.utc))
+            with self.lock:
+                self.active_tasks.pop(task_id, None)
+            return True
+
         with self.lock:
             task_instance = self.active_tasks.get(task_id)
-        
+
         if task_instance and not task_instance.cancellation_event.is_set():
             task_instance.cancel()
+            # Persist the cancellation logs right away so the caller reads them back
+            task_instance.flush()
             return True
 
         with self.db_session_factory() as db:
@@ -345,23 +720,19 @@ class TaskManager:
             if db_task and db_task.status in [TaskStatus.PENDING, TaskStatus.RUNNING]:
                 db_task.status = TaskStatus.CANCELLED
                 db_task.completed_at = datetime.datetime.now(datetime.timezone.utc)
-                
-                log_entry = {
-                    "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                    "message": "Task was cancelled manually while in a pending or orphaned state.",
-                    "level": "WARNING"
-                }
-                current_logs = list(db_task.logs) if db_task.logs else []
-                current_logs.append(log_entry)
-                db_task.logs = current_logs
-                
+                db_task.log_entries.append(DBTaskLog(
+                    timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    message="Task was cancelled manually while in a pending or orphaned state.",
+                    level="WARNING"
+                ))
+
                 db.commit()
                 db.refresh(db_task, ['owner'])
 
                 # Manually create a task instance to call the broadcast method
                 task_instance_for_broadcast = Task(id=db_task.id, name=db_task.name, description=db_task.description, target=lambda: None, args=(), kwargs={}, owner_username=db_task.owner.username if db_task.owner else None, db_session_factory=self.db_session_factory)
                 task_instance_for_broadcast._broadcast_update(db_task)
-                
+
                 return True
 
         return False
@@ -375,7 +746,7 @@ class TaskManager:
         """Retrieves all tasks from the database for an admin."""
         with self.db_session_factory() as db:
             return db.query(DBTask).options(joinedload(DBTask.owner)).order_by(DBTask.created_at.desc()).all()
-    
+
     def get_tasks_for_user(self, username: str) -> List[DBTask]:
         """Retrieves all tasks for a specific user."""
         with self.db_session_factory() as db:
@@ -384,13 +755,16 @@ class TaskManager:
     def clear_completed_tasks(self, username: Optional[str] = None):
         """Deletes finished (completed, failed, cancelled) tasks from the database."""
         with self.db_session_factory() as db:
-            query = db.query(DBTask).filter(DBTask.status.in_([TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]))
+            query = db.query(DBTask.id).filter(DBTask.status.in_([TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]))
             if username:
                 query = query.join(DBUser, DBTask.owner_user_id == DBUser.id).filter(DBUser.username == username)
-            
-            query.delete(synchronize_session=False)
+            task_ids = [task_id for task_id, in query.all()]
+
+            if task_ids:
+                db.query(DBTaskLog).filter(DBTaskLog.task_id.in_(task_ids)).delete(synchronize_session=False)
+                db.query(DBTask).filter(DBTask.id.in_(task_ids)).delete(synchronize_session=False)
             db.commit()
-            
+
             payload = {"type": "tasks_cleared", "data": {"username": username}}
             manager.broadcast_sync(payload)
 
@@ -24,6 +24,8 @@ from backend.task_manager import Task
 from backend.db.models.image import UserImage
 from backend.models.image import UserImagePublic, ImagePromptEnhancementRequest, TimelapseRequest
 from backend.settings import settings
+from backend.image_blob_store import image_blob_store
+from backend.image_thumbnails import thumbnail_service
 
 # Attempt to import moviepy for video generation
 try:
@@ -118,7 +120,7 @@ def _generate_image_task(task: Task, username: str, discussion_id: str, prompt:
             "model_name": new_message.model_name,
             "token_count": new_message.tokens,
             "metadata": new_message.metadata,
-            "image_references": [f"data:image/png;base64,{img}" for img in new_message.images or []],
+            "image_references": image_blob_store.image_refs(username, new_message.images, new_message.id),
             "created_at": new_message.created_at.isoformat() if new_message.created_at else datetime.datetime.now(datetime.timezone.utc).isoformat(),
             "sources": (new_message.metadata or {}).get('sources', []),
             "events": (new_message.metadata or {}).get('events', [])
@@ -264,7 +266,7 @@ Example: ["A close up of a robot hand holding a flower", "Wide shot of a mars co
             "id": target_message.id,
             "sender": target_message.sender,
             "content": target_message.content,
-            "image_references": [f"data:image/png;base64,{img}" for img in target_message.images or []],
+            "image_references": image_blob_store.image_refs(username, target_message.images, target_message.id),
             "sender_type": target_message.sender_type,
             "created_at": target_message.created_at.isoformat() if hasattr(target_message.created_at, 'isoformat') else str(target_message.created_at),
             "metadata": target_message.metadata,
@@ -372,6 +374,7 @@ def _image_studio_generate_task(task: Task, username: str, request_data: dict):
             db.add(new_image)
             db.commit()
             db.refresh(new_image)
+            thumbnail_service.pregenerate(file_path)
 
             generated_images_data.append(json.loads(UserImagePublic.from_orm(new_image).model_dump_json()))
             
@@ -500,6 +503,7 @@ def _image_studio_edit_task(task: Task, username: str, request_data: dict):
         db.add(new_image)
         db.commit()
         db.refresh(new_image)
+        thumbnail_service.pregenerate(file_path)
 
         task.log("Image editing completed and saved.")
         task.set_progress(100)
@@ -11,7 +11,7 @@ from pathlib import Path
 from sqlalchemy import desc
 from backend.config import PROJECT_ROOT, APP_DATA_DIR
 from backend.task_manager import Task
-from backend.db.models.db_task import DBTask
+from backend.db.models.db_task import DBTask, DBTaskLog
 from backend.db.models.config import GlobalConfig
 from backend.session import get_user_lollms_client
 from backend.ws_manager import manager
@@ -328,14 +328,141 @@ def _prune_old_tasks_task(task: Task):
             DBTask.updated_at < cutoff
         )
         
-        count = query.count()
+        task_ids = [task_id for task_id, in query.with_entities(DBTask.id).all()]
+        count = len(task_ids)
         task.log(f"Found {count} tasks matching pruning criteria.")
         
         if count > 0:
-            query.delete(synchronize_session=False)
+            db.query(DBTaskLog).filter(DBTaskLog.task_id.in_(task_ids)).delete(synchronize_session=False)
+            db.query(DBTask).filter(DBTask.id.in_(task_ids)).delete(synchronize_session=False)
             db.commit()
             task.log(f"Successfully deleted {count} old tasks.")
             manager.broadcast_sync({"type": "tasks_cleared", "data": {"username": None}})
 
     task.set_progress(100)
     return {"message": f"Pruning complete. Deleted {count} tasks."}
+
+def _backfill_generation_stats_task(task: Task):
+    """
+    One-shot rebuild of the generation_daily_stats rollup from every user's discussions.db.
+    Counts are merged with max() so the task is idempotent and never loses increments
+    written by live chat turns while it runs.
+    """
+    from sqlalchemy import func
+    from backend.db.models.user import User as DBUser
+    from backend.db.models.generation_stats import GenerationDailyStat
+    from backend.session import get_user_data_root
+    from backend.discussion_manager import get_user_discussion_manager
+    from backend.utils import set_system_cache
+
+    with task.db_session_factory() as db:
+        users = db.query(DBUser.id, DBUser.username).all()
+
+    total_users = len(users)
+    task.log(f"Backfilling generation statistics for {total_users} users.")
+    total_rows = 0
+
+    for index, (user_id, username) in enumerate(users):
+        if task.cancellation_event.is_set():
+            task.log("Backfill cancelled.", "WARNING")
+            return {"message": "Backfill cancelled.", "rows": total_rows}
+
+        if not (get_user_data_root(username) / "discussions.db").exists():
+            continue
+        try:
+            dm = get_user_discussion_manager(username)
+            with dm.get_session() as session:
+                results = session.query(
+                    func.date(dm.MessageModel.created_at),
+                    dm.MessageModel.binding_name,
+                    dm.MessageModel.model_name,
+                    func.count(dm.MessageModel.id)
+                ).filter(
+                    dm.MessageModel.sender_type == 'assistant'
+                ).group_by(
+                    func.date(dm.MessageModel.created_at),
+                    dm.MessageModel.binding_name,
+                    dm.MessageModel.model_name
+                ).all()
+
+            with task.db_session_factory() as db:
+                for date_str, binding_name, model_name, count in results:
+                    if not date_str:
+                        continue
+                    day = datetime.strptime(str(date_str), '%Y-%m-%d').date()
+                    row = db.query(GenerationDailyStat).filter(
+                        GenerationDailyStat.day == day,
+                        GenerationDailyStat.user_id == user_id,
+                        GenerationDailyStat.binding_name == (binding_name or ""),
+                        GenerationDailyStat.model_name == (model_name or "")
+                    ).first()
+                    if row:
+                        row.count = max(row.count or 0, count)
+                    else:
+                        db.add(GenerationDailyStat(day=day, user_id=user_id, binding_name=binding_name or "", model_name=model_name or "", count=count))
+                    total_rows += 1
+                db.commit()
+        except Exception as e:
+            task.log(f"Could not process discussions DB for user {username}: {e}", "WARNING")
+
+        task.set_progress(int(((index + 1) / max(total_users, 1)) * 100))
+
+    with task.db_session_factory() as db:
+        set_system_cache(db, "generation_stats_backfilled", True)
+
+    task.log(f"Backfill complete. {total_rows} daily rows merged.")
+    return {"message": "Generation statistics backfill complete.", "rows": total_rows}
+
+def _migrate_message_images_to_blobs_task(task: Task):
+    """
+    Copies the base64 images held in every user's discussion messages into the
+    content-addressed image blob store. lollms_client keeps the base64 in the rows
+    for model context; the task also records each image's digest, so serving the
+    messages afterwards neither hashes nor writes them. Already stored images are
+    skipped, so the task can be re-run safely.
+    """
+    from backend.db.models.user import User as DBUser
+    from backend.session import get_user_data_root
+    from backend.discussion_manager import get_user_discussion_manager
+    from backend.image_blob_store import image_blob_store
+
+    with task.db_session_factory() as db:
+        usernames = [row.username for row in db.query(DBUser.username).all()]
+
+    total_users = len(usernames)
+    task.log(f"Moving message images to the blob store for {total_users} users.")
+    total_images = 0
+    total_blobs = set()
+
+    for index, username in enumerate(usernames):
+        if task.cancellation_event.is_set():
+            task.log("Image migration cancelled.", "WARNING")
+            return {"message": "Image migration cancelled.", "images": total_images, "blobs": len(total_blobs)}
+
+        if not (get_user_data_root(username) / "discussions.db").exists():
+            continue
+        try:
+            dm = get_user_discussion_manager(username)
+            with dm.get_session() as session:
+                rows = session.query(dm.MessageModel.id, dm.MessageModel.images).filter(dm.MessageModel.images.isnot(None)).yield_per(100)
+                for message_id, images in rows:
+                    if isinstance(images, str):
+                        try:
+                            images = json.loads(images)
+                        except json.JSONDecodeError:
+                            continue
+                    for image_index, image in enumerate(images or []):
+                        b64 = image.get("image") if isinstance(image, dict) else image
+                        if not isinstance(b64, str):
+                            continue
+                        digest = image_blob_store.store_message_image(username, message_id, image_index, b64)
+                        if digest:
+                            total_images += 1
+                            total_blobs.add((username, digest))
+        except Exception as e:
+            task.log(f"Could not migrate images for user {username}: {e}", "WARNING")
+
+        task.set_progress(int(((index + 1) / max(total_users, 1)) * 100))
+
+    task.log(f"Image migration complete. {total_images} image references stored as {len(total_blobs)} blobs.")
+    return {"message": "Image migration complete.", "images": total_images, "blobs": len(total_blobs)}
@@ -12,5 +12,6 @@ def _to_task_info(db_task: DBTask) -> TaskInfo:
         logs=[log for log in (db_task.logs or [])], result=db_task.result, error=db_task.error,
         created_at=db_task.created_at, started_at=db_task.started_at, updated_at=db_task.updated_at, completed_at=db_task.completed_at,
         file_name=db_task.file_name, total_files=db_task.total_files,
-        owner_username=db_task.owner.username if db_task.owner else "System"
+        owner_username=db_task.owner.username if db_task.owner else "System",
+        priority=db_task.priority
     )
\ No newline at end of file
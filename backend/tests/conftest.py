@@ -0,0 +1,30 @@
+# backend/tests/conftest.py
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+
+
+class _SettingsStub:
+    """Stands in for backend.settings.settings: `get` reads from a plain dict."""
+    def __init__(self, values: dict):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+@pytest.fixture
+def settings_stub(monkeypatch):
+    """
+    Replaces the `settings` object a module reads with one backed by `values`.
+    Returns the dict, so a test can change a setting after installing the stub.
+    """
+    def install(module, values: dict) -> dict:
+        monkeypatch.setattr(module, "settings", _SettingsStub(values))
+        return values
+    return install
@@ -0,0 +1,82 @@
+# backend/tests/test_api_key_cache.py
+"""
+Tests for the cache of successful API key verifications used by the service APIs.
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+
+from backend import security
+from backend.security import VerifiedApiKeyCache
+from backend import settings as settings_module
+
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    calls = []
+
+    def fake_verify(plain_key, hashed_key):
+        calls.append(plain_key)
+        return hashed_key == f"hash:{plain_key}"
+
+    monkeypatch.setattr(security, "verify_api_key", fake_verify)
+    return calls
+
+
+@pytest.fixture
+def config(settings_stub):
+    # VerifiedApiKeyCache imports the settings object when it verifies
+    return settings_stub(settings_module, {"api_key_cache_ttl_seconds": 300, "api_key_cache_max_entries": 10000})
+
+
+def test_successful_verification_is_reused(verify_calls, config):
+    cache = VerifiedApiKeyCache()
+    assert cache.verify("sk-1", 1, 10, "hash:sk-1")
+    assert cache.verify("sk-1", 1, 10, "hash:sk-1")
+    assert verify_calls == ["sk-1"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_failures_are_not_cached(verify_calls, config):
+    cache = VerifiedApiKeyCache()
+    assert not cache.verify("sk-bad", 1, 10, "hash:other")
+    assert not cache.verify("sk-bad", 1, 10, "hash:other")
+    assert len(verify_calls) == 2
+
+
+def test_changed_key_row_misses(verify_calls, config):
+    cache = VerifiedApiKeyCache()
+    cache.verify("sk-1", 1, 10, "hash:sk-1")
+    # Same presented key, but the row now has another id: verify again, against the new row
+    assert not cache.verify("sk-1", 2, 10, "hash:rotated")
+    assert len(verify_calls) == 2
+
+
+def test_invalidate_by_user_and_key(verify_calls, config):
+    cache = VerifiedApiKeyCache()
+    cache.verify("sk-1", 1, 10, "hash:sk-1")
+    cache.verify("sk-2", 2, 20, "hash:sk-2")
+    cache.invalidate(user_id=10)
+    cache.invalidate(key_ids=[2])
+    cache.verify("sk-1", 1, 10, "hash:sk-1")
+    cache.verify("sk-2", 2, 20, "hash:sk-2")
+    assert verify_calls == ["sk-1", "sk-2", "sk-1", "sk-2"]
+
+
+def test_zero_ttl_disables_the_cache(verify_calls, config):
+    config["api_key_cache_ttl_seconds"] = 0
+    cache = VerifiedApiKeyCache()
+    cache.verify("sk-1", 1, 10, "hash:sk-1")
+    cache.verify("sk-1", 1, 10, "hash:sk-1")
+    assert len(verify_calls) == 2
+
+
+def test_plain_keys_are_not_stored(verify_calls, config):
+    cache = VerifiedApiKeyCache()
+    cache.verify("sk-secret", 1, 10, "hash:sk-secret")
+    assert all(b"sk-secret" not in digest for digest in cache._entries)
@@ -0,0 +1,92 @@
+# backend/tests/test_auth_snapshot_cache.py
+"""
+Tests for the cache of UserAuthDetails snapshots used by get_current_active_user.
+"""
+import datetime
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import backend.db.models  # noqa: F401 - registers the tables on Base
+import backend.db.models.skill  # noqa: F401 - User.skills needs it to configure the mappers
+from backend import session as session_module
+from backend.db.base import Base
+from backend.db.models.user import User as DBUser
+from backend.models import UserAuthDetails
+from backend.session import AuthSnapshotCache, auth_snapshot_cache
+
+
+@pytest.fixture
+def config(settings_stub):
+    return settings_stub(session_module, {"auth_snapshot_ttl_seconds": 60, "auth_snapshot_cache_max_entries": 2})
+
+
+def _snapshot(username: str) -> UserAuthDetails:
+    return UserAuthDetails(id=1, username=username, is_admin=False, is_active=True)
+
+
+def test_snapshot_is_reused_while_the_fingerprint_matches(config):
+    cache = AuthSnapshotCache()
+    cache.put("alice", ("t1", 1), _snapshot("alice"))
+    hit = cache.get("alice", ("t1", 1))
+    assert hit is not None and hit.username == "alice"
+    assert cache.get("alice", ("t2", 1)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_callers_get_copies(config):
+    cache = AuthSnapshotCache()
+    cache.put("alice", ("t1",), _snapshot("alice"))
+    cache.get("alice", ("t1",)).is_admin = True
+    assert cache.get("alice", ("t1",)).is_admin is False
+
+
+def test_expired_and_evicted_snapshots_miss(config, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(session_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    cache = AuthSnapshotCache()
+    cache.put("alice", ("t",), _snapshot("alice"))
+    clock[0] += 61
+    assert cache.get("alice", ("t",)) is None
+
+    for username in ("alice", "bob", "carol"):
+        cache.put(username, ("t",), _snapshot(username))
+    assert cache.get("alice", ("t",)) is None
+    assert cache.get("carol", ("t",)) is not None
+
+
+def test_zero_ttl_disables_the_cache(config):
+    config["auth_snapshot_ttl_seconds"] = 0
+    cache = AuthSnapshotCache()
+    cache.put("alice", ("t",), _snapshot("alice"))
+    assert cache.get("alice", ("t",)) is None
+
+
+def test_user_row_updates_drop_the_snapshot(config):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = DBUser(username="listener-test", hashed_password="x")
+    db.add(user)
+    db.commit()
+    try:
+        auth_snapshot_cache.put("listener-test", ("t",), _snapshot("listener-test"))
+        user.last_activity_at = datetime.datetime.now(datetime.timezone.utc)
+        db.commit()
+        # Activity timestamps alone keep the snapshot
+        assert auth_snapshot_cache.get("listener-test", ("t",)) is not None
+
+        user.is_admin = True
+        db.commit()
+        assert auth_snapshot_cache.get("listener-test", ("t",)) is None
+    finally:
+        auth_snapshot_cache.invalidate("listener-test")
+        db.close()
@@ -0,0 +1,69 @@
+# backend/tests/test_binding_catalogue.py
+"""
+Tests for the in-memory binding catalogue used to resolve LollmsClients without
+querying the binding tables on every request.
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import backend.db.models  # noqa: F401 - registers the tables on Base
+import backend.db.models.skill  # noqa: F401 - User.skills needs it to configure the mappers
+from backend.binding_catalogue import BindingCatalogue, binding_catalogue
+from backend.db import session as db_session_module
+from backend.db.base import Base
+from backend.db.models.config import LLMBinding as DBLLMBinding
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    # One shared in-memory database for every session
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(db_session_module, "SessionLocal", factory)
+    yield factory
+    binding_catalogue.invalidate()
+
+
+def test_entries_are_loaded_once_and_detached(session_factory):
+    db = session_factory()
+    db.add_all([
+        DBLLMBinding(alias="main", name="ollama", config={"host": "h"}, is_active=True, model_aliases='{"m": {"title": "M"}}'),
+        DBLLMBinding(alias="off", name="openai", is_active=False),
+    ])
+    db.commit()
+    db.close()
+
+    catalogue = BindingCatalogue()
+    main = catalogue.get_active("llm", "main")
+    assert main.name == "ollama" and main.model_aliases == {"m": {"title": "M"}}
+    assert catalogue.get_active("llm", "off") is None
+    assert catalogue.default_active("llm").alias == "main"
+    version = catalogue.current_version()
+    catalogue.get_active("llm", "main")
+    assert catalogue.current_version() == version
+
+
+def test_binding_writes_reload_the_catalogue(session_factory):
+    db = session_factory()
+    binding = DBLLMBinding(alias="main", name="ollama", is_active=True)
+    db.add(binding)
+    db.commit()
+
+    version = binding_catalogue.current_version()
+    assert binding_catalogue.get_active("llm", "main") is not None
+
+    binding.is_active = False
+    db.commit()
+    db.close()
+    assert binding_catalogue.get_active("llm", "main") is None
+    assert binding_catalogue.current_version() > version
@@ -0,0 +1,74 @@
+# backend/tests/test_discussion_branch_index.py
+"""
+Tests for branch paging: pages read from discussions.db by walking parent links
+must match the branch lollms_client builds, with branch points reported.
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+from lollms_client import LollmsDataManager, LollmsDiscussion
+
+from backend.discussion_branch_index import load_branch_page
+
+
+@pytest.fixture
+def discussion(tmp_path):
+    dm = LollmsDataManager(f"sqlite:///{(tmp_path / 'discussions.db').as_posix()}")
+    discussion = LollmsDiscussion.create_new(lollms_client=None, db_manager=dm, autosave=True)
+    ids = []
+    for index in range(5):
+        sender, sender_type = ("user", "user") if index % 2 == 0 else ("ai", "assistant")
+        ids.append(discussion.add_message(sender=sender, sender_type=sender_type, content=str(index)).id)
+    discussion.commit()
+    yield dm, discussion, ids
+    dm.engine.dispose()
+
+
+def test_pages_walk_back_from_the_tip(discussion):
+    dm, disc, ids = discussion
+
+    tip, messages, _, has_more = load_branch_page(dm, disc.id, None, limit=2)
+    assert tip == ids[-1]
+    assert [m.id for m in messages] == ids[3:]
+    assert has_more
+
+    _, messages, _, has_more = load_branch_page(dm, disc.id, tip, before=messages[0].id, limit=2)
+    assert [m.id for m in messages] == ids[1:3]
+    assert has_more
+
+    _, messages, _, has_more = load_branch_page(dm, disc.id, tip, before=messages[0].id, limit=2)
+    assert [m.id for m in messages] == ids[:1]
+    assert not has_more
+
+
+def test_full_page_matches_lollms_branch(discussion):
+    dm, disc, ids = discussion
+    _, messages, _, has_more = load_branch_page(dm, disc.id, None, limit=100)
+    assert [m.id for m in messages] == [m.id for m in disc.get_branch(ids[-1])]
+    assert [m.content for m in messages] == ["0", "1", "2", "3", "4"]
+    assert not has_more
+
+
+def test_branch_points_are_reported(discussion):
+    dm, disc, ids = discussion
+    alternative = disc.add_message(sender="ai", sender_type="assistant", content="alt", parent_id=ids[0]).id
+    disc.commit()
+
+    _, messages, children, _ = load_branch_page(dm, disc.id, ids[-1], limit=100)
+    assert [m.id for m in messages] == ids
+    assert children[ids[0]] == [ids[1], alternative]
+
+    _, messages, _, _ = load_branch_page(dm, disc.id, alternative, limit=100)
+    assert [m.id for m in messages] == [ids[0], alternative]
+
+
+def test_unknown_tip_falls_back_to_latest_message(discussion):
+    dm, disc, ids = discussion
+    tip, messages, _, _ = load_branch_page(dm, disc.id, "missing", limit=100)
+    assert tip == ids[-1]
+    assert messages[-1].id == ids[-1]
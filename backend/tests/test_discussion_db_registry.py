@@ -0,0 +1,59 @@
+# backend/tests/test_discussion_db_registry.py
+"""
+Tests for the per-user discussion database registry: reuse, LRU eviction and
+idle expiry of the pooled LollmsDataManager instances.
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+
+from backend import discussion_manager
+from backend.discussion_manager import DiscussionDbRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch, settings_stub):
+    settings_stub(discussion_manager, {"discussion_db_pool_max_entries": 2, "discussion_db_pool_idle_timeout": 600})
+    monkeypatch.setattr(DiscussionDbRegistry, "_build_manager", staticmethod(lambda username: MagicMock(name=username)))
+    return DiscussionDbRegistry()
+
+
+def test_managers_are_reused(registry):
+    first = registry.get("alice")
+    assert registry.get("alice") is first
+    assert (registry.hits, registry.misses) == (1, 1)
+
+
+def test_least_recently_used_manager_is_evicted(registry):
+    alice, bob = registry.get("alice"), registry.get("bob")
+    registry.get("alice")
+    registry.get("carol")
+    assert registry.evictions == 1
+    bob.engine.dispose.assert_called_once()
+    alice.engine.dispose.assert_not_called()
+    assert [entry["username"] for entry in registry.stats()["entries"]] == ["carol", "alice"]
+
+
+def test_idle_managers_are_closed(registry, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(discussion_manager, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    alice = registry.get("alice")
+    clock[0] += 601
+    registry.close_idle()
+    alice.engine.dispose.assert_called_once()
+    assert registry.expirations == 1
+    assert registry.get("alice") is not alice
+
+
+def test_invalidate_closes_the_manager(registry):
+    alice = registry.get("alice")
+    registry.invalidate("alice")
+    alice.engine.dispose.assert_called_once()
+    assert registry.stats()["size"] == 0
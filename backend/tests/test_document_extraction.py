@@ -0,0 +1,108 @@
+# backend/tests/test_document_extraction.py
+"""
+Regression tests for document extraction: the /v1/extract_text endpoint and the
+extraction process pool's per-job timeouts.
+"""
+import base64
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import document_extraction
+from backend.document_extraction import _ExtractionPool, _JobTimeout
+from backend.routers.services.openai_v1 import openai_v1_router, get_user_from_api_key
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(openai_v1_router)
+    app.dependency_overrides[get_user_from_api_key] = lambda: MagicMock(username="tester")
+    return TestClient(app)
+
+
+def test_extract_text_endpoint_returns_file_text(client):
+    """The endpoint must call the extraction helper, not itself."""
+    payload = {"file": base64.b64encode(b"hello world").decode("ascii"), "filename": "notes.txt"}
+    response = client.post("/v1/extract_text", json=payload)
+    assert response.status_code == 200, response.text
+    assert "hello world" in response.json()["text"]
+
+
+def test_extract_text_endpoint_uses_extraction_pool(client, monkeypatch):
+    calls = []
+
+    def fake_pool(func, path, *args):
+        calls.append((func, Path(path).read_bytes(), args))
+        return "from the pool", []
+
+    monkeypatch.setattr(document_extraction, "run_in_extraction_pool", fake_pool)
+    payload = {"file": base64.b64encode(b"%PDF-1.4").decode("ascii"), "filename": "doc.pdf"}
+    response = client.post("/v1/extract_text", json=payload)
+    assert response.status_code == 200, response.text
+    assert response.json()["text"] == "from the pool"
+    assert calls and calls[0][1] == b"%PDF-1.4"
+    assert calls[0][2] == ("doc.pdf", False)
+
+
+@pytest.fixture
+def pool():
+    extraction_pool = _ExtractionPool(2)
+    yield extraction_pool
+    extraction_pool.shutdown()
+
+
+def _run_in_thread(pool, args, timeout, results, key):
+    def target():
+        try:
+            results[key] = pool.run(time.sleep, args, timeout)
+        except BaseException as e:
+            results[key] = e
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def test_timeout_only_kills_the_overrunning_job(pool):
+    results = {}
+    slow = _run_in_thread(pool, (30,), 1.0, results, "slow")
+    fast = _run_in_thread(pool, (1.5,), 10.0, results, "fast")
+    slow.join(60)
+    fast.join(60)
+    assert isinstance(results["slow"], _JobTimeout)
+    assert results["fast"] is None
+    # The pool replaces the killed worker and keeps serving jobs
+    assert pool.run(time.sleep, (0,), 30.0) is None
+
+
+def test_queue_wait_does_not_count_against_timeout():
+    single = _ExtractionPool(1)
+    try:
+        single.run(time.sleep, (0,), 60.0)  # warm the worker up
+        results = {}
+        first = _run_in_thread(single, (1.5,), 10.0, results, "first")
+        time.sleep(0.2)
+        # Waits ~1.3s for the only worker but runs well within its 1s budget
+        second = _run_in_thread(single, (0.1,), 1.0, results, "second")
+        first.join(60)
+        second.join(60)
+        assert results["first"] is None
+        assert results["second"] is None
+    finally:
+        single.shutdown()
+
+
+def test_job_exception_is_raised_and_worker_reused(pool):
+    with pytest.raises(ValueError):
+        pool.run(int, ("not a number",), 30.0)
+    assert pool.run(int, ("42",), 30.0) == 42
@@ -0,0 +1,103 @@
+# backend/tests/test_flow_engine_scheduler.py
+"""
+Tests for the Flow Studio engine: dependency-ordered parallel scheduling of
+graph nodes and the per-process cache of compiled node definitions.
+"""
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+
+from backend import flow_engine
+from backend.flow_engine import FlowEngine, _compile_node_definition
+
+
+def _node(node_id, node_type="step"):
+    return {"id": node_id, "type": node_type}
+
+
+def _edge(source, target, source_handle="out", target_handle="in"):
+    return {"source": source, "target": target, "sourceHandle": source_handle, "targetHandle": target_handle}
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = None
+    monkeypatch.setattr(flow_engine.db_session_module, "SessionLocal", lambda: db)
+    flow = FlowEngine("tester")
+    monkeypatch.setattr(flow, "_load_definitions", lambda node_types: list(node_types))
+    return flow
+
+
+def test_independent_branches_run_concurrently(engine):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def execute(node, inputs):
+        if node["id"] in ("left", "right"):
+            # Both branches must be running at once for the barrier to open
+            barrier.wait()
+            return {"out": f"{node['id']}:{inputs['in']}"}
+        if node["id"] == "join":
+            return {"out": sorted(inputs.values())}
+        return {"out": "start"}
+
+    engine._execute_node = execute
+    graph = {
+        "nodes": [_node("start"), _node("left"), _node("right"), _node("join")],
+        "edges": [
+            _edge("start", "left"), _edge("start", "right"),
+            _edge("left", "join", target_handle="a"), _edge("right", "join", target_handle="b"),
+        ],
+    }
+    results = engine.execute_graph(graph)
+    assert results["join"] == {"out": ["left:start", "right:start"]}
+
+
+def test_failure_stops_dependent_nodes(engine):
+    executed = []
+
+    def execute(node, inputs):
+        executed.append(node["id"])
+        if node["id"] == "broken":
+            raise ValueError("node failed")
+        return {"out": 1}
+
+    engine._execute_node = execute
+    graph = {"nodes": [_node("broken"), _node("after")], "edges": [_edge("broken", "after")]}
+    with pytest.raises(ValueError, match="node failed"):
+        engine.execute_graph(graph)
+    assert executed == ["broken"]
+
+
+def test_cycle_reports_stalled_nodes(engine):
+    engine._execute_node = lambda node, inputs: {"out": node["id"]}
+    graph = {
+        "nodes": [_node("root"), _node("a"), _node("b")],
+        "edges": [_edge("root", "a"), _edge("a", "b"), _edge("b", "a")],
+    }
+    with pytest.raises(RuntimeError, match="Workflow stalled") as excinfo:
+        engine.execute_graph(graph)
+    assert "'a'" in str(excinfo.value) and "'b'" in str(excinfo.value)
+    assert "root" in engine.results
+
+
+def test_compiled_definitions_are_cached_until_the_code_changes():
+    code = "class CustomNode:\n    def execute(self, inputs, context):\n        return {}\n"
+    node_def = SimpleNamespace(id="def-cache-test", name="cache_test", class_name="CustomNode", code=code)
+
+    first = _compile_node_definition(node_def)
+    assert first[0] is True
+    assert _compile_node_definition(node_def) is first
+
+    node_def.code = code.replace("{}", "{'x': 1}")
+    edited = _compile_node_definition(node_def)
+    assert edited is not first
+    assert edited[2] is not first[2]
@@ -0,0 +1,133 @@
+# backend/tests/test_image_blob_access.py
+"""
+Regression tests for image blob access control: blobs are readable only by their
+owner and by users the owner shared a discussion with, and blob URLs sent back by
+clients only resolve from the discussion owner's store.
+"""
+import asyncio
+import base64
+import hashlib
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import backend.db.models  # noqa: F401 - registers the tables on Base
+import backend.db.models.skill  # noqa: F401 - User.skills needs it to configure the mappers
+from backend.db import get_db
+from backend.db.base import Base
+from backend.db.models.user import User as DBUser
+from backend.db.models.discussion import SharedDiscussionLink as DBSharedDiscussionLink
+from backend.image_blob_store import ImageBlobStore, image_blob_store
+from backend.routers.files import files_router
+from backend.session import get_current_active_user
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    alice = DBUser(username="alice", hashed_password="x")
+    bob = DBUser(username="bob", hashed_password="x")
+    mallory = DBUser(username="mallory", hashed_password="x")
+    session.add_all([alice, bob, mallory])
+    session.commit()
+    session.add(DBSharedDiscussionLink(
+        discussion_id="d1", discussion_title="Shared", owner_user_id=alice.id,
+        shared_with_user_id=bob.id, permission_level="view"
+    ))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def blobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(ImageBlobStore, "root", staticmethod(lambda owner: tmp_path / owner / "image_blobs"))
+    image_blob_store._known.clear()
+    yield image_blob_store
+    image_blob_store._known.clear()
+
+
+def _client(db, username):
+    app = FastAPI()
+    app.include_router(files_router)
+    user = db.query(DBUser).filter(DBUser.username == username).one()
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=user.id, username=user.username)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_owner_can_read_blob(db, blobs):
+    digest = blobs.put_bytes("alice", PNG_BYTES)
+    response = _client(db, "alice").get(f"/api/files/image-blobs/alice/{digest}")
+    assert response.status_code == 200
+    assert response.content == PNG_BYTES
+
+
+def test_shared_user_can_read_blob(db, blobs):
+    digest = blobs.put_bytes("alice", PNG_BYTES)
+    response = _client(db, "bob").get(f"/api/files/image-blobs/alice/{digest}")
+    assert response.status_code == 200
+
+
+def test_other_user_cannot_read_blob(db, blobs):
+    digest = blobs.put_bytes("alice", PNG_BYTES)
+    client = _client(db, "mallory")
+    response = client.get(f"/api/files/image-blobs/alice/{digest}")
+    assert response.status_code == 404
+    # A matching ETag must not bypass the check either
+    response = client.get(f"/api/files/image-blobs/alice/{digest}", headers={"If-None-Match": f'"{digest}"'})
+    assert response.status_code == 404
+
+
+def test_share_does_not_grant_reverse_access(db, blobs):
+    digest = blobs.put_bytes("bob", PNG_BYTES)
+    response = _client(db, "alice").get(f"/api/files/image-blobs/bob/{digest}")
+    assert response.status_code == 404
+
+
+def test_resolve_to_b64_only_reads_owner_blobs(blobs):
+    digest = blobs.put_bytes("alice", PNG_BYTES)
+    url = blobs.url_for("alice", digest)
+    assert blobs.resolve_to_b64(url, "alice") == base64.b64encode(PNG_BYTES).decode("ascii")
+    assert blobs.resolve_to_b64(url, "mallory") is None
+    assert blobs.resolve_to_b64(blobs.url_for("alice", "0" * 64), "alice") is None
+    assert blobs.resolve_to_b64("data:image/png;base64,QUJD", "mallory") == "QUJD"
+
+
+def test_image_refs_hash_each_message_image_once(blobs, monkeypatch):
+    b64 = base64.b64encode(PNG_BYTES).decode("ascii")
+    calls = []
+    original_put_b64 = ImageBlobStore.put_b64
+    monkeypatch.setattr(ImageBlobStore, "put_b64", lambda self, owner, value: calls.append(value) or original_put_b64(self, owner, value))
+
+    first = blobs.image_refs("alice", [{"image": b64, "active": True}], "m1")
+    second = blobs.image_refs("alice", [{"image": b64, "active": False}], "m1")
+    assert first == second == [blobs.url_for("alice", hashlib.sha256(PNG_BYTES).hexdigest())]
+    assert len(calls) == 1
+
+    # An edited image at the same slot is hashed again
+    edited = base64.b64encode(PNG_BYTES + b"\x01").decode("ascii")
+    assert blobs.image_refs("alice", [edited], "m1") != first
+    assert len(calls) == 2
+
+
+def test_image_refs_async_matches_sync(blobs):
+    b64 = base64.b64encode(PNG_BYTES).decode("ascii")
+    refs = asyncio.run(blobs.image_refs_async("alice", [b64], "m2"))
+    assert refs == blobs.image_refs("alice", [b64], "m2")
+    assert blobs._refs_cached("alice", [b64], "m2")
@@ -0,0 +1,85 @@
+# backend/tests/test_image_thumbnails.py
+"""
+Tests for Image Studio thumbnails: size buckets, single-flight rendering and
+revalidation of the thumbnail endpoint.
+"""
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.db import get_db
+from backend.image_thumbnails import ThumbnailService, thumbnail_service
+from backend.routers import image_studio
+from backend.routers.image_studio import image_studio_router
+from backend.session import get_current_active_user
+
+
+@pytest.mark.parametrize("size, edge", [(16, 128), (128, 128), (129, 256), (384, 384), (500, 768), (4096, 768)])
+def test_sizes_round_up_to_a_bucket(size, edge):
+    assert ThumbnailService.bucket(size) == edge
+
+
+def test_concurrent_requests_share_one_render(tmp_path, monkeypatch):
+    service = ThumbnailService()
+    release = threading.Event()
+    renders = []
+
+    def slow_render(source, edge):
+        renders.append((source, edge))
+        release.wait(5)
+        return service.thumb_path(source, edge)
+
+    monkeypatch.setattr(service, "_render", slow_render)
+    source = tmp_path / "image.png"
+    first = service._submit(source, 256)
+    second = service._submit(source, 256)
+    other_size = service._submit(source, 128)
+    assert first is second and other_size is not first
+
+    release.set()
+    assert first.result(5) == service.thumb_path(source, 256)
+    other_size.result(5)
+    assert sorted(renders) == [(source, 128), (source, 256)]
+    # Finished renders are forgotten, so a stale thumbnail can be rendered again later
+    assert service._pending == {}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    Image.new("RGB", (600, 400), "red").save(tmp_path / "photo.png")
+    monkeypatch.setattr(image_studio, "get_user_images_path", lambda username: tmp_path)
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = None
+    app = FastAPI()
+    app.include_router(image_studio_router)
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=1, username="alice")
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_thumbnail_revalidation_returns_304_without_rendering(client, monkeypatch):
+    response = client.get("/api/image-studio/photo.png/thumbnail", params={"size": 200})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    etag = response.headers["etag"]
+    # The bucket edge (256) is part of the validator, so each size is its own representation
+    assert etag.endswith('-256"')
+
+    async def no_render(source, size):
+        pytest.fail("thumbnail rendered for a matching If-None-Match")
+
+    monkeypatch.setattr(thumbnail_service, "get", no_render)
+    response = client.get("/api/image-studio/photo.png/thumbnail", params={"size": 200}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
@@ -0,0 +1,74 @@
+# backend/tests/test_rate_limiter.py
+"""
+Tests for the sliding-window rate limiter used by the service endpoints.
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+
+from backend import rate_limiter as rate_limiter_module
+from backend.rate_limiter import SlidingWindowRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch, settings_stub):
+    # Start of a 60 s window
+    fake = FakeClock(60 * 16_666.0)
+    monkeypatch.setattr(rate_limiter_module, "time", fake)
+    # Never publish to the Communication Hub from these tests
+    settings_stub(rate_limiter_module, {"rate_limit_sync_interval_seconds": 1e12})
+    return fake
+
+
+def test_limit_applies_within_a_window(clock):
+    limiter = SlidingWindowRateLimiter()
+    key = limiter.make_key("api-key", "openai")
+    assert [limiter.allow(key, 3, 60) for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow(limiter.make_key("other-key", "openai"), 3, 60)
+
+
+def test_previous_window_is_weighted_by_overlap(clock):
+    limiter = SlidingWindowRateLimiter()
+    key = limiter.make_key("api-key", "openai")
+    for _ in range(10):
+        assert limiter.allow(key, 10, 60)
+    # Halfway through the next window, half of the previous 10 requests still count
+    clock.now += 60 + 30
+    assert [limiter.allow(key, 10, 60) for _ in range(6)] == [True] * 5 + [False]
+    # Two windows later the old requests no longer count at all
+    clock.now += 120
+    assert limiter.allow(key, 1, 60)
+
+
+def test_remote_counts_share_the_limit(clock):
+    limiter = SlidingWindowRateLimiter()
+    key = limiter.make_key("api-key", "openai")
+    window_index = int(clock.now // 60)
+    limiter.apply_remote({"windows": {str(window_index): {key: 2}}})
+    assert [limiter.allow(key, 3, 60) for _ in range(2)] == [True, False]
+
+
+def test_idle_keys_are_swept(clock):
+    limiter = SlidingWindowRateLimiter(shard_count=1)
+    limiter.allow(limiter.make_key("idle", "openai"), 5, 60)
+    clock.now += 180
+    limiter.allow(limiter.make_key("active", "openai"), 5, 60)
+    assert limiter.stats()["tracked_keys"] == 1
+
+
+def test_identifiers_are_hashed():
+    key = SlidingWindowRateLimiter.make_key("sk-secret", "openai")
+    assert key.startswith("openai:") and "sk-secret" not in key
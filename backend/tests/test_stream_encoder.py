@@ -0,0 +1,84 @@
+# backend/tests/test_stream_encoder.py
+"""
+Tests for the /chat NDJSON stream encoder: coalescing of text fragments,
+ordering around control events and the flush timer.
+"""
+import json
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.generation import stream_encoder
+from backend.generation.stream_encoder import NDJSONStreamEncoder
+
+
+class FakeLoop:
+    """Runs thread-safe callbacks inline and keeps call_later timers for the test to fire."""
+    def __init__(self):
+        self.timers = []
+
+    def call_soon_threadsafe(self, callback, *args):
+        callback(*args)
+
+    def call_later(self, delay, callback):
+        self.timers.append((delay, callback))
+
+
+class FakeQueue(list):
+    def put_nowait(self, item):
+        self.append(item)
+
+
+def _encoder(settings_stub, flush_ms=30, flush_bytes=2048):
+    settings_stub(stream_encoder, {"chat_stream_flush_ms": flush_ms, "chat_stream_flush_bytes": flush_bytes})
+    loop, queue = FakeLoop(), FakeQueue()
+    return NDJSONStreamEncoder(loop, queue), loop, queue
+
+
+def _lines(queue):
+    return [json.loads(line) for line in queue]
+
+
+def test_fragments_are_merged_until_the_timer_fires(settings_stub):
+    encoder, loop, queue = _encoder(settings_stub)
+    for token in ("Hel", "lo", " world"):
+        encoder.emit_text("chunk", token)
+    assert queue == []
+    assert len(loop.timers) == 1
+
+    loop.timers[0][1]()
+    assert _lines(queue) == [{"type": "chunk", "content": "Hello world"}]
+    assert encoder.fragments_in == 3 and encoder.lines_sent == 1
+
+
+def test_byte_threshold_flushes_immediately(settings_stub):
+    encoder, _, queue = _encoder(settings_stub, flush_bytes=4)
+    encoder.emit_text("chunk", "ab")
+    encoder.emit_text("chunk", "cd")
+    assert _lines(queue) == [{"type": "chunk", "content": "abcd"}]
+
+
+def test_control_events_keep_their_order(settings_stub):
+    encoder, _, queue = _encoder(settings_stub)
+    encoder.emit_text("thought", "thinking")
+    encoder.emit_text("chunk", "answer")
+    encoder.emit({"type": "step_start", "content": "tool"})
+    encoder.emit_text("chunk", " more")
+    encoder.flush()
+    assert _lines(queue) == [
+        {"type": "thought", "content": "thinking"},
+        {"type": "chunk", "content": "answer"},
+        {"type": "step_start", "content": "tool"},
+        {"type": "chunk", "content": " more"},
+    ]
+
+
+def test_zero_window_sends_every_fragment(settings_stub):
+    encoder, loop, queue = _encoder(settings_stub, flush_ms=0)
+    encoder.emit_text("chunk", "a")
+    encoder.emit_text("chunk", "b")
+    assert _lines(queue) == [{"type": "chunk", "content": "a"}, {"type": "chunk", "content": "b"}]
+    assert loop.timers == []
@@ -0,0 +1,176 @@
+# backend/tests/test_zoo_cache_index.py
+"""
+Tests for the SQLite zoo index: incremental repository sync, FTS search,
+filtering and paging, and hashed icon storage.
+"""
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pytest
+import yaml
+
+from backend import zoo_cache
+
+ICON_BYTES = b"\x89PNG\r\n\x1a\n-icon"
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(zoo_cache, "CACHE_INDEX_FILE", tmp_path / "zoo_index.db")
+    monkeypatch.setattr(zoo_cache, "CACHE_LOCK_DIR", tmp_path / "locks")
+    monkeypatch.setattr(zoo_cache, "_schema_ready", False)
+    monkeypatch.setattr(zoo_cache, "_fts_enabled", False)
+    # The index is filled by the tests, never by scanning the configured repositories
+    monkeypatch.setattr(zoo_cache, "_index_built", True)
+    return zoo_cache
+
+
+def _write_item(repo: Path, folder: str, icon: bool = False, **metadata):
+    item_dir = repo / folder
+    item_dir.mkdir(parents=True, exist_ok=True)
+    (item_dir / "description.yaml").write_text(yaml.safe_dump(metadata), encoding="utf-8")
+    if icon:
+        (item_dir / "icon.png").write_bytes(ICON_BYTES)
+    return item_dir
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo_path = tmp_path / "prompts_repo"
+    _write_item(repo_path, "writer", icon=True, name="Story Writer", category="Writing", author="ana",
+                description="Writes short stories", tags=["fiction", "creative"])
+    _write_item(repo_path, "coder", icon=True, name="Code Reviewer", category="Coding", author="bo",
+                description="Reviews pull requests")
+    _write_item(repo_path, "nested/translator", name="Translator", category="Writing", author="cy",
+                description="Translates documents")
+    (repo_path / ".git").mkdir()
+    return repo_path
+
+
+def test_fts_query_prefix_matches_every_word():
+    assert zoo_cache._fts_query("story writ") == '"story"* "writ"*'
+    assert zoo_cache._fts_query('c++ "quoted"') == '"c"* "quoted"*'
+    assert zoo_cache._fts_query("  !! ") is None
+
+
+def test_sync_indexes_nested_items_and_dedups_icons(index, repo):
+    stats = index._sync_repository("prompt", "main", repo)
+    assert stats["added"] == 3
+
+    items, total = index.query_items("prompt", sort_by="name")
+    assert total == 3
+    assert [item["name"] for item in items] == ["Code Reviewer", "Story Writer", "Translator"]
+    assert {item["folder_name"] for item in items} == {"writer", "coder", "nested/translator"}
+
+    icon_urls = {item["icon"] for item in items if item["icon"]}
+    assert len(icon_urls) == 1
+    icon_hash = icon_urls.pop().rsplit("/", 1)[1]
+    assert index.get_icon(icon_hash) == ICON_BYTES
+    assert index.get_icon("not-a-hash") is None
+
+
+def test_query_items_filters_searches_and_pages(index, repo):
+    index._sync_repository("prompt", "main", repo)
+
+    items, total = index.query_items("prompt", category="Writing", sort_by="name", sort_order="desc")
+    assert total == 2
+    assert [item["name"] for item in items] == ["Translator", "Story Writer"]
+
+    items, total = index.query_items("prompt", search_query="fict")
+    assert total == 1 and items[0]["name"] == "Story Writer"
+    items, _ = index.query_items("prompt", search_query="reviews pull")
+    assert [item["name"] for item in items] == ["Code Reviewer"]
+
+    items, total = index.query_items("prompt", page=2, page_size=2, sort_by="name")
+    assert total == 3 and [item["name"] for item in items] == ["Translator"]
+
+    items, total = index.query_items("prompt", include_names=["story writer"], case_insensitive_names=True)
+    assert total == 1 and items[0]["name"] == "Story Writer"
+    assert index.query_items("prompt", include_names=[]) == ([], 0)
+    _, total = index.query_items("prompt", exclude_names=["Translator"])
+    assert total == 2
+
+    assert index.get_all_categories("prompt") == ["All", "Coding", "Writing"]
+
+
+def test_resync_only_reparses_changed_folders(index, repo, monkeypatch):
+    index._sync_repository("prompt", "main", repo, trust_git_head=False)
+
+    description = repo / "writer" / "description.yaml"
+    description.write_text(yaml.safe_dump({"name": "Poem Writer", "category": "Writing"}), encoding="utf-8")
+    stat = description.stat()
+    os.utime(description, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    (repo / "coder" / "description.yaml").unlink()
+    (repo / "coder" / "icon.png").unlink()
+    (repo / "coder").rmdir()
+
+    parsed = []
+    original_parse_item = zoo_cache._parse_item
+    monkeypatch.setattr(zoo_cache, "_parse_item", lambda folder, *args: parsed.append(folder.name) or original_parse_item(folder, *args))
+
+    stats = index._sync_repository("prompt", "main", repo, trust_git_head=False)
+    assert stats == {"added": 0, "changed": 1, "removed": 1, "unchanged": 1, "skipped": 0}
+    assert parsed == ["writer"]
+
+    items, total = index.query_items("prompt", sort_by="name")
+    assert [item["name"] for item in items] == ["Poem Writer", "Translator"]
+    assert index.query_items("prompt", search_query="story")[1] == 0
+    # The writer icon is still used, so it survives the pruning of the removed item
+    assert items[0]["icon"] is not None
+
+
+def _checkout(repo: Path, head: str = "a" * 40):
+    (repo / ".git" / "HEAD").write_text("ref: refs/heads/main\n", encoding="utf-8")
+    (repo / ".git" / "refs" / "heads").mkdir(parents=True)
+    (repo / ".git" / "refs" / "heads" / "main").write_text(head + "\n", encoding="utf-8")
+
+
+def _registered_repo(monkeypatch, repo_type: str, repo_path: Path):
+    """Makes refresh_repo_cache find one registered repository of the given type."""
+    db = MagicMock()
+    db.query.return_value.filter_by.return_value.first.return_value = SimpleNamespace(name="main", type=repo_type, url=str(repo_path))
+    monkeypatch.setattr(zoo_cache, "get_db", lambda: iter([db]))
+    monkeypatch.setattr(zoo_cache, "_repo_path", lambda repo, item_type: repo_path)
+
+
+def test_unchanged_git_head_skips_the_walk(index, repo, monkeypatch):
+    _checkout(repo)
+    assert index._git_head(repo) == "a" * 40
+
+    index._sync_repository("prompt", "main", repo)
+    _write_item(repo, "late", name="Late Item")
+    monkeypatch.setattr(zoo_cache, "_item_folders", lambda *args: pytest.fail("repository walked despite same HEAD"))
+    stats = index._sync_repository("prompt", "main", repo)
+    assert stats["skipped"] == 3
+    assert index.query_items("prompt")[1] == 3
+
+
+def test_local_git_checkout_rescan_sees_uncommitted_edits(index, repo, monkeypatch):
+    _checkout(repo)
+    _registered_repo(monkeypatch, "local", repo)
+    index.refresh_repo_cache("main", "prompt")
+
+    description = repo / "coder" / "description.yaml"
+    description.write_text(yaml.safe_dump({"name": "Code Reviewer", "description": "Edited, not committed"}), encoding="utf-8")
+    stat = description.stat()
+    os.utime(description, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    index.refresh_repo_cache("main", "prompt")
+
+    items, _ = index.query_items("prompt", include_names=["Code Reviewer"])
+    assert items[0]["description"] == "Edited, not committed"
+
+
+def test_git_repo_refresh_trusts_an_unchanged_head(index, repo, monkeypatch):
+    _checkout(repo)
+    _registered_repo(monkeypatch, "git", repo)
+    index.refresh_repo_cache("main", "prompt")
+    monkeypatch.setattr(zoo_cache, "_item_folders", lambda *args: pytest.fail("repository walked despite same HEAD"))
+    index.refresh_repo_cache("main", "prompt")
+    assert index.query_items("prompt")[1] == 3
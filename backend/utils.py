@@ -2,12 +2,15 @@
 import socket
 from contextlib import closing
 import psutil
-import time
 import json
+import datetime
 from typing import Dict, List, Optional, Any
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from backend.settings import settings
 from backend.db.models.config import GlobalConfig
+from backend.db.models.generation_stats import GenerationDailyStat
+from backend.rate_limiter import rate_limiter
 
 # Global in-memory tracking for service usage
 # Format: { service_name: { "total_hits": int, "users": { user_id: int } } }
@@ -17,8 +20,6 @@ service_usage_stats: Dict[str, Dict] = {
     "lollms": {"total_hits": 0, "users": {}}
 }
 
-# Rate limiting tracking: { (identifier, service): [timestamps] }
-rate_limit_store: Dict[tuple, list] = {}
 
 def track_service_usage(service: str, user_id: int):
     if service not in service_usage_stats:
@@ -28,32 +29,55 @@ def track_service_usage(service: str, user_id: int):
     stats["total_hits"] += 1
     stats["users"][user_id] = stats["users"].get(user_id, 0) + 1
 
+def record_generation_stat(db: Session, user_id: int, binding_name: Optional[str], model_name: Optional[str], day: Optional[datetime.date] = None, increment: int = 1):
+    """
+    Increments the per-day generation rollup for a user/binding/model.
+    Called once per finalized assistant message; failures never break the chat turn.
+    """
+    day = day or datetime.datetime.now(datetime.timezone.utc).date()
+    binding_name = binding_name or ""
+    model_name = model_name or ""
+    filters = (
+        GenerationDailyStat.day == day,
+        GenerationDailyStat.user_id == user_id,
+        GenerationDailyStat.binding_name == binding_name,
+        GenerationDailyStat.model_name == model_name,
+    )
+    try:
+        updated = db.query(GenerationDailyStat).filter(*filters).update(
+            {GenerationDailyStat.count: GenerationDailyStat.count + increment}, synchronize_session=False
+        )
+        if not updated:
+            db.add(GenerationDailyStat(day=day, user_id=user_id, binding_name=binding_name, model_name=model_name, count=increment))
+        db.commit()
+    except IntegrityError:
+        # Another worker inserted the row for this key in the meantime
+        db.rollback()
+        try:
+            db.query(GenerationDailyStat).filter(*filters).update(
+                {GenerationDailyStat.count: GenerationDailyStat.count + increment}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"WARNING: Could not record generation stat for user {user_id}: {e}")
+    except Exception as e:
+        db.rollback()
+        print(f"WARNING: Could not record generation stat for user {user_id}: {e}")
+
 def check_rate_limit(identifier: str, service: str) -> bool:
     """
     Checks if the given identifier (API Key or IP) has exceeded 
     the rate limit configured in settings.
+    The limit is shared by all workers (see backend.rate_limiter).
     """
     if not settings.get("rate_limit_enabled", False):
         return True
         
-    max_reqs = settings.get("rate_limit_max_requests", 60)
-    window = settings.get("rate_limit_window_seconds", 60)
+    max_reqs = int(settings.get("rate_limit_max_requests", 60))
+    window = max(1.0, float(settings.get("rate_limit_window_seconds", 60)))
     
-    now = time.time()
-    key = (identifier, service)
-    
-    if key not in rate_limit_store:
-        rate_limit_store[key] = [now]
-        return True
-        
-    # Clean up old timestamps
-    rate_limit_store[key] = [t for t in rate_limit_store[key] if now - t < window]
-    
-    if len(rate_limit_store[key]) >= max_reqs:
-        return False
-        
-    rate_limit_store[key].append(now)
-    return True
+    return rate_limiter.allow(rate_limiter.make_key(identifier, service), max_reqs, window)
 
 def get_local_ip_addresses():
     """Gets all local IPv4 addresses of the machine, including localhost."""
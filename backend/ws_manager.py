@@ -6,18 +6,131 @@ import datetime
 import random
 import struct
 import threading
-from typing import Dict, List, Set, Optional, Any
+import time
+from collections import deque
+from typing import Dict, List, Set, Optional, Any, Callable
 from fastapi import WebSocket
 from ascii_colors import trace_exception, ASCIIColors
 from .db import session as db_session_module
-from .db.models.broadcast import BroadcastMessage
 from .db.models.connections import WebSocketConnection
 from .db.models.user import User as DBUser, Friendship as DBFriendship
 from .db.base import FriendshipStatus
 from .session import user_sessions
 from .settings import settings
+from .broadcast_journal import broadcast_journal
 from backend.config import SERVER_CONFIG
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Browsers start failing above this frame size during high-frequency updates
+MAX_WS_FRAME_BYTES = 1024 * 1024
+
+def encode_ws_frame(message_data: Any) -> str:
+    """
+    Serializes a WebSocket payload once; the resulting text is reused for every
+    recipient and for the Hub packet. Uses orjson when installed.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(message_data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except (TypeError, orjson.JSONEncodeError):
+            pass
+    return json.dumps(message_data)
+
+# Message types that carry a full state snapshot: a newer one replaces a queued one with
+# the same key, and they may be dropped when a socket's queue is full
+COALESCIBLE_MESSAGE_TYPES = {"task_update"}
+
+def coalesce_key(message_data: Any) -> Optional[tuple]:
+    if isinstance(message_data, dict) and message_data.get("type") in COALESCIBLE_MESSAGE_TYPES:
+        inner = message_data.get("data")
+        if isinstance(inner, dict) and inner.get("id") is not None:
+            return (message_data["type"], inner["id"])
+    return None
+
+class SlowConsumerError(Exception):
+    pass
+
+class OutboundQueue:
+    """
+    Bounded send queue drained by a dedicated writer task, one per WebSocket, so a
+    slow browser only delays its own messages. Frames with a coalesce key replace the
+    queued frame with the same key; when the queue is full they are dropped, while any
+    other frame (or a queue lagging more than `ws_max_send_lag_seconds`) marks the
+    socket as a slow consumer.
+    """
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.max_size = max(1, int(settings.get("ws_send_queue_size", 256)))
+        self.max_lag = float(settings.get("ws_max_send_lag_seconds", 30))
+        self._items: deque = deque()   # [key, frame, enqueued_at]
+        self._keyed: Dict[tuple, list] = {}
+        self._wakeup = asyncio.Event()
+        self.writer_task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def lag_seconds(self) -> float:
+        return time.monotonic() - self._items[0][2] if self._items else 0.0
+
+    def put(self, frame: str, key: Optional[tuple] = None):
+        """Queues a frame; raises SlowConsumerError if the socket cannot keep up."""
+        if key is not None and key in self._keyed:
+            self._keyed[key][1] = frame
+            self.coalesced += 1
+            return
+        if self._items and self.max_lag > 0 and self.lag_seconds() > self.max_lag:
+            raise SlowConsumerError(f"send lag {self.lag_seconds():.1f}s")
+        if len(self._items) >= self.max_size:
+            if key is not None:
+                self.dropped += 1
+                return
+            raise SlowConsumerError(f"send queue full ({self.max_size} frames)")
+        item = [key, frame, time.monotonic()]
+        self._items.append(item)
+        if key is not None:
+            self._keyed[key] = item
+        self._wakeup.set()
+
+    async def run(self, on_failure: Callable[[WebSocket], None]):
+        try:
+            while True:
+                if not self._items:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                item = self._items.popleft()
+                if item[0] is not None and self._keyed.get(item[0]) is item:
+                    del self._keyed[item[0]]
+                if self.max_lag > 0:
+                    await asyncio.wait_for(self.websocket.send_text(item[1]), timeout=self.max_lag)
+                else:
+                    await self.websocket.send_text(item[1])
+                self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            on_failure(self.websocket)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "session_id": getattr(self.websocket, "session_id", None),
+            "queue_depth": self.depth,
+            "queue_capacity": self.max_size,
+            "lag_seconds": round(self.lag_seconds(), 3),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[int, Dict[str, WebSocket]] = {} # {user_id: {session_id: websocket}}
@@ -29,6 +142,7 @@ class ConnectionManager:
         # Hub Client State
         self.hub_writer: Optional[asyncio.StreamWriter] = None
         self.is_hub_connected = False
+        self._hub_requests: Dict[str, asyncio.Future] = {}
         
         # Cache server config workers count for quick access
         self.workers_count = SERVER_CONFIG.get("workers", 1)
@@ -55,8 +169,13 @@ class ConnectionManager:
         
         if user_id not in self.active_connections:
             self.active_connections[user_id] = {}
+            self._publish_presence("add", user_id)
         self.active_connections[user_id][session_id] = websocket
 
+        outbound = OutboundQueue(websocket)
+        websocket.outbound = outbound
+        outbound.writer_task = asyncio.create_task(outbound.run(lambda ws: self._drop_connection(user_id, ws, "send failed")))
+
         db = None
         try:
             db = db_session_module.SessionLocal()
@@ -138,16 +257,42 @@ class ConnectionManager:
         except Exception as e:
             print(f"ERROR: Error in delayed cleanup for user {user_id}: {e}")
 
+    def _drop_connection(self, user_id: int, websocket: WebSocket, reason: str):
+        """Unregisters a socket that failed or fell behind and closes it."""
+        if getattr(websocket, "session_id", None) not in self.active_connections.get(user_id, {}):
+            return
+        ASCIIColors.warning(f"[WS] Dropping connection of user {user_id}: {reason}")
+        self.disconnect(user_id, websocket)
+
+        async def close():
+            try:
+                await websocket.close(code=1013, reason="Client too slow")
+            except Exception:
+                pass
+        asyncio.create_task(close())
+
+    def connection_stats(self) -> Dict[int, List[Dict[str, Any]]]:
+        """Outbound queue statistics of this worker's sockets, per user id."""
+        stats = {}
+        for user_id, sockets in list(self.active_connections.items()):
+            stats[user_id] = [ws.outbound.stats() for ws in list(sockets.values()) if getattr(ws, "outbound", None)]
+        return stats
+
     def disconnect(self, user_id: int, websocket: WebSocket):
         session_id = getattr(websocket, 'session_id', None)
         all_connections_closed = False
 
+        outbound = getattr(websocket, "outbound", None)
+        if outbound and outbound.writer_task and outbound.writer_task is not asyncio.current_task():
+            outbound.writer_task.cancel()
+
         if user_id in self.active_connections and session_id in self.active_connections[user_id]:
             del self.active_connections[user_id][session_id]
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
                 self.admin_user_ids.discard(user_id)
                 all_connections_closed = True
+                self._publish_presence("remove", user_id)
         
         if session_id:
             db = None
@@ -187,41 +332,104 @@ class ConnectionManager:
         self.broadcast_sync({"type": "internal_event", "event_type": "user_disconnect", "data": {"user_id": user_id}})
 
     def register_admin(self, user_id: int):
-        self.admin_user_ids.add(user_id)
+        if user_id not in self.admin_user_ids:
+            self.admin_user_ids.add(user_id)
+            self._publish_presence("admin_add", user_id)
 
     def unregister_admin(self, user_id: int):
-        self.admin_user_ids.discard(user_id)
+        if user_id in self.admin_user_ids:
+            self.admin_user_ids.discard(user_id)
+            self._publish_presence("admin_remove", user_id)
+
+    # --- Hub control messages (handled by the hub itself, never forwarded) ---
+
+    def _write_to_hub(self, payload: dict):
+        writer = self.hub_writer
+        if not writer or not self._loop:
+            return
+        encoded = encode_ws_frame(payload).encode('utf-8')
+        packet = struct.pack('!I', len(encoded)) + encoded
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            writer.write(packet)
+        else:
+            self._loop.call_soon_threadsafe(writer.write, packet)
+
+    def _publish_presence(self, op: str, user_id: int):
+        """Tells the hub which users this worker hosts so personal messages are routed here only."""
+        self._write_to_hub({"type": "hub_presence", "op": op, "user_id": user_id})
+
+    def publish_full_presence(self):
+        self._write_to_hub({
+            "type": "hub_presence", "op": "set", "pid": os.getpid(),
+            "user_ids": list(self.active_connections.keys()),
+            "admin_ids": list(self.admin_user_ids),
+        })
+
+    async def request_hub_stats(self, timeout: float = 2.0) -> Optional[dict]:
+        """Asks the hub for its routing counters; None when not connected or no reply."""
+        if not self.hub_writer:
+            return None
+        request_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self._hub_requests[request_id] = future
+        try:
+            self._write_to_hub({"type": "hub_stats_request", "request_id": request_id})
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._hub_requests.pop(request_id, None)
+
+    def _enqueue(self, user_id: int, websocket: WebSocket, frame: str, key: Optional[tuple]) -> bool:
+        """Queues a frame on a socket without waiting for the send; False if the socket was dropped."""
+        outbound = getattr(websocket, "outbound", None)
+        if outbound is None:
+            return True
+        try:
+            outbound.put(frame, key)
+            return True
+        except SlowConsumerError as e:
+            self._drop_connection(user_id, websocket, f"slow consumer, {e}")
+            return False
+
+    async def _send_direct(self, user_id: int, websocket: WebSocket, frame: str):
+        # Sockets registered outside connect() have no writer task
+        try:
+            await websocket.send_text(frame)
+        except Exception:
+            self.disconnect(user_id, websocket)
 
     async def send_personal_message(self, message_data: dict, user_id: int):
         if user_id in self.active_connections:
-            sockets_to_remove = set()
-            for websocket in list(self.active_connections[user_id].values()):
-                try:
-                    await websocket.send_json(message_data)
-                except Exception:
-                    sockets_to_remove.add(websocket)
-            for websocket in sockets_to_remove:
-                self.disconnect(user_id, websocket)
+            await self.send_personal_frame(encode_ws_frame(message_data), user_id, coalesce_key(message_data))
+
+    async def send_personal_frame(self, frame: str, user_id: int, key: Optional[tuple] = None):
+        """Queues an already-encoded payload on every socket of a user."""
+        for websocket in list(self.active_connections.get(user_id, {}).values()):
+            if getattr(websocket, "outbound", None) is None:
+                await self._send_direct(user_id, websocket, frame)
+            else:
+                self._enqueue(user_id, websocket, frame, key)
 
     async def broadcast(self, message_data: dict):
-        users_to_cleanup = {}
-        for user_id, sockets_dict in list(self.active_connections.items()):
-            for websocket in list(sockets_dict.values()):
-                try:
-                    await websocket.send_json(message_data)
-                except Exception:
-                    if user_id not in users_to_cleanup:
-                        users_to_cleanup[user_id] = set()
-                    users_to_cleanup[user_id].add(websocket)
-        for user_id, sockets_to_remove in users_to_cleanup.items():
-            for websocket in sockets_to_remove:
-                self.disconnect(user_id, websocket)
+        await self.broadcast_frame(encode_ws_frame(message_data), coalesce_key(message_data))
+
+    async def broadcast_frame(self, frame: str, key: Optional[tuple] = None):
+        for user_id in list(self.active_connections.keys()):
+            await self.send_personal_frame(frame, user_id, key)
 
     async def broadcast_to_admins(self, message_data: dict):
+        await self.broadcast_frame_to_admins(encode_ws_frame(message_data), coalesce_key(message_data))
+
+    async def broadcast_frame_to_admins(self, frame: str, key: Optional[tuple] = None):
         connected_admins = [uid for uid in self.admin_user_ids if uid in self.active_connections]
         if not connected_admins: return
         for user_id in connected_admins:
-            await self.send_personal_message(message_data, user_id)
+            await self.send_personal_frame(frame, user_id, key)
 
     async def _handle_broadcast_payload(self, payload: dict):
         """Processes incoming messages from the Com Hub push stream."""
@@ -229,30 +437,72 @@ class ConnectionManager:
         if payload.get("_pid") == os.getpid():
             return
 
+        # Replies from the hub itself
+        if payload.get("type") == "hub_stats":
+            future = self._hub_requests.get(payload.get("request_id"))
+            if future and not future.done():
+                future.set_result(payload.get("stats"))
+            return
+
         # Internal synchronization events
         if payload.get("type") == "internal_event":
             event_type = payload.get("event_type")
             data = payload.get("data", {})
             
             if event_type == "user_cache_invalidate":
+                from backend.session import auth_snapshot_cache, invalidate_client_resolutions
                 username = data.get("username")
                 if username in user_sessions:
                     user_sessions[username]['lollms_clients_cache'] = {}
+                if username:
+                    auth_snapshot_cache.invalidate(username)
+                    invalidate_client_resolutions(username)
 
             elif event_type == "global_model_cache_invalidate":
-                from backend.session import _global_client_registry, _registry_lock
+                from backend.session import _global_client_registry, _registry_lock, auth_snapshot_cache, invalidate_client_resolutions
+                from backend.binding_catalogue import binding_catalogue
                 with _registry_lock:
                     _global_client_registry.clear()
+                auth_snapshot_cache.clear()
+                binding_catalogue.invalidate()
+                invalidate_client_resolutions()
                 for username, session in user_sessions.items():
                     if 'lollms_clients_cache' in session:
                         session['lollms_clients_cache'] = {}
 
+            elif event_type == "safe_store_invalidate":
+                from backend.safe_store_registry import safe_store_registry
+                from backend.rag_query_cache import rag_query_cache
+                datastore_id = data.get("datastore_id")
+                if datastore_id:
+                    safe_store_registry.invalidate(datastore_id)
+                    rag_query_cache.invalidate(datastore_id)
+
+            elif event_type == "rag_query_cache_invalidate":
+                from backend.rag_query_cache import rag_query_cache
+                datastore_id = data.get("datastore_id")
+                if datastore_id:
+                    rag_query_cache.invalidate(datastore_id)
+
+            elif event_type == "api_key_cache_invalidate":
+                from backend.security import api_key_cache
+                api_key_cache.invalidate(user_id=data.get("user_id"), key_ids=data.get("key_ids"))
+
+            elif event_type == "rate_limit_sync":
+                from backend.rate_limiter import rate_limiter
+                rate_limiter.apply_remote(data)
+
             elif event_type == "user_disconnect":
                 user_id = data.get("user_id")
                 if user_id:
                     await self.disconnect_user(int(user_id))
             return
 
+        # TTI/TTS/STT binding changes made in another worker
+        if payload.get("type") == "bindings_updated":
+            from backend.binding_catalogue import binding_catalogue
+            binding_catalogue.invalidate()
+
         # Global settings refresh
         if payload.get("type") == "settings_updated":
             refresh_db = db_session_module.SessionLocal()
@@ -282,103 +532,93 @@ class ConnectionManager:
         if not self.is_ready or not isinstance(message_data, dict):
             return
 
-        # --- CRITICAL FRONTEND PROTECTION TEST ---
-        try:
-            # Prepare the JSON string to measure exact payload size
-            payload_json = json.dumps(message_data)
-            payload_size = len(payload_json)
-            
-            # 1MB Hard Limit. Chromium browsers crash when the heap is flooded 
-            # with large objects via WebSockets during high-frequency updates.
-            if payload_size > 1048576: 
-                msg_type = message_data.get("type", "unknown")
-
-                # EMERGENCY STRIP: If the payload is too big, try to strip images before dropping
-                if "data" in message_data and isinstance(message_data["data"], dict):
-                    # Look for common image keys and nullify them to save the text part
-                    for key in ["image_references", "images", "discussion_images"]:
-                        if key in message_data["data"]:
-                            message_data["data"][key] = []
-
-                    # Re-calculate size after stripping images
-                    new_payload_json = json.dumps(message_data)
-                    if len(new_payload_json) < 1048576:
-                        ASCIIColors.warning(f"✂️  STRIPPED IMAGES from [{msg_type}] to fit quota.")
-                        return self.broadcast_sync(message_data)
-
-                ASCIIColors.warning(f"⚠️  DROPPED PAYLOAD [{msg_type}]: {payload_size//1024}KB. Size exceeds browser write limits.")
-                return # DROP THE MESSAGE
-        except Exception:
-            # If we can't even JSON encode it, it's definitely too dangerous to send
-            return
+        message_data["_pid"] = os.getpid()
+        msg_type = message_data.get("type")
+
+        # --- SINGLE ENCODING ---
+        # Personal/admin messages deliver only their "data" locally, so that part is encoded
+        # once and spliced into the Hub envelope; other messages are delivered as-is.
         try:
-            encoded_payload = json.dumps(message_data)
-            encoded_len = len(encoded_payload)
-            if encoded_len > 1024 * 1024:
-                # Gather detailed statistics about the payload
-                msg_type = type(message_data).__name__
-                key_count = len(message_data.keys()) if isinstance(message_data, dict) else 'N/A'
-
-                # Create a safe snapshot (first 500 chars, escaped)
-                snapshot = repr(encoded_payload[:500])
-
-                # Calculate size breakdown if dict
-                size_breakdown = {}
-                if isinstance(message_data, dict):
-                    for k, v in message_data.items():
-                        try:
-                            size_breakdown[k] = len(json.dumps({k: v}))
-                        except Exception:
-                            size_breakdown[k] = 'unmeasurable'
-                    top_heavy = sorted(size_breakdown.items(), key=lambda x: x[1] if isinstance(x[1], int) else 0, reverse=True)[:3]
-                    top_keys_str = ', '.join([f"{k}={v}b" for k, v in top_heavy])
-                else:
-                    top_keys_str = 'N/A (not a dict)'
-
-                # Build warning panel
-                panel_content = (
-                    f"\n{'='*60}\n"
-                    f"  WEBSOCKET PAYLOAD TOO LARGE - DROPPED TO PROTECT UI\n"
-                    f"{'='*60}\n"
-                    f"  Total Size:        {encoded_len:,} bytes ({encoded_len/1024/1024:.2f} MB)\n"
-                    f"  Limit:             {1024*1024:,} bytes (1.0 MB)\n"
-                    f"  Data Type:         {msg_type}\n"
-                    f"  Top-Level Keys:    {key_count}\n"
-                    f"  Top 3 Heavy Keys:  {top_keys_str}\n"
-                    f"{'-'*60}\n"
-                    f"  Payload Snapshot (first 500 chars):\n"
-                    f"  {snapshot}\n"
-                    f"{'='*60}"
-                )
-                ASCIIColors.warning(panel_content)
-                return
+            if msg_type in ("personal", "admins"):
+                local_key = coalesce_key(message_data.get("data"))
+                local_frame = encode_ws_frame(message_data.get("data"))
+                envelope = encode_ws_frame({k: v for k, v in message_data.items() if k != "data"})
+                hub_frame = envelope[:-1] + ',"data":' + local_frame + '}'
+            else:
+                local_key = coalesce_key(message_data)
+                local_frame = hub_frame = encode_ws_frame(message_data)
+            hub_bytes = hub_frame.encode('utf-8')
         except Exception as e:
+            # If we can't even JSON encode it, it's definitely too dangerous to send
             ASCIIColors.warning(f"WS Safety Check failed with error: {e}")
-            pass
+            return
+
+        # --- CRITICAL FRONTEND PROTECTION TEST ---
+        # 1MB Hard Limit. Chromium browsers crash when the heap is flooded 
+        # with large objects via WebSockets during high-frequency updates.
+        encoded_len = len(hub_bytes)
+        if encoded_len > MAX_WS_FRAME_BYTES:
+            # EMERGENCY STRIP: If the payload is too big, try to strip images before dropping.
+            # Message images travel as blob URLs, but discussion images still travel as base64,
+            # and so do message images when image_blob_refs_enabled is off.
+            inner = message_data.get("data")
+            if isinstance(inner, dict):
+                stripped = False
+                for key in ["image_references", "images", "discussion_images"]:
+                    if inner.get(key):
+                        inner[key] = []
+                        stripped = True
+                if stripped:
+                    ASCIIColors.warning(f"✂️  STRIPPED IMAGES from [{msg_type}] to fit quota.")
+                    return self.broadcast_sync(message_data)
+
+            # Gather detailed statistics about the payload
+            size_breakdown = {}
+            for k, v in message_data.items():
+                try:
+                    size_breakdown[k] = len(encode_ws_frame({k: v}))
+                except Exception:
+                    size_breakdown[k] = 'unmeasurable'
+            top_heavy = sorted(size_breakdown.items(), key=lambda x: x[1] if isinstance(x[1], int) else 0, reverse=True)[:3]
+            top_keys_str = ', '.join([f"{k}={v}b" for k, v in top_heavy])
+
+            # Build warning panel
+            panel_content = (
+                f"\n{'='*60}\n"
+                f"  WEBSOCKET PAYLOAD TOO LARGE - DROPPED TO PROTECT UI\n"
+                f"{'='*60}\n"
+                f"  Total Size:        {encoded_len:,} bytes ({encoded_len/1024/1024:.2f} MB)\n"
+                f"  Limit:             {MAX_WS_FRAME_BYTES:,} bytes (1.0 MB)\n"
+                f"  Message Type:      {msg_type}\n"
+                f"  Top-Level Keys:    {len(message_data)}\n"
+                f"  Top 3 Heavy Keys:  {top_keys_str}\n"
+                f"{'-'*60}\n"
+                f"  Payload Snapshot (first 500 chars):\n"
+                f"  {repr(hub_frame[:500])}\n"
+                f"{'='*60}"
+            )
+            ASCIIColors.warning(panel_content)
+            return # DROP THE MESSAGE
         
         # DEBUG LOGGING: Use this to see the "Storm" in your terminal
-        msg_type = message_data.get("type")
         if msg_type == "personal":
             inner_type = message_data.get("data", {}).get("type", "unknown")
             ASCIIColors.debug(f"[WS-SEND] -> User {message_data.get('user_id')}: {inner_type}")
         else:
             ASCIIColors.debug(f"[WS-SEND] -> Global: {msg_type}")
 
-        message_data["_pid"] = os.getpid()
-
         if self._loop and self._loop.is_running():
             async def dispatch():
                 # [FIX] Wrap local delivery in try-except so it doesn't block Hub propagation
                 try:
-                    # 1. Local delivery (this worker instance)
-                    msg_type = message_data.get("type")
+                    # 1. Local delivery (this worker instance), reusing the encoded frame
                     if msg_type == "personal":
                         uid = message_data.get("user_id")
-                        if uid is not None: await self.send_personal_message(message_data.get("data"), uid)
+                        if uid is not None: await self.send_personal_frame(local_frame, uid, local_key)
                     elif msg_type == "admins":
-                        await self.broadcast_to_admins(message_data.get("data"))
+                        await self.broadcast_frame_to_admins(local_frame, local_key)
                     else:
-                        await self.broadcast(message_data)
+                        await self.broadcast_frame(local_frame, local_key)
                 except Exception as e:
                     print(f"ERROR: Local WebSocket delivery failed, proceeding to Hub sync: {e}")
                 
@@ -386,8 +626,7 @@ class ConnectionManager:
                 # Rely on hub_writer availability rather than just worker count check
                 if self.hub_writer:
                     try:
-                        encoded = json.dumps(message_data).encode('utf-8')
-                        packet = struct.pack('!I', len(encoded)) + encoded
+                        packet = struct.pack('!I', len(hub_bytes)) + hub_bytes
                         self.hub_writer.write(packet)
                         await self.hub_writer.drain()
                     except Exception:
@@ -396,21 +635,16 @@ class ConnectionManager:
             
             asyncio.run_coroutine_threadsafe(dispatch(), self._loop)
 
-        # Persistence to DB as a fallback log for multi-worker synchronization audit
+        # Journal for multi-worker audit and replay after a lost Hub connection
         if self.workers_count > 1:
-            self._put_on_db_queue(message_data)
+            self._journal(hub_bytes, msg_type)
 
-    def _put_on_db_queue(self, payload: dict):
-        db = None
+    def _journal(self, encoded: bytes, msg_type: Optional[str]):
         try:
-            db = db_session_module.SessionLocal()
-            db_message = BroadcastMessage(payload=payload)
-            db.add(db_message)
-            db.commit()
-        except Exception:
-            if db: db.rollback()
-        finally:
-            if db: db.close()
+            broadcast_journal.open()
+            broadcast_journal.append(encoded, msg_type)
+        except Exception as e:
+            print(f"WARNING: Could not journal broadcast: {e}")
 
     def send_personal_message_sync(self, message_data: dict, user_id: int):
         self.broadcast_sync({"type": "personal", "user_id": user_id, "data": message_data})
@@ -421,8 +655,42 @@ class ConnectionManager:
     def broadcast_internal_event_sync(self, event_type: str, data: dict):
         self.broadcast_sync({"type": "internal_event", "event_type": event_type, "data": data})
 
+    def send_internal_event_to_hub_sync(self, event_type: str, data: dict):
+        """
+        Pushes a high-frequency internal event to the other workers only: no local
+        WebSocket delivery and no journal entry, unlike broadcast_internal_event_sync.
+        """
+        if not (self.hub_writer and self._loop and self._loop.is_running()):
+            return
+        payload = {"type": "internal_event", "event_type": event_type, "data": data, "_pid": os.getpid()}
+
+        async def push():
+            if not self.hub_writer:
+                return
+            try:
+                encoded = encode_ws_frame(payload).encode('utf-8')
+                self.hub_writer.write(struct.pack('!I', len(encoded)) + encoded)
+                await self.hub_writer.drain()
+            except Exception:
+                self.hub_writer = None
+                self.is_hub_connected = False
+
+        asyncio.run_coroutine_threadsafe(push(), self._loop)
+
 manager = ConnectionManager()
 
+async def replay_missed_broadcasts(cursors: Dict[str, int]):
+    """Delivers the other workers' journaled broadcasts sent after `cursors`."""
+    replayed = 0
+    try:
+        for payload in broadcast_journal.read_peers_since(cursors):
+            await manager._handle_broadcast_payload(payload)
+            replayed += 1
+    except Exception as e:
+        print(f"WARNING: Worker {os.getpid()} could not replay the broadcast journal: {e}")
+    if replayed:
+        print(f"INFO: Worker {os.getpid()} replayed {replayed} broadcast(s) missed while disconnected from the Hub.")
+
 async def listen_for_broadcasts():
     """
     Background worker task that maintains a persistent connection to the Hub.
@@ -431,13 +699,22 @@ async def listen_for_broadcasts():
     # Use dynamic setting with a fallback to the SERVER_CONFIG/default
     hub_port = settings.get("com_hub_port", SERVER_CONFIG.get("com_hub_port", 8042))
     print(f"INFO: Worker {os.getpid()} initializing Communication Hub client listener on port {hub_port}.")
+    # Other workers' journal positions when the Hub connection was lost
+    journal_cursors = None
+    connected_once = False
     
     while True:
         try:
             reader, writer = await asyncio.open_connection('127.0.0.1', hub_port)
             manager.hub_writer = writer
             manager.is_hub_connected = True
+            # (Re)announce the users hosted here so the hub can route personal messages
+            manager.publish_full_presence()
             print(f"INFO: Worker {os.getpid()} successfully connected to Communication Hub.")
+            if journal_cursors is not None:
+                await replay_missed_broadcasts(journal_cursors)
+                journal_cursors = None
+            connected_once = True
             
             while True:
                 length_data = await reader.readexactly(4)
@@ -448,6 +725,8 @@ async def listen_for_broadcasts():
                 await manager._handle_broadcast_payload(payload)
                 
         except (asyncio.IncompleteReadError, ConnectionRefusedError, ConnectionResetError, BrokenPipeError):
+            if connected_once and manager.workers_count > 1 and journal_cursors is None:
+                journal_cursors = broadcast_journal.peer_heads()
             manager.hub_writer = None
             manager.is_hub_connected = False
             await asyncio.sleep(2) # Backoff before retry
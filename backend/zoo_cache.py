@@ -1,9 +1,13 @@
 import yaml
 import json
 import time
+import re
+import sqlite3
+import hashlib
+import threading
+import os
 from pathlib import Path
-import base64
-from typing import List, Dict, Any, Literal
+from typing import List, Dict, Any, Literal, Optional, Iterable, Tuple
 from sqlalchemy.orm import Session
 from filelock import FileLock, Timeout
 
@@ -16,12 +20,58 @@ import datetime
 from ascii_colors import ASCIIColors
 
 ITEM_TYPES = Literal['app', 'mcp', 'prompt', 'personality']
+# Legacy single-file cache, replaced by the SQLite index below; only deleted by force_build_full_cache
 CACHE_FILE = APP_DATA_DIR / "zoo_cache.json"
-CACHE_LOCK_FILE = APP_DATA_DIR / "zoo_cache.lock"
+CACHE_INDEX_FILE = APP_DATA_DIR / "zoo_index.db"
+CACHE_LOCK_DIR = APP_DATA_DIR / "zoo_cache_locks"
 CACHE_LOCK_TIMEOUT = 300 # 5 minutes
+# Bump when parsing changes, so existing indexes are rebuilt from scratch
+INDEX_FORMAT = "2"
+# Files whose size/mtime make up an item's signature: anything _parse_item reads or checks
+_SIGNATURE_FILES = ("description.yaml", "config.yaml", "icon.png", "assets/logo.png", "scripts/processor.py", ".env.example")
+ZOO_ICON_URL_PREFIX = "/api/zoo_icons/"
 
+# Columns the /available endpoints may sort on; anything else keeps catalogue order
+SORTABLE_COLUMNS = ('name', 'author', 'category', 'version', 'last_update_date', 'creation_date', 'repository', 'folder_name')
 
-_cache: Dict[str, Any] = {"timestamp": 0, "data": {}}
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS zoo_items (
+    id INTEGER PRIMARY KEY,
+    item_type TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    folder_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    description TEXT,
+    author TEXT,
+    category TEXT,
+    version TEXT,
+    last_update_date TEXT,
+    creation_date TEXT,
+    icon_hash TEXT,
+    signature TEXT,
+    data TEXT NOT NULL,
+    UNIQUE (item_type, repository, folder_name)
+);
+CREATE INDEX IF NOT EXISTS ix_zoo_items_type_category ON zoo_items (item_type, category);
+CREATE INDEX IF NOT EXISTS ix_zoo_items_type_name ON zoo_items (item_type, name_lower);
+CREATE TABLE IF NOT EXISTS zoo_icons (hash TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS zoo_meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS zoo_repos (
+    item_type TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    git_head TEXT,
+    scanned_at REAL,
+    PRIMARY KEY (item_type, repository)
+);
+"""
+# Standalone FTS table whose rowids are zoo_items ids, maintained alongside zoo_items
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS zoo_items_fts USING fts5(name, description, tags, author)"
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+_fts_enabled = False
+_index_built = False
 
 def _sanitize_for_json(data: Any) -> Any:
     """Recursively sanitizes data to ensure it's JSON serializable."""
@@ -83,165 +133,439 @@ def parse_item_metadata(item_path: Path, item_type: ITEM_TYPES) -> Dict[str, Any
                 metadata = yaml.safe_load(f) or {}
     return metadata
 
-def _build_cache_for_type(db: Session, item_type: ITEM_TYPES) -> List[Dict[str, Any]]:
-    items = []
-    zoo_root = get_zoo_root_path(item_type)
-    repo_model = get_db_repo_model(item_type)
-    
-    repositories = db.query(repo_model).all()
-    
-    for repo in repositories:
-        repo_path = None
-        if repo.type == 'git':
-            repo_path = zoo_root / repo.name
-        elif repo.type == 'local':
-            repo_path = Path(repo.url)
-        else:
-            continue
+def _connect() -> sqlite3.Connection:
+    """Opens the zoo index, creating its schema on first use in this process."""
+    global _schema_ready, _fts_enabled
+    conn = sqlite3.connect(str(CACHE_INDEX_FILE), timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS zoo_meta (key TEXT PRIMARY KEY, value TEXT)")
+                row = conn.execute("SELECT value FROM zoo_meta WHERE key = 'format'").fetchone()
+                if not row or row[0] != INDEX_FORMAT:
+                    conn.executescript(
+                        "DROP TABLE IF EXISTS zoo_items; DROP TABLE IF EXISTS zoo_items_fts; "
+                        "DROP TABLE IF EXISTS zoo_icons; DROP TABLE IF EXISTS zoo_repos; DELETE FROM zoo_meta;"
+                    )
+                    conn.execute("INSERT INTO zoo_meta (key, value) VALUES ('format', ?)", (INDEX_FORMAT,))
+                conn.executescript(_SCHEMA)
+                try:
+                    conn.execute(_FTS_SCHEMA)
+                    _fts_enabled = True
+                except sqlite3.OperationalError:
+                    ASCIIColors.warning("SQLite was built without FTS5, zoo search falls back to LIKE.")
+                conn.commit()
+                _schema_ready = True
+    return conn
+
+def _icon_url(icon_hash: Optional[str]) -> Optional[str]:
+    return f"{ZOO_ICON_URL_PREFIX}{icon_hash}" if icon_hash else None
+
+def _row_to_item(row: sqlite3.Row) -> Dict[str, Any]:
+    item = json.loads(row['data'])
+    item['icon'] = _icon_url(row['icon_hash'])
+    return item
+
+def _parse_item(item_folder: Path, item_type: ITEM_TYPES, repo_path: Path, repo_name: str) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    """Catalogue entry for one zoo item folder, and the bytes of its icon if it has one."""
+    metadata = parse_item_metadata(item_folder, item_type)
+    if not metadata or not metadata.get('name'):
+        metadata['name'] = item_folder.name
+
+    # --- FIX: Handle category being a list ---
+    if 'category' in metadata and isinstance(metadata['category'], list):
+        metadata['category'] = metadata['category'][0] if metadata['category'] else 'Uncategorized'
+    # --- END FIX ---
+
+    # --- NEW: Detect legacy scripted personalities ---
+    if item_type == 'personality' and (item_folder / "scripts" / "processor.py").exists():
+        metadata['is_legacy_scripted'] = True
+    # --- END NEW ---
+
+    # --- NEW: Detect .env.example for apps and mcps ---
+    if item_type in ['app', 'mcp']:
+        metadata['has_dot_env_config'] = (item_folder / ".env.example").exists()
+
+    icon_path = next((p for p in [item_folder / "icon.png", item_folder / "assets" / "logo.png"] if p.exists()), None)
+    icon_bytes = icon_path.read_bytes() if icon_path else None
+
+    # Use relative path for folder_name to handle nested structures
+    folder_name_rel = item_folder.relative_to(repo_path).as_posix()
+
+    item = _sanitize_for_json({
+        **metadata,
+        'item_type': item_type,
+        'repository': repo_name,
+        'folder_name': folder_name_rel,
+    })
+    item.pop('icon', None)
+    return item, icon_bytes
+
+def _repo_path(repo, item_type: ITEM_TYPES) -> Optional[Path]:
+    if repo.type == 'git':
+        return get_zoo_root_path(item_type) / repo.name
+    if repo.type == 'local':
+        return Path(repo.url)
+    return None
 
-        if not repo_path or not repo_path.is_dir(): continue
-        
-        # Use glob to find all possible config files, supporting nested structures
-        config_files = list(repo_path.glob('**/description.yaml'))
-        if item_type == 'personality':
-            config_files.extend(list(repo_path.glob('**/config.yaml')))
+def _git_head(repo_path: Path) -> Optional[str]:
+    """Commit checked out in a git working tree, read from .git without spawning git."""
+    git_dir = repo_path / ".git"
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        if not head.startswith("ref: "):
+            return head
+        ref = head[5:]
+        ref_path = git_dir / ref
+        if ref_path.is_file():
+            return ref_path.read_text(encoding="utf-8").strip()
+        packed_refs = git_dir / "packed-refs"
+        if packed_refs.is_file():
+            for line in packed_refs.read_text(encoding="utf-8").splitlines():
+                if line.endswith(f" {ref}"):
+                    return line.split(" ", 1)[0]
+    except OSError:
+        pass
+    return None
+
+def _item_folders(repo_path: Path, item_type: ITEM_TYPES) -> List[Path]:
+    """Folders holding an item description, nested ones included; hidden directories such as .git are skipped."""
+    markers = ("description.yaml", "config.yaml") if item_type == 'personality' else ("description.yaml",)
+    folders = []
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        if any(marker in files for marker in markers):
+            folders.append(Path(root))
+    return folders
+
+def _item_signature(item_folder: Path) -> str:
+    parts = []
+    for rel in _SIGNATURE_FILES:
+        try:
+            st = (item_folder / rel).stat()
+            parts.append(f"{rel}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append(f"{rel}:-")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+def _sort_value(value: Any) -> str:
+    return str(value if value is not None else '').lower()
+
+def _delete_items(conn: sqlite3.Connection, item_ids: List[int]):
+    for i in range(0, len(item_ids), 500):
+        chunk = item_ids[i:i + 500]
+        placeholders = ','.join('?' * len(chunk))
+        if _fts_enabled:
+            conn.execute(f"DELETE FROM zoo_items_fts WHERE rowid IN ({placeholders})", chunk)
+        conn.execute(f"DELETE FROM zoo_items WHERE id IN ({placeholders})", chunk)
+
+def _upsert_item(conn: sqlite3.Connection, item_type: ITEM_TYPES, item: Dict[str, Any], icon_bytes: Optional[bytes], signature: str, item_id: Optional[int] = None):
+    """Writes one catalogue entry, in place if `item_id` is given, and keeps its FTS row in step."""
+    icon_hash = None
+    if icon_bytes:
+        icon_hash = hashlib.sha256(icon_bytes).hexdigest()
+        conn.execute("INSERT OR IGNORE INTO zoo_icons (hash, data) VALUES (?, ?)", (icon_hash, icon_bytes))
+    name = str(item.get('name') or item.get('folder_name'))
+    values = (
+        name, name.lower(),
+        item.get('description') if isinstance(item.get('description'), str) else None,
+        _sort_value(item.get('author')), item.get('category') if isinstance(item.get('category'), str) else None,
+        _sort_value(item.get('version')), _sort_value(item.get('last_update_date')), _sort_value(item.get('creation_date')),
+        icon_hash, signature, json.dumps(item)
+    )
+    if item_id is not None:
+        conn.execute(
+            """UPDATE zoo_items SET name = ?, name_lower = ?, description = ?, author = ?, category = ?, version = ?,
+                                    last_update_date = ?, creation_date = ?, icon_hash = ?, signature = ?, data = ?
+               WHERE id = ?""",
+            values + (item_id,)
+        )
+        if _fts_enabled:
+            conn.execute("DELETE FROM zoo_items_fts WHERE rowid = ?", (item_id,))
+    else:
+        item_id = conn.execute(
+            """INSERT INTO zoo_items (item_type, repository, folder_name, name, name_lower, description, author, category,
+                                      version, last_update_date, creation_date, icon_hash, signature, data)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (item_type, item['repository'], item['folder_name']) + values
+        ).lastrowid
+    if _fts_enabled:
+        tags = item.get('tags')
+        tags_text = " ".join(str(t) for t in tags) if isinstance(tags, list) else str(tags or '')
+        conn.execute(
+            "INSERT INTO zoo_items_fts (rowid, name, description, tags, author) VALUES (?, ?, ?, ?, ?)",
+            (item_id, name, str(item.get('description') or ''), tags_text, str(item.get('author') or ''))
+        )
+
+def _prune_icons(conn: sqlite3.Connection):
+    conn.execute("DELETE FROM zoo_icons WHERE hash NOT IN (SELECT icon_hash FROM zoo_items WHERE icon_hash IS NOT NULL)")
+
+def _mark_built(conn: sqlite3.Connection):
+    conn.execute("INSERT OR REPLACE INTO zoo_meta (key, value) VALUES ('built_at', ?)", (str(time.time()),))
+
+def _repo_lock(item_type: ITEM_TYPES, repo_name: str, timeout: float) -> FileLock:
+    # One lock per repository: rescanning one never blocks workers reading or rescanning another
+    CACHE_LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    key = hashlib.sha1(f"{item_type}/{repo_name}".encode("utf-8")).hexdigest()[:16]
+    return FileLock(str(CACHE_LOCK_DIR / f"{item_type}_{key}.lock"), timeout=timeout)
+
+def _sync_repository(item_type: ITEM_TYPES, repo_name: str, repo_path: Optional[Path], trust_git_head: bool = True) -> Dict[str, int]:
+    """
+    Brings the indexed items of one repository in line with its folder.
+
+    Each item is stored with a signature built from the sizes and mtimes of the
+    files it is parsed from, so only added or changed folders are parsed again and
+    vanished ones are dropped. For git repositories the checked out commit is
+    recorded too, and when `trust_git_head` is set an unchanged HEAD skips the
+    walk entirely. All changes land in one transaction.
+    """
+    stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0, "skipped": 0}
+    conn = _connect()
+    try:
+        existing = {
+            row['folder_name']: (row['id'], row['signature'])
+            for row in conn.execute("SELECT id, folder_name, signature FROM zoo_items WHERE item_type = ? AND repository = ?", (item_type, repo_name))
+        }
+        head = None
+        if repo_path and repo_path.is_dir():
+            head = _git_head(repo_path)
+            if trust_git_head and head:
+                stored = conn.execute("SELECT git_head FROM zoo_repos WHERE item_type = ? AND repository = ?", (item_type, repo_name)).fetchone()
+                if stored and stored['git_head'] == head:
+                    stats["skipped"] = len(existing)
+                    return stats
+            folders = _item_folders(repo_path, item_type)
+        else:
+            folders = []
 
-        for config_file in config_files:
-            item_folder = config_file.parent
+        # Parse outside the transaction so the index is only locked for the writes
+        updates = []
+        seen = set()
+        for item_folder in folders:
+            folder_name_rel = item_folder.relative_to(repo_path).as_posix()
+            seen.add(folder_name_rel)
+            signature = _item_signature(item_folder)
+            item_id, old_signature = existing.get(folder_name_rel, (None, None))
+            if old_signature == signature:
+                stats["unchanged"] += 1
+                continue
             try:
-                metadata = parse_item_metadata(item_folder, item_type)
-                if not metadata or not metadata.get('name'):
-                    metadata['name'] = item_folder.name
-                
-                # --- FIX: Handle category being a list ---
-                if 'category' in metadata and isinstance(metadata['category'], list):
-                    metadata['category'] = metadata['category'][0] if metadata['category'] else 'Uncategorized'
-                # --- END FIX ---
-                
-                # --- NEW: Detect legacy scripted personalities ---
-                if item_type == 'personality' and (item_folder / "scripts" / "processor.py").exists():
-                    metadata['is_legacy_scripted'] = True
-                # --- END NEW ---
-
-                # --- NEW: Detect .env.example for apps and mcps ---
-                if item_type in ['app', 'mcp']:
-                    metadata['has_dot_env_config'] = (item_folder / ".env.example").exists()
-
-                # Icon handling
-                icon_path = next((p for p in [item_folder / "icon.png", item_folder / "assets" / "logo.png"] if p.exists()), None)
-                icon_b64 = None
-                if icon_path:
-                    with open(icon_path, 'rb') as f:
-                        icon_b64 = f"data:image/png;base64,{base64.b64encode(f.read()).decode('utf-8')}"
-
-                # Use relative path for folder_name to handle nested structures
-                folder_name_rel = item_folder.relative_to(repo_path).as_posix()
-
-                items.append(_sanitize_for_json({
-                    **metadata,
-                    'item_type': item_type,
-                    'repository': repo.name,
-                    'folder_name': folder_name_rel,
-                    'icon': icon_b64
-                }))
+                item, icon_bytes = _parse_item(item_folder, item_type, repo_path, repo_name)
             except Exception as e:
-                print(f"Warning: Could not process {item_type} item at '{item_folder}' in repo '{repo.name}': {e}")
-    return items
+                print(f"Warning: Could not process {item_type} item at '{item_folder}' in repo '{repo_name}': {e}")
+                continue
+            updates.append((item, icon_bytes, signature, item_id))
+            stats["changed" if item_id is not None else "added"] += 1
+        removed_ids = [item_id for folder_name, (item_id, _) in existing.items() if folder_name not in seen]
+        stats["removed"] = len(removed_ids)
+
+        with conn:
+            _delete_items(conn, removed_ids)
+            for item, icon_bytes, signature, item_id in updates:
+                _upsert_item(conn, item_type, item, icon_bytes, signature, item_id)
+            if removed_ids or stats["changed"]:
+                _prune_icons(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO zoo_repos (item_type, repository, git_head, scanned_at) VALUES (?, ?, ?, ?)",
+                (item_type, repo_name, head, time.time())
+            )
+            _mark_built(conn)
+    finally:
+        conn.close()
+    return stats
+
+def _drop_repository(conn: sqlite3.Connection, item_type: ITEM_TYPES, repo_name: str):
+    item_ids = [row[0] for row in conn.execute("SELECT id FROM zoo_items WHERE item_type = ? AND repository = ?", (item_type, repo_name))]
+    _delete_items(conn, item_ids)
+    conn.execute("DELETE FROM zoo_repos WHERE item_type = ? AND repository = ?", (item_type, repo_name))
 
 def force_build_full_cache():
-    """Builds the cache from scratch, typically for a manual refresh."""
-    global _cache
-    lock = FileLock(str(CACHE_LOCK_FILE), timeout=CACHE_LOCK_TIMEOUT)
+    """
+    Rescans every zoo repository, typically for a manual refresh.
+
+    Every folder is walked and its signatures checked even when the git HEAD is
+    unchanged, but only added or changed items are parsed. Items of repositories
+    that are no longer registered are removed.
+    """
+    ASCIIColors.info("INFO: Rescanning all Zoo repositories...")
+    db = next(get_db())
     try:
-        with lock:
-            ASCIIColors.info("INFO: Forcing a full rebuild of the Zoo cache...")
-            db = next(get_db())
+        repos_by_type = {
+            item_type: [(repo.name, _repo_path(repo, item_type)) for repo in db.query(get_db_repo_model(item_type)).all()]
+            for item_type in ('app', 'mcp', 'prompt', 'personality')
+        }
+    finally:
+        db.close()
+
+    totals = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0, "skipped": 0}
+    for item_type, repos in repos_by_type.items():
+        for repo_name, repo_path in repos:
             try:
-                _cache["data"] = {
-                    'app': _build_cache_for_type(db, 'app'),
-                    'mcp': _build_cache_for_type(db, 'mcp'),
-                    'prompt': _build_cache_for_type(db, 'prompt'),
-                    'personality': _build_cache_for_type(db, 'personality'),
-                }
-                _cache["timestamp"] = time.time()
-                with open(CACHE_FILE, 'w') as f:
-                    json.dump(_cache, f)
-                ASCIIColors.green("INFO: Zoo cache rebuild complete.")
-            finally:
-                db.close()
-    except Timeout:
-        ASCIIColors.warning("Could not acquire lock for force cache build. Another process might be building it.")
+                with _repo_lock(item_type, repo_name, CACHE_LOCK_TIMEOUT):
+                    for key, value in _sync_repository(item_type, repo_name, repo_path, trust_git_head=False).items():
+                        totals[key] += value
+            except Timeout:
+                ASCIIColors.warning(f"Could not acquire lock to rescan {item_type} repo '{repo_name}'. Another process might be scanning it.")
+
+    conn = _connect()
+    try:
+        with conn:
+            for item_type, repos in repos_by_type.items():
+                known = {repo_name for repo_name, _ in repos}
+                indexed = {row[0] for row in conn.execute("SELECT DISTINCT repository FROM zoo_items WHERE item_type = ?", (item_type,))}
+                for repo_name in indexed - known:
+                    _drop_repository(conn, item_type, repo_name)
+            _prune_icons(conn)
+            _mark_built(conn)
+    finally:
+        conn.close()
+    # Legacy cleanup: the JSON cache of older versions is no longer read
+    CACHE_FILE.unlink(missing_ok=True)
+    ASCIIColors.green(f"INFO: Zoo cache rescan complete ({totals['added']} added, {totals['changed']} changed, {totals['removed']} removed, {totals['unchanged']} unchanged).")
 
 def refresh_repo_cache(repo_name: str, item_type: ITEM_TYPES):
-    global _cache
-    lock = FileLock(str(CACHE_LOCK_FILE), timeout=60)
+    """
+    Incrementally rescans one repository, e.g. after a pull; removes its items if it is gone.
+
+    Only git repositories may skip the walk on an unchanged HEAD: a local folder can
+    itself be a git checkout with uncommitted edits, so its signatures are always checked.
+    """
+    db = next(get_db())
     try:
-        with lock:
-            if not _cache.get("data"):
-                load_cache()
-            
-            _cache["data"][item_type] = [item for item in _cache.get("data", {}).get(item_type, []) if item.get('repository') != repo_name]
-            
-            db = next(get_db())
-            try:
-                repo = db.query(get_db_repo_model(item_type)).filter_by(name=repo_name).first()
-                if repo:
-                    repo_path = Path(repo.url) if repo.type == 'local' else get_zoo_root_path(item_type) / repo.name
-                    if repo_path.is_dir():
-                        config_files = list(repo_path.glob('**/description.yaml'))
-                        if item_type == 'personality': config_files.extend(list(repo_path.glob('**/config.yaml')))
-
-                        for config_file in config_files:
-                            item_folder = config_file.parent
-                            try:
-                                metadata = parse_item_metadata(item_folder, item_type)
-                                if not metadata.get('name'): metadata['name'] = item_folder.name
-                                if 'category' in metadata and isinstance(metadata['category'], list):
-                                    metadata['category'] = metadata['category'][0] if metadata['category'] else 'Uncategorized'
-                                if item_type == 'personality' and (item_folder / "scripts" / "processor.py").exists():
-                                    metadata['is_legacy_scripted'] = True
-                                if item_type in ['app', 'mcp']:
-                                    metadata['has_dot_env_config'] = (item_folder / ".env.example").exists()
-                                icon_path = next((p for p in [item_folder / "icon.png", item_folder / "assets" / "logo.png"] if p.exists()), None)
-                                icon_b64 = f"data:image/png;base64,{base64.b64encode(icon_path.read_bytes()).decode('utf-8')}" if icon_path else None
-                                folder_name_rel = item_folder.relative_to(repo_path).as_posix()
-                                _cache["data"][item_type].append(_sanitize_for_json({**metadata, 'item_type': item_type, 'repository': repo.name, 'folder_name': folder_name_rel, 'icon': icon_b64}))
-                            except Exception as e:
-                                print(f"Warning: Could not process item '{item_folder}' on refresh: {e}")
-
-                _cache["timestamp"] = time.time()
-                with open(CACHE_FILE, 'w') as f: json.dump(_cache, f)
-            finally:
-                db.close()
+        repo = db.query(get_db_repo_model(item_type)).filter_by(name=repo_name).first()
+        repo_path = _repo_path(repo, item_type) if repo else None
+    finally:
+        db.close()
+    try:
+        with _repo_lock(item_type, repo_name, 60):
+            if repo is None:
+                conn = _connect()
+                try:
+                    with conn:
+                        _drop_repository(conn, item_type, repo_name)
+                        _prune_icons(conn)
+                finally:
+                    conn.close()
+                return
+            stats = _sync_repository(item_type, repo_name, repo_path, trust_git_head=(repo.type == 'git'))
+            ASCIIColors.info(f"INFO: Zoo repo '{repo_name}' rescanned: {stats}")
     except Timeout:
         ASCIIColors.warning(f"Could not acquire lock to refresh repo '{repo_name}'. Cache may be slightly stale.")
 
 
 def load_cache():
-    """Loads the cache from file if it exists, otherwise builds it."""
-    global _cache
-    if _cache.get("data"): # Already loaded in memory
+    """Makes sure the zoo index exists, building it on first start."""
+    global _index_built
+    if _index_built:
         return
-
-    if CACHE_FILE.exists():
-        try:
-            with open(CACHE_FILE, 'r') as f:
-                _cache = json.load(f)
-            return
-        except (json.JSONDecodeError, TypeError):
-            ASCIIColors.warning("Cache file is corrupted, rebuilding.")
-    
-    # Build if not in memory, file doesn't exist, or is corrupt.
-    force_build_full_cache()
+    conn = _connect()
+    try:
+        built = conn.execute("SELECT value FROM zoo_meta WHERE key = 'built_at'").fetchone()
+    finally:
+        conn.close()
+    if not built:
+        force_build_full_cache()
+    _index_built = True
 
 def get_all_items(item_type: ITEM_TYPES) -> List[Dict[str, Any]]:
     load_cache()
-    return _cache.get("data", {}).get(item_type, [])
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT data, icon_hash FROM zoo_items WHERE item_type = ? ORDER BY id", (item_type,)).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_item(row) for row in rows]
+
+def _fts_query(search_query: str) -> Optional[str]:
+    # Every word must match, as a prefix, in name, description, tags or author
+    tokens = re.findall(r"\w+", search_query)
+    return " ".join(f'"{token}"*' for token in tokens) if tokens else None
+
+def query_items(
+    item_type: ITEM_TYPES,
+    page: int = 1, page_size: int = 24,
+    sort_by: str = 'name', sort_order: str = 'asc',
+    category: Optional[str] = None, repository: Optional[str] = None, search_query: Optional[str] = None,
+    include_names: Optional[Iterable[str]] = None, exclude_names: Optional[Iterable[str]] = None,
+    case_insensitive_names: bool = False
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    One page of a zoo catalogue, filtered, sorted and paginated by SQLite.
+
+    `include_names` / `exclude_names` restrict the page to (or away from) items with
+    those names, which is how the routers express installation and starred filters.
+    Returns (items of the page, total number of matching items).
+    """
+    load_cache()
+    name_column = 'name_lower' if case_insensitive_names else 'name'
+    clauses, params = ["zoo_items.item_type = ?"], [item_type]
+    if category and category != 'All':
+        clauses.append("zoo_items.category = ?")
+        params.append(category)
+    if repository and repository != 'All':
+        clauses.append("zoo_items.repository = ?")
+        params.append(repository)
+    for names, operator in ((include_names, "IN"), (exclude_names, "NOT IN")):
+        if names is None:
+            continue
+        names = [n.lower() if case_insensitive_names else n for n in names]
+        if not names and operator == "IN":
+            return [], 0
+        if names:
+            clauses.append(f"zoo_items.{name_column} {operator} ({','.join('?' * len(names))})")
+            params.extend(names)
+
+    join = ""
+    if search_query and search_query.strip():
+        fts_query = _fts_query(search_query) if _fts_enabled else None
+        if fts_query:
+            join = "JOIN zoo_items_fts ON zoo_items_fts.rowid = zoo_items.id"
+            clauses.append("zoo_items_fts MATCH ?")
+            params.append(fts_query)
+        else:
+            pattern = f"%{search_query.strip().lower()}%"
+            clauses.append("(zoo_items.name_lower LIKE ? OR lower(coalesce(zoo_items.description, '')) LIKE ?)")
+            params.extend([pattern, pattern])
+
+    where = " AND ".join(clauses)
+    direction = "DESC" if sort_order == 'desc' else "ASC"
+    if sort_by == 'name':
+        order = f"zoo_items.name_lower {direction}"
+    elif sort_by in SORTABLE_COLUMNS:
+        order = f"lower(coalesce(zoo_items.{sort_by}, '')) {direction}"
+    else:
+        order = "zoo_items.id"
+
+    page_size = max(1, page_size)
+    offset = max(0, (page - 1) * page_size)
+    conn = _connect()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM zoo_items {join} WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT zoo_items.data, zoo_items.icon_hash FROM zoo_items {join} WHERE {where} ORDER BY {order}, zoo_items.id LIMIT ? OFFSET ?",
+            params + [page_size, offset]
+        ).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_item(row) for row in rows], total
+
+def get_icon(icon_hash: str) -> Optional[bytes]:
+    if not re.fullmatch(r"[0-9a-f]{64}", icon_hash or ""):
+        return None
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT data FROM zoo_icons WHERE hash = ?", (icon_hash,)).fetchone()
+    finally:
+        conn.close()
+    return row['data'] if row else None
 
 def get_all_categories(item_type: ITEM_TYPES) -> List[str]:
-    items = get_all_items(item_type)
-    categories = {'All'}
-    for item in items:
-        if item.get('category'):
-            categories.add(item['category'])
-    return sorted(list(categories))
\ No newline at end of file
+    load_cache()
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT DISTINCT category FROM zoo_items WHERE item_type = ? AND category IS NOT NULL AND category != ''", (item_type,)).fetchall()
+    finally:
+        conn.close()
+    return sorted({'All', *(row['category'] for row in rows)})
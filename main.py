@@ -41,7 +41,7 @@ from backend.db.models.prompt import SavedPrompt as DBSavedPrompt
 from backend.db.models.config import LLMBinding as DBLLMBinding
 from backend.db.models.service import AppZooRepository as DBAppZooRepository, App as DBApp, MCP as DBMCP, MCPZooRepository as DBMCPZooRepository, PromptZooRepository as DBPromptZooRepository, PersonalityZooRepository as DBPersonalityZooRepository
 from backend.db.models.connections import WebSocketConnection
-from backend.db.models.db_task import DBTask
+from backend.db.models.db_task import DBTask, DBTaskLog
 from backend.security import get_password_hash as hash_password
 from backend.migration_utils import LegacyDiscussion
 from backend.session import (
@@ -77,6 +77,7 @@ from backend.routers.zoos.apps_zoo import apps_zoo_router
 from backend.routers.zoos.mcps_zoo import mcps_zoo_router
 from backend.routers.zoos.prompts_zoo import prompts_zoo_router
 from backend.routers.zoos.personalities_zoo import personalities_zoo_router
+from backend.routers.zoos.zoo_icons import zoo_icons_router
 from backend.routers.discussion_groups import discussion_groups_router
 from backend.routers.voices_studio import voices_studio_router
 from backend.routers.image_studio import image_studio_router
@@ -94,6 +95,12 @@ from backend.routers.skills import skills_router
 
 from backend.task_manager import task_manager
 from backend.ws_manager import manager, listen_for_broadcasts
+from backend.discussion_manager import discussion_db_registry
+from backend.document_extraction import shutdown_extraction_pool
+from backend.rag_executor import rag_executor
+from backend.safe_store_registry import safe_store_registry
+from backend.rag_query_cache import rag_query_cache
+from backend.broadcast_journal import broadcast_journal
 from backend.routers.help import help_router
 from backend.routers.prompts import prompts_router
 from backend.routers.memories import memories_router
@@ -109,7 +116,8 @@ from backend.settings import settings
 from apscheduler.schedulers.background import BackgroundScheduler
 from backend.tasks.news_tasks import _scrape_rss_feeds_task, _cleanup_old_news_articles_task
 from backend.tasks.social_tasks import _generate_feed_post_task 
-from backend.tasks.system_tasks import _prune_old_tasks_task
+from backend.tasks.system_tasks import _prune_old_tasks_task, _backfill_generation_stats_task
+from backend.utils import get_system_cache
 # --- End System Tasks Imports ---
 
 broadcast_listener_task = None
@@ -126,7 +134,8 @@ def scheduled_rss_job():
         name="Scheduled RSS Feed Scraping",
         target=_scrape_rss_feeds_task,
         description="Periodically fetching and processing all active RSS feeds.",
-        owner_username=None
+        owner_username=None,
+        priority="maintenance"
     )
 
 def scheduled_news_cleanup_job():
@@ -134,7 +143,8 @@ def scheduled_news_cleanup_job():
         name="Daily News Article Cleanup",
         target=_cleanup_old_news_articles_task,
         description="Deleting old news articles based on retention policy.",
-        owner_username=None
+        owner_username=None,
+        priority="maintenance"
     )
 
 def scheduled_task_pruning_job():
@@ -149,7 +159,8 @@ def scheduled_task_pruning_job():
             name="Scheduled Task Pruning",
             target=_prune_old_tasks_task,
             description="Automatic background cleanup of old finished tasks.",
-            owner_username=None
+            owner_username=None,
+            priority="maintenance"
         )
     finally:
         db.close()
@@ -195,7 +206,8 @@ def check_and_run_scheduled_posts():
                 target=_generate_feed_post_task,
                 args=(True,), 
                 description=f"Scheduled post for {current_time_str}",
-                owner_username=None
+                owner_username=None,
+                priority="maintenance"
             )
 
     except Exception as e:
@@ -208,7 +220,8 @@ def scheduled_email_proposal_job():
         name="Generate Email Proposal",
         target=_generate_email_proposal_task,
         description="Lollms researching and drafting email content.",
-        owner_username=None
+        owner_username=None,
+        priority="maintenance"
     )
 
 # Global Thread Pool Executor for offloading all synchronous database/model initializations
@@ -544,8 +557,9 @@ def run_one_time_startup_tasks(lock: Lock):
         # 1. Cleanup WebSocket connections
         num_deleted_ws = db_for_cleanup.query(WebSocketConnection).delete()
         # 2. Mark interrupted tasks as FAILED
+        # Pending tasks with a job_spec are part of the persistent queue and get re-queued.
         interrupted_tasks = db_for_cleanup.query(DBTask).filter(
-            DBTask.status.in_([TaskStatus.RUNNING, TaskStatus.PENDING])
+            (DBTask.status == TaskStatus.RUNNING) | ((DBTask.status == TaskStatus.PENDING) & (DBTask.job_spec.is_(None)))
         ).all()
         if interrupted_tasks:
             ASCIIColors.yellow(f"Cleaning up {len(interrupted_tasks)} interrupted tasks...")
@@ -554,7 +568,8 @@ def run_one_time_startup_tasks(lock: Lock):
                 task.error = "Task interrupted by server restart."
                 task.completed_at = datetime.datetime.now(datetime.timezone.utc)
                 # Avoid heavy log strings here to prevent DB/WS bloat
-                task.logs = [{"timestamp": datetime.datetime.now(timezone.utc).isoformat(), "message": "System Restart Recovery", "level": "ERROR"}]
+                task.legacy_logs = []
+                task.log_entries = [DBTaskLog(timestamp=datetime.datetime.now(timezone.utc).isoformat(), message="System Restart Recovery", level="ERROR")]
             # Single commit for all tasks to avoid triggering multiple DB change listeners
             db_for_cleanup.commit()
             ASCIIColors.green("Cleanup complete.")
@@ -644,6 +659,9 @@ async def startup_event():
         broadcast_listener_task = asyncio.create_task(listen_for_broadcasts())
 
     if os.getpid() == os.getppid() or os.getenv("WORKER_ID") == "1":
+        # Resume the persistent pending queue left by the previous run
+        task_manager.restore_pending_tasks()
+
         rss_scheduler = BackgroundScheduler(daemon=True)
 
         if settings.get("rss_feed_enabled"):
@@ -676,6 +694,20 @@ async def startup_event():
         if not rss_scheduler.running:
             rss_scheduler.start()
 
+        # One-shot backfill of the generation statistics rollup for pre-existing messages
+        backfill_db = db_session_module.SessionLocal()
+        try:
+            if not get_system_cache(backfill_db, "generation_stats_backfilled", False):
+                task_manager.submit_task(
+                    name="Backfill generation statistics",
+                    target=_backfill_generation_stats_task,
+                    description="Rebuilds the daily generation rollup from every user's discussion database.",
+                    owner_username=None,
+                    priority="maintenance"
+                )
+        finally:
+            backfill_db.close()
+
     hub_port = settings.get("com_hub_port", SERVER_CONFIG.get("com_hub_port", 8042))
     print(f"INFO: Worker {os.getpid()} configuration loaded. Hub Port: {hub_port}.")
 
@@ -690,6 +722,12 @@ async def shutdown_event():
     if rss_scheduler and rss_scheduler.running:
         rss_scheduler.shutdown()
         ASCIIColors.info("RSS feed scheduler shut down.")
+    discussion_db_registry.clear()
+    shutdown_extraction_pool()
+    rag_executor.shutdown()
+    safe_store_registry.clear()
+    rag_query_cache.clear()
+    broadcast_journal.close()
 
 app = FastAPI(
     title="LoLLMs Platform", 
@@ -727,6 +765,7 @@ app.include_router(apps_zoo_router)
 app.include_router(mcps_zoo_router)
 app.include_router(prompts_zoo_router)
 app.include_router(personalities_zoo_router)
+app.include_router(zoo_icons_router)
 app.include_router(tasks_router)
 app.include_router(help_router)
 app.include_router(prompts_router)